@@ -3,58 +3,122 @@ app.py - 사주 풀이 웹 서버 (Flask)
 """
 
 import os
-from flask import Flask, render_template, request, jsonify
+import json
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context, g
 from backend.data_caching_util import load_saju_data_as_files, create_saju_cache
-import google.generativeai as genai
+from backend.serving import AnalysisService, Overloaded, AnalysisTimeout, FakeModel, USE_FAKE_MODEL
+from backend.tracing import traced
+from backend.metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, count_error, registry, serving_collector, render_metrics
+from saju_warmup import lazy_import, warmup
+
+# LLM SDK 는 첫 분석 때 로드 (시작 직후 백그라운드에서 미리 import)
+genai = lazy_import('google.generativeai')
 
 app = Flask(__name__, template_folder='frontend', static_folder='frontend')
 
-# 전역 변수로 모델 관리 (실제 운영 시에는 세션 또는 DB 관리 필요)
-saju_model = None
+@traced('llm.build_model')
+def build_saju_model():
+    """학습 데이터 업로드 및 컨텍스트 캐시를 거쳐 분석 모델 준비 (서비스가 단일 실행으로 호출)"""
+    if USE_FAKE_MODEL:
+        return FakeModel()
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    
+    # 사주 데이터 로드 및 캐싱
+    files = load_saju_data_as_files(api_key, "data")
+    if not files:
+        # 학습 데이터가 없을 경우 기본 안내
+        return genai.GenerativeModel('gemini-1.5-pro-002')
+    cache = create_saju_cache(api_key, files)
+    return genai.GenerativeModel.from_cached_content(cached_content=cache)
+
+# 프로세스 전역 분석 서비스 (동시 실행 제한, 모델 단일 초기화, 요청 제한 시간)
+saju_service = AnalysisService(build_saju_model)
+registry.register_collector(serving_collector(saju_service))
+# 웹 서버는 명식을 계산하지 않으므로 LLM SDK 만 미리 로드
+warmup(chart=False)
+
+@app.before_request
+def track_request_start():
+    g.metrics_endpoint = request.endpoint or 'unknown'
+    HTTP_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+@app.after_request
+def track_request_status(response):
+    HTTP_REQUESTS.inc(endpoint=request.endpoint or 'unknown', status=str(response.status_code))
+    return response
+
+@app.teardown_request
+def track_request_end(exc):
+    # 스트리밍 응답은 생성이 끝난 뒤 호출되므로 SSE 도 끝날 때까지 처리 중으로 집계
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is not None:
+        HTTP_IN_FLIGHT.dec(endpoint=endpoint)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    global saju_model
-    data = request.json
-    name = data.get('name')
-    birth_date = data.get('birth_date')
-    birth_time = data.get('birth_time')
-    is_lunar = data.get('is_lunar', False)
-
-    if not saju_model:
-        # 1. API 키 확인
-        api_key = os.environ.get("GOOGLE_API_KEY")
-        if not api_key:
-            return jsonify({"error": "API 키가 설정되지 않았습니다."}), 500
-        
-        # 2. 사주 데이터 로드 및 캐싱
-        files = load_saju_data_as_files(api_key, "data")
-        if not files:
-            # 학습 데이터가 없을 경우 기본 안내
-            saju_model = genai.GenerativeModel('gemini-1.5-pro-002')
-        else:
-            cache = create_saju_cache(api_key, files)
-            saju_model = genai.GenerativeModel.from_cached_content(cached_content=cache)
-
-    # 3. 사주 분석 요청
-    prompt = f"""
-    사용자 이름: {name}
-    생년월일: {birth_date}
-    태어난 시: {birth_time}
-    음력 여부: {"음력" if is_lunar else "양력"}
+def build_prompt(data):
+    """요청 JSON -> 분석 프롬프트"""
+    return f"""
+    사용자 이름: {data.get('name')}
+    생년월일: {data.get('birth_date')}
+    태어난 시: {data.get('birth_time')}
+    음력 여부: {"음력" if data.get('is_lunar', False) else "양력"}
     
     위 정보를 바탕으로 서비스의 사주 학습 데이터를 참조하여 이 사용자의 전체적인 운세와 성격, 올해의 운을 상세히 풀이해 주세요.
     """
+
+def api_key_missing():
+    return not USE_FAKE_MODEL and not os.environ.get("GOOGLE_API_KEY")
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    # 1. API 키 확인
+    if api_key_missing():
+        return jsonify({"error": "API 키가 설정되지 않았습니다."}), 500
+
+    # 2. 사주 분석 요청
+    prompt = build_prompt(request.json)
     
     try:
-        response = saju_model.generate_content(prompt)
-        return jsonify({"result": response.text})
+        return jsonify({"result": saju_service.analyze_sync(prompt, analysis_type='total')})
+    except Overloaded as e:
+        return jsonify({"error": str(e)}), 503
+    except AnalysisTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
+        count_error('analyze')
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    """웹 서버 프로세스의 운영 지표 + 단계별 구간 시간 히스토그램 (Prometheus 텍스트 형식, 구간 시간은 SAJU_TRACE 설정 시 수집)
+    명식 계산·리포트 캐시는 Streamlit 앱 프로세스에 있으므로 해당 지표는 그 프로세스의 지표 서버(SAJU_METRICS_PORT)에서 조회"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """분석 결과를 Server-Sent Events(chunk / done / error)로 스트리밍"""
+    if api_key_missing():
+        return jsonify({"error": "API 키가 설정되지 않았습니다."}), 500
+
+    prompt = build_prompt(request.json)
+
+    def events():
+        try:
+            for text in saju_service.stream_sync(prompt, analysis_type='total'):
+                yield sse_event("chunk", {"text": text})
+            yield sse_event("done", {})
+        except Exception as e:
+            count_error('analyze_stream')
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,186 @@
+"""
+asgi.py - 사주 풀이 웹 서버 ASGI 진입점 (실행: uvicorn asgi:app --port 5000 또는 python asgi.py)
+
+/analyze, /analyze/stream 은 서버 이벤트 루프에서 AnalysisService 코루틴을 바로 await 하므로
+분석 중인 요청이 작업자 스레드를 차지하지 않습니다 (동시 실행·대기 수는 SAJU_MAX_CONCURRENCY / SAJU_MAX_WAITING).
+나머지 경로(/, /metrics, 정적 파일)는 app.py 의 Flask 앱을 스레드 풀에서 실행하여 그대로 제공합니다.
+"""
+
+import io
+import sys
+import json
+import asyncio
+
+from app import app as flask_app, saju_service, build_prompt, api_key_missing, sse_event
+from backend.serving import Overloaded, AnalysisTimeout
+from backend.metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, count_error
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect': break
+        body += message.get('body', b"")
+        if not message.get('more_body'): break
+    return body
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+    return status
+
+def parse_json(body):
+    """요청 본문 JSON (객체가 아니면 None)"""
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+async def analyze(scope, receive, send):
+    data = parse_json(await read_body(receive))
+    if data is None:
+        return await send_json(send, 400, {"error": "요청 형식이 올바르지 않습니다."})
+    if api_key_missing():
+        return await send_json(send, 500, {"error": "API 키가 설정되지 않았습니다."})
+    try:
+        result = await saju_service.analyze(build_prompt(data), analysis_type='total')
+    except Overloaded as e:
+        return await send_json(send, 503, {"error": str(e)})
+    except AnalysisTimeout as e:
+        return await send_json(send, 504, {"error": str(e)})
+    except Exception as e:
+        count_error('analyze')
+        return await send_json(send, 500, {"error": str(e)})
+    return await send_json(send, 200, {"result": result})
+
+async def _cancel_on_disconnect(receive, task):
+    """클라이언트 연결이 끊기면 스트리밍 작업 취소 (생성 중인 분석도 중단)"""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            task.cancel()
+            return
+
+async def analyze_stream(scope, receive, send):
+    """분석 결과를 Server-Sent Events(chunk / done / error)로 스트리밍"""
+    data = parse_json(await read_body(receive))
+    if data is None:
+        return await send_json(send, 400, {"error": "요청 형식이 올바르지 않습니다."})
+    if api_key_missing():
+        return await send_json(send, 500, {"error": "API 키가 설정되지 않았습니다."})
+
+    async def events():
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        chunks = saju_service.stream(build_prompt(data), analysis_type='total')
+        try:
+            async for text in chunks:
+                await send({'type': 'http.response.body', 'body': sse_event("chunk", {"text": text}).encode('utf-8'),
+                            'more_body': True})
+            payload = sse_event("done", {})
+        except Exception as e:
+            count_error('analyze_stream')
+            payload = sse_event("error", {"error": str(e)})
+        finally:
+            await chunks.aclose()
+        await send({'type': 'http.response.body', 'body': payload.encode('utf-8')})
+
+    task = asyncio.ensure_future(events())
+    watcher = asyncio.ensure_future(_cancel_on_disconnect(receive, task))
+    try:
+        await task
+    except asyncio.CancelledError:
+        if not task.cancelled(): raise
+    finally:
+        watcher.cancel()
+    return 200
+
+def wsgi_environ(scope, body):
+    """ASGI scope -> WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b"").decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+def run_wsgi(environ):
+    """Flask 앱 실행 -> (상태 코드, 헤더, 본문)"""
+    started = {}
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = status, headers
+    result = flask_app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, 'close'): result.close()
+    headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in started['headers']]
+    return int(started['status'].split()[0]), headers, body
+
+async def call_flask(scope, receive, send):
+    body = await read_body(receive)
+    status, headers, content = await asyncio.get_running_loop().run_in_executor(None, run_wsgi, wsgi_environ(scope, body))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': content})
+
+# (메서드, 경로) -> (지표 엔드포인트 이름, 처리 코루틴)
+ROUTES = {
+    ('POST', '/analyze'): ('analyze', analyze),
+    ('POST', '/analyze/stream'): ('analyze_stream', analyze_stream),
+}
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http': return
+    route = ROUTES.get((scope['method'], scope['path']))
+    if route is None:
+        # 요청 수·처리 중 지표는 Flask 요청 훅에서 집계
+        return await call_flask(scope, receive, send)
+    endpoint, handler = route
+    HTTP_IN_FLIGHT.inc(endpoint=endpoint)
+    status = 500
+    try:
+        status = await handler(scope, receive, send)
+    finally:
+        HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+        HTTP_REQUESTS.inc(endpoint=endpoint, status=str(status))
+
+if __name__ == '__main__':
+    import uvicorn
+    from uvicorn.config import LOGGING_CONFIG
+    # --windowed 실행 파일은 콘솔이 없어 sys.stdout 이 None 이므로 uvicorn 기본 로그 설정을 쓰지 않음
+    uvicorn.run(app, host='127.0.0.1', port=5000, log_config=LOGGING_CONFIG if sys.stdout is not None else None)
@@ -0,0 +1,206 @@
+"""
+context_cache.py - 프로세스 공유 Gemini 컨텍스트 캐시 관리
+
+(모델, 시스템 지시문, 파일 구성) 조합마다 살아 있는 CachedContent 하나를 재사용합니다.
+세션마다 같은 캐시를 새로 만들지 않고, 만료 전에 TTL 을 연장하며,
+재생성은 키별 잠금 안에서만 일어나므로 동시 세션이 경쟁적으로 캐시를 만들지 않습니다.
+"""
+
+import time
+import hashlib
+import datetime
+import threading
+
+from backend.tracing import span
+from backend.metrics import CONTEXT_CACHE, count_error
+
+DEFAULT_TTL = datetime.timedelta(minutes=30)
+# 만료까지 이 시간보다 적게 남으면 TTL 연장
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+def _file_id(handle):
+    """업로드 파일 핸들의 원격 이름 (genai File 객체 또는 dict)"""
+    if isinstance(handle, dict): return handle.get('name') or handle.get('uri')
+    return getattr(handle, 'name', None) or getattr(handle, 'uri', None) or str(handle)
+
+def make_cache_key(model, system_instruction, contents):
+    """(모델, 시스템 지시문 해시, 파일 구성 해시) 캐시 키"""
+    instr_hash = hashlib.sha256((system_instruction or '').encode('utf-8')).hexdigest()
+    files_hash = hashlib.sha256('\n'.join(sorted(str(_file_id(c)) for c in contents)).encode('utf-8')).hexdigest()
+    return (model, instr_hash, files_hash)
+
+class GeminiCacheBackend:
+    """google.generativeai caching.CachedContent 어댑터"""
+    def create(self, model, display_name, system_instruction, contents, ttl):
+        from google.generativeai import caching
+        cache = caching.CachedContent.create(
+            model=model,
+            display_name=display_name,
+            system_instruction=system_instruction,
+            contents=contents,
+            ttl=ttl,
+        )
+        return cache, self._expires_at(cache, ttl)
+
+    def refresh(self, cache, ttl):
+        cache.update(ttl=ttl)
+        return self._expires_at(cache, ttl)
+
+    def find(self, model, display_name):
+        """다른 프로세스가 만든 같은 이름의 살아 있는 캐시 조회"""
+        from google.generativeai import caching
+        for cache in caching.CachedContent.list():
+            if cache.display_name == display_name and cache.model == model:
+                return cache, self._expires_at(cache, None)
+        return None
+
+    def make_model(self, cache):
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(cached_content=cache)
+
+    def delete(self, cache):
+        cache.delete()
+
+    def _expires_at(self, cache, ttl):
+        expire_time = getattr(cache, 'expire_time', None)
+        if expire_time is not None:
+            return expire_time.timestamp()
+        return time.time() + (ttl or DEFAULT_TTL).total_seconds()
+
+class LocalStubCacheBackend:
+    """네트워크 없이 동작하는 캐시 백엔드 대역 (생성·연장 호출 횟수 기록)"""
+    def __init__(self):
+        self.caches = {}
+        self.create_count = 0
+        self.refresh_count = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, display_name, system_instruction, contents, ttl):
+        with self._lock:
+            self.create_count += 1
+            cache = {'name': f"cachedContents/stub-{self.create_count}", 'model': model,
+                     'display_name': display_name, 'system_instruction': system_instruction,
+                     'contents': list(contents), 'expires_at': time.time() + ttl.total_seconds()}
+            self.caches[cache['name']] = cache
+        return cache, cache['expires_at']
+
+    def refresh(self, cache, ttl):
+        with self._lock:
+            if cache['name'] not in self.caches:
+                raise KeyError(cache['name'])
+            self.refresh_count += 1
+            cache['expires_at'] = time.time() + ttl.total_seconds()
+        return cache['expires_at']
+
+    def find(self, model, display_name):
+        now = time.time()
+        for cache in self.caches.values():
+            if cache['display_name'] == display_name and cache['model'] == model and cache['expires_at'] > now:
+                return cache, cache['expires_at']
+        return None
+
+    def make_model(self, cache):
+        return cache
+
+    def delete(self, cache):
+        with self._lock:
+            self.caches.pop(cache['name'], None)
+
+class ContextCacheManager:
+    """키별 단일 CachedContent 관리자"""
+    def __init__(self, backend=None, ttl=DEFAULT_TTL, refresh_margin=REFRESH_MARGIN):
+        self.backend = backend or GeminiCacheBackend()
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_cache(self, model, system_instruction, contents, display_name='saju_kb_cache', ttl=None):
+        """살아 있는 캐시 반환 (없거나 만료되었으면 생성, 만료 임박 시 TTL 연장)"""
+        ttl = ttl or self.ttl
+        key = make_cache_key(model, system_instruction, contents)
+        # 같은 구성이면 다른 프로세스도 같은 이름을 쓰도록 키 해시를 이름에 포함
+        full_name = f"{display_name}-{hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:12]}"
+        margin = self.refresh_margin.total_seconds()
+
+        entry = self._entries.get(key)
+        if entry and entry[0] - margin > time.time():
+            CONTEXT_CACHE.inc(result='reuse')
+            return entry[1]
+
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry and entry[0] - margin > now:
+                CONTEXT_CACHE.inc(result='reuse')
+                return entry[1]
+
+            cache = expires_at = None
+            if entry and entry[0] > now:
+                try:
+                    with span('llm.cache_refresh'):
+                        cache, expires_at = entry[1], self.backend.refresh(entry[1], ttl)
+                    CONTEXT_CACHE.inc(result='refresh')
+                except Exception:
+                    count_error('llm.cache_refresh')
+                    cache = None
+            if cache is None:
+                try:
+                    with span('llm.cache_find'):
+                        found = self.backend.find(model, full_name)
+                except Exception:
+                    count_error('llm.cache_find')
+                    found = None
+                if found and found[1] - margin > now:
+                    cache, expires_at = found
+                    CONTEXT_CACHE.inc(result='found')
+            if cache is None:
+                try:
+                    with span('llm.cache_create', files=len(contents)):
+                        cache, expires_at = self.backend.create(model, full_name, system_instruction, contents, ttl)
+                except Exception:
+                    count_error('llm.cache_create')
+                    raise
+                CONTEXT_CACHE.inc(result='create')
+            self._entries[key] = (expires_at, cache, frozenset(str(_file_id(c)) for c in contents))
+            return cache
+
+    def get_model(self, model, system_instruction, contents, display_name='saju_kb_cache', ttl=None):
+        """캐시 기반 GenerativeModel (캐시 생성 실패 시 예외 전달)"""
+        return self.backend.make_model(self.get_cache(model, system_instruction, contents, display_name, ttl))
+
+    def evict_files(self, file_ids):
+        """지정한 원격 파일을 포함하는 캐시를 삭제 (자료 삭제 시). 삭제한 캐시 수 반환"""
+        file_ids = {str(f) for f in file_ids}
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if entry[2] & file_ids]
+            evicted = [self._entries.pop(k) for k in keys]
+        for entry in evicted:
+            try:
+                self.backend.delete(entry[1])
+            except Exception:
+                pass
+        return len(evicted)
+
+    def invalidate(self, model=None):
+        """보관 중인 항목 제거 (model 지정 시 해당 모델만)"""
+        with self._lock:
+            for key in [k for k in self._entries if model is None or k[0] == model]:
+                del self._entries[key]
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_context_cache_manager():
+    """프로세스 전역 관리자 (Gemini 백엔드)"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ContextCacheManager()
+    return _manager
@@ -6,30 +6,22 @@ Gemini API Context Cache에 등록하는 역할을 합니다.
 """
 
 import os
-import glob
 import datetime
-import google.generativeai as genai
-from google.generativeai import caching
+from backend.context_cache import get_context_cache_manager
+from backend.ingest import sync_knowledge_base
+from saju_warmup import lazy_import
 
-def load_saju_data_as_files(api_key, data_dir="data"):
-    """data 디렉토리의 모든 파일(PDF 포함)을 Gemini API에 업로드합니다."""
-    genai.configure(api_key=api_key)
-    uploaded_files = []
-    
-    # 지원하는 확장자
-    extensions = ['*.pdf', '*.txt', '*.md']
-    
-    for ext in extensions:
-        for filepath in glob.glob(os.path.join(data_dir, ext)):
-            print(f"파일 업로드 중: {os.path.basename(filepath)}...")
-            try:
-                # Gemini File API를 사용하여 파일 업로드
-                file = genai.upload_file(path=filepath, display_name=os.path.basename(filepath))
-                uploaded_files.append(file)
-            except Exception as e:
-                print(f"파일 업로드 실패 ({filepath}): {e}")
+genai = lazy_import('google.generativeai')
+
+def load_saju_data_as_files(api_key, data_dir="data", registry=None):
+    """data 디렉토리의 모든 파일(PDF 포함)을 Gemini API에 업로드합니다.
     
-    return uploaded_files
+    매니페스트(backend/ingest.py)로 추가·변경된 자료만 업로드·색인하고, 삭제된 자료는
+    원격 파일과 컨텍스트 캐시, 로컬 검색 색인에서 제거합니다.
+    """
+    genai.configure(api_key=api_key)
+    result = sync_knowledge_base(data_dir, registry=registry, cache_manager=get_context_cache_manager())
+    return result['handles']
 
 def create_saju_cache(api_key, uploaded_files):
     """업로드된 파일들을 사용하여 Gemini API Context Cache를 생성합니다."""
@@ -37,17 +29,17 @@ def create_saju_cache(api_key, uploaded_files):
     
     print(f"{len(uploaded_files)}개의 파일을 바탕으로 지식 저장소 구축 중...")
     
-    # 캐시 생성
-    cache = caching.CachedContent.create(
-        model='models/gemini-1.5-pro-002',
-        display_name='saju_advanced_kb',
-        system_instruction=(
+    # 캐시 생성 (같은 모델·지시문·파일 구성이면 프로세스 공유 캐시 재사용)
+    cache = get_context_cache_manager().get_cache(
+        'models/gemini-1.5-pro-002',
+        (
             "당신은 사주팔자 및 명리학의 대가입니다. "
             "업로드된 사주 원전(PDF 등) 및 학습 데이터를 완벽히 숙지하고 있습니다. "
             "사용자의 생년월일시 정보를 받으면, 학습된 정통 명리학 이론에 근거하여 "
             "성격, 대운, 세운, 그리고 조언을 매우 상세하고 전문적으로 풀이해 주세요."
         ),
-        contents=uploaded_files,
+        uploaded_files,
+        display_name='saju_advanced_kb',
         ttl=datetime.timedelta(minutes=60),
     )
     
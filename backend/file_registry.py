@@ -0,0 +1,200 @@
+"""
+file_registry.py - 지식 파일 업로드 레지스트리
+
+data/ 의 학습 파일을 내용 해시(SHA-256) 기준으로 Gemini File API 핸들과 매핑하여
+SQLite 파일에 보관합니다. 내용이 바뀌었거나 원격 핸들이 만료된 파일만 다시 업로드하며,
+Flask(app.py)와 Streamlit(streamlit_app.py)이 같은 레지스트리 파일을 공유합니다.
+"""
+
+import os
+import glob
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from backend.tracing import span
+from backend.metrics import FILE_UPLOADS, count_error
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REGISTRY_PATH = os.environ.get(
+    "SAJU_FILE_REGISTRY", os.path.join(PROJECT_ROOT, "cache", "file_registry.sqlite3"))
+KNOWLEDGE_EXTENSIONS = ['*.pdf', '*.txt', '*.md']
+
+# Gemini File API 업로드 파일은 48시간 뒤 삭제됨. 만료 1시간 전부터는 재업로드 대상으로 취급
+DEFAULT_FILE_TTL = 48 * 60 * 60
+EXPIRY_MARGIN = 60 * 60
+
+def list_knowledge_files(data_dir="data"):
+    """data 디렉토리의 학습 파일 목록 (확장자 순서, 파일명 정렬)"""
+    paths = []
+    for ext in KNOWLEDGE_EXTENSIONS:
+        paths.extend(sorted(glob.glob(os.path.join(data_dir, ext))))
+    return paths
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class GeminiFileAPI:
+    """google.generativeai File API 어댑터"""
+    def upload(self, path, display_name):
+        import google.generativeai as genai
+        file = genai.upload_file(path=path, display_name=display_name)
+        expiration = getattr(file, 'expiration_time', None)
+        expires_at = expiration.timestamp() if expiration else time.time() + DEFAULT_FILE_TTL
+        return file, {'name': file.name, 'uri': getattr(file, 'uri', None), 'expires_at': expires_at}
+
+    def get(self, name):
+        import google.generativeai as genai
+        return genai.get_file(name)
+
+    def delete(self, name):
+        import google.generativeai as genai
+        genai.delete_file(name)
+
+class LocalFakeFileAPI:
+    """네트워크 없이 동작하는 File API 대역 (개발·점검용, 업로드 호출 횟수 기록)"""
+    def __init__(self, ttl=DEFAULT_FILE_TTL):
+        self.ttl = ttl
+        self.files = {}
+        self.upload_count = 0
+
+    def upload(self, path, display_name):
+        self.upload_count += 1
+        name = f"files/fake-{self.upload_count}"
+        handle = {'name': name, 'display_name': display_name, 'uri': f"fake://{name}"}
+        self.files[name] = handle
+        return handle, {'name': name, 'uri': handle['uri'], 'expires_at': time.time() + self.ttl}
+
+    def get(self, name):
+        if name not in self.files:
+            raise KeyError(name)
+        return self.files[name]
+
+    def delete(self, name):
+        self.files.pop(name, None)
+
+class FileRegistry:
+    """SHA-256 -> 원격 파일 핸들 매핑 (SQLite, 프로세스 간 공유)"""
+    def __init__(self, path=DEFAULT_REGISTRY_PATH, api=None, expiry_margin=EXPIRY_MARGIN):
+        self.path = path
+        self.api = api or GeminiFileAPI()
+        self.expiry_margin = expiry_margin
+        self._handles = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " sha256 TEXT PRIMARY KEY, display_name TEXT, remote_name TEXT NOT NULL,"
+                " uri TEXT, expires_at REAL NOT NULL, uploaded_at REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _is_fresh(self, expires_at):
+        return expires_at - self.expiry_margin > time.time()
+
+    def lookup(self, sha256):
+        """레지스트리 항목 (없으면 None)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sha256, display_name, remote_name, uri, expires_at, uploaded_at FROM files WHERE sha256 = ?",
+                (sha256,)).fetchone()
+        if not row: return None
+        keys = ['sha256', 'display_name', 'remote_name', 'uri', 'expires_at', 'uploaded_at']
+        return dict(zip(keys, row))
+
+    def _record(self, sha256, display_name, meta):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (sha256, display_name, remote_name, uri, expires_at, uploaded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (sha256, display_name, meta['name'], meta.get('uri'), meta['expires_at'], time.time()))
+
+    def entries(self):
+        """등록된 전체 항목 {sha256: 항목}"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT sha256, display_name, remote_name, uri, expires_at, uploaded_at FROM files").fetchall()
+        keys = ['sha256', 'display_name', 'remote_name', 'uri', 'expires_at', 'uploaded_at']
+        return {row[0]: dict(zip(keys, row)) for row in rows}
+
+    def evict(self, sha256):
+        """항목 제거 및 원격 파일 삭제 (이미 만료·삭제된 원격 파일은 무시). 제거된 원격 이름 반환"""
+        entry = self.lookup(sha256)
+        if not entry: return None
+        try:
+            self.api.delete(entry['remote_name'])
+        except Exception:
+            pass
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE sha256 = ?", (sha256,))
+        with self._lock:
+            self._handles.pop(sha256, None)
+        return entry['remote_name']
+
+    def ensure_uploaded(self, path, sha256=None):
+        """파일 하나의 원격 핸들 반환 (내용 변경·만료·원격 삭제 시에만 업로드, sha256 을 알면 재계산 생략)"""
+        sha = sha256 or file_sha256(path)
+        display_name = os.path.basename(path)
+        with self._lock:
+            cached = self._handles.get(sha)
+            if cached and self._is_fresh(cached[0]):
+                FILE_UPLOADS.inc(result='reused')
+                return cached[1]
+
+            entry = self.lookup(sha)
+            handle = None
+            if entry and self._is_fresh(entry['expires_at']):
+                try:
+                    handle = self.api.get(entry['remote_name'])
+                    expires_at = entry['expires_at']
+                    FILE_UPLOADS.inc(result='reused')
+                except Exception:
+                    handle = None
+            if handle is None:
+                with span('llm.upload_file', file=display_name):
+                    handle, meta = self.api.upload(path, display_name)
+                expires_at = meta['expires_at']
+                self._record(sha, display_name, meta)
+                FILE_UPLOADS.inc(result='uploaded')
+            self._handles[sha] = (expires_at, handle)
+            return handle
+
+    def ensure_all(self, paths, hashes=None):
+        """여러 파일의 원격 핸들 목록 (실패한 파일은 건너뜀, hashes: 경로 -> sha256)"""
+        handles = []
+        for path in paths:
+            try:
+                handles.append(self.ensure_uploaded(path, (hashes or {}).get(path)))
+            except Exception as e:
+                FILE_UPLOADS.inc(result='failed')
+                count_error('llm.upload_file')
+                print(f"파일 업로드 실패 ({path}): {e}")
+        return handles
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_file_registry():
+    """프로세스 전역 레지스트리 (기본 경로, Gemini File API)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = FileRegistry()
+    return _registry
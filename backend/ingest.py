@@ -0,0 +1,131 @@
+"""
+ingest.py - 지식 자료 증분 반영
+
+data/ 의 파일별 수정 시각·크기·해시를 매니페스트에 기록해 두고, 추가·변경된 자료만
+본문 추출·분할·색인·업로드하며, 삭제된 자료는 로컬 색인과 원격 파일·컨텍스트 캐시에서 제거합니다.
+수정 시각과 크기가 그대로인 파일은 해시도 다시 계산하지 않습니다.
+
+실행 (프로젝트 루트에서): python -m backend.ingest [data 디렉토리] [--upload]
+"""
+
+import os
+import sys
+import json
+import threading
+
+from backend.file_registry import file_sha256, list_knowledge_files
+from backend.knowledge_index import PROJECT_ROOT, DEFAULT_INDEX_PATH, KnowledgeIndex, set_knowledge_index
+
+DEFAULT_MANIFEST_PATH = os.environ.get(
+    "SAJU_INGEST_MANIFEST", os.path.join(PROJECT_ROOT, "cache", "ingest_manifest.json"))
+
+_sync_lock = threading.Lock()
+
+def load_manifest(path=DEFAULT_MANIFEST_PATH):
+    """매니페스트 {파일명: {'size', 'mtime', 'sha256'}} (없거나 손상되었으면 빈 dict)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(files, path=DEFAULT_MANIFEST_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'files': files}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def scan_files(data_dir="data", manifest=None):
+    """현재 자료 상태 {파일명: {'path', 'size', 'mtime', 'sha256'}} (크기·수정 시각이 같으면 기존 해시 재사용)"""
+    manifest = manifest or {}
+    current = {}
+    for path in list_knowledge_files(data_dir):
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        prev = manifest.get(name)
+        if prev and prev.get('size') == stat.st_size and prev.get('mtime') == stat.st_mtime and prev.get('sha256'):
+            sha = prev['sha256']
+        else:
+            sha = file_sha256(path)
+        current[name] = {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha}
+    return current
+
+def diff_files(previous, current):
+    """{파일명: sha256} 두 상태 비교 -> (추가, 변경, 삭제, 유지) 파일명 목록"""
+    added = sorted(n for n in current if n not in previous)
+    modified = sorted(n for n in current if n in previous and previous[n] != current[n])
+    deleted = sorted(n for n in previous if n not in current)
+    unchanged = sorted(n for n in current if previous.get(n) == current[n])
+    return added, modified, deleted, unchanged
+
+def sync_index(current, index_path=DEFAULT_INDEX_PATH):
+    """로컬 검색 색인에 추가·변경·삭제분만 반영하고 저장. 변경 내역 반환"""
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = KnowledgeIndex.load(index_path)
+        except Exception as e:
+            print(f"지식 색인 로드 실패, 새로 생성합니다: {e}")
+    index = index or KnowledgeIndex()
+
+    indexed = {name: meta.get('sha256') for name, meta in index.sources.items()}
+    added, modified, deleted, unchanged = diff_files(indexed, {n: m['sha256'] for n, m in current.items()})
+    for name in deleted:
+        index.remove_source(name)
+    for name in added + modified:
+        try:
+            index.add_source(current[name]['path'], sha256=current[name]['sha256'])
+        except Exception as e:
+            # 추출 실패 자료는 색인에서 빼 두고 다음 반영 때 다시 시도
+            index.remove_source(name)
+            print(f"본문 추출 실패 ({name}): {e}")
+    if added or modified or deleted:
+        index.save(index_path)
+    set_knowledge_index(index)
+    return {'added': added, 'modified': modified, 'deleted': deleted, 'unchanged': unchanged}
+
+def sync_uploads(current, registry, cache_manager=None):
+    """원격 업로드 동기화: 추가·변경 자료만 업로드, 사라진 자료는 원격 파일과 이를 포함한 컨텍스트 캐시 삭제.
+    현재 자료 전체의 원격 핸들 목록과 변경 내역 반환"""
+    current_shas = {meta['sha256'] for meta in current.values()}
+    registered = registry.entries()
+    evicted = []
+    for sha, entry in registered.items():
+        if sha not in current_shas:
+            remote_name = registry.evict(sha)
+            if remote_name: evicted.append(remote_name)
+    if evicted and cache_manager is not None:
+        cache_manager.evict_files(evicted)
+
+    paths = [meta['path'] for meta in current.values()]
+    handles = registry.ensure_all(paths, hashes={meta['path']: meta['sha256'] for meta in current.values()})
+    uploaded = sorted(n for n, meta in current.items() if meta['sha256'] not in registered)
+    return handles, {'uploaded': uploaded, 'evicted': evicted}
+
+def sync_knowledge_base(data_dir="data", registry=None, cache_manager=None, upload=True, index=True,
+                        manifest_path=DEFAULT_MANIFEST_PATH, index_path=DEFAULT_INDEX_PATH):
+    """매니페스트 기준 증분 반영 (색인·업로드). {'handles', 'index', 'uploads'} 반환"""
+    with _sync_lock:
+        current = scan_files(data_dir, load_manifest(manifest_path))
+        result = {'handles': [], 'index': None, 'uploads': None}
+        if index:
+            result['index'] = sync_index(current, index_path)
+        if upload:
+            if registry is None:
+                from backend.file_registry import get_file_registry
+                registry = get_file_registry()
+            result['handles'], result['uploads'] = sync_uploads(current, registry, cache_manager)
+        save_manifest({n: {k: m[k] for k in ('size', 'mtime', 'sha256')} for n, m in current.items()}, manifest_path)
+        return result
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    data_dir = args[0] if args else os.path.join(PROJECT_ROOT, "data")
+    result = sync_knowledge_base(data_dir, upload='--upload' in sys.argv)
+    changes = result['index']
+    print(f"색인 반영: 추가 {len(changes['added'])}, 변경 {len(changes['modified'])}, "
+          f"삭제 {len(changes['deleted'])}, 유지 {len(changes['unchanged'])}")
+    if result['uploads']:
+        print(f"업로드 {len(result['uploads']['uploaded'])}건, 원격 삭제 {len(result['uploads']['evicted'])}건")
@@ -0,0 +1,257 @@
+"""
+knowledge_index.py - data/ 학습 자료 로컬 검색 색인 (BM25)
+
+PDF·텍스트 자료에서 본문을 한 번 추출해 문단 단위로 나누고 BM25 역색인을 만들어 디스크에 저장합니다.
+분석 요청 시 전체 파일 대신 명식의 십성·신살·관계 등과 관련된 상위 k개 문단만 프롬프트에 첨부합니다.
+
+전체 색인 재생성 (프로젝트 루트에서): python -m backend.knowledge_index [data 디렉토리]
+변경분만 반영: python -m backend.ingest (backend/ingest.py 참고)
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import math
+import threading
+from collections import Counter
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INDEX_PATH = os.environ.get(
+    "SAJU_KNOWLEDGE_INDEX", os.path.join(PROJECT_ROOT, "cache", "knowledge_index.json.gz"))
+INDEX_VERSION = 3
+
+CHUNK_SIZE = 700       # 문단 묶음 최대 글자 수
+CHUNK_OVERLAP = 120    # 이웃 문단과 겹치는 글자 수
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[0-9A-Za-z]+|[가-힣]+|[一-鿿]+")
+
+def tokenize(text):
+    """검색 토큰 (한글은 2글자 단위, 한자는 1글자와 2글자 단위, 영숫자는 단어)"""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        if '一' <= word[0] <= '鿿':
+            tokens.extend(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        elif '가' <= word[0] <= '힣' and len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+def extract_text(path):
+    """파일 본문 추출 (PDF 는 pypdf 필요)"""
+    if path.lower().endswith('.pdf'):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError("pypdf 가 설치되어 있지 않아 PDF 본문을 추출할 수 없습니다.")
+        reader = PdfReader(path)
+        return "\n".join((page.extract_text() or "") for page in reader.pages)
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """빈 줄·줄바꿈 기준 문단을 size 글자 이내로 묶고, 앞 묶음의 끝 overlap 글자를 이어 붙임
+    (이어 붙이면 size 를 넘는 문단은 겹침 없이 새 묶음으로 시작)"""
+    paragraphs = [" ".join(p.split()) for p in re.split(r"\n\s*\n|\n(?=\s*(?:>>|\d+\.|[①-⑳▪•*-]))", text)]
+    chunks, current = [], ""
+    for para in filter(None, paragraphs):
+        while len(para) > size:
+            head, para = para[:size], para[size - overlap:]
+            if current: chunks.append(current); current = ""
+            chunks.append(head)
+        if current and len(current) + len(para) + 1 > size:
+            chunks.append(current)
+            carry = overlap and len(para) + overlap + 1 <= size
+            current = current[-overlap:] + " " + para if carry else para
+        else:
+            current = f"{current} {para}".strip()
+    if current: chunks.append(current)
+    return chunks
+
+class KnowledgeIndex:
+    """BM25 역색인 (문단 목록 + 토큰별 (문단 번호, 빈도) 목록, 자료 단위 추가·삭제 지원)"""
+    def __init__(self, passages=None, postings=None, doc_lengths=None, sources=None):
+        self.passages = passages or []
+        self.sources = sources or {}
+        self.postings = postings or {}
+        self.doc_lengths = doc_lengths or []
+        self._refresh_stats()
+
+    def _refresh_stats(self):
+        live = [n for p, n in zip(self.passages, self.doc_lengths) if p is not None]
+        self.live_count = len(live)
+        self.avg_length = (sum(live) / len(live)) if live else 0.0
+
+    @classmethod
+    def build(cls, paths):
+        """파일 목록 -> 색인 (sources: 파일명 -> 크기·수정 시각·해시·문단 수)"""
+        from backend.file_registry import file_sha256
+        index = cls()
+        for path in paths:
+            try:
+                index.add_source(path, sha256=file_sha256(path))
+            except Exception as e:
+                print(f"본문 추출 실패 ({path}): {e}")
+        return index
+
+    @classmethod
+    def from_passages(cls, passages, sources=None):
+        index = cls(sources=sources)
+        index._add_passages(passages)
+        index._refresh_stats()
+        return index
+
+    def _add_passages(self, passages):
+        for passage in passages:
+            doc_id = len(self.passages)
+            counts = Counter(tokenize(passage['text']))
+            self.passages.append(passage)
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+
+    def add_source(self, path, sha256=None, meta=None):
+        """자료 하나를 추출·분할하여 추가 (같은 이름이 있으면 먼저 제거)"""
+        name = os.path.basename(path)
+        chunks = chunk_text(extract_text(path))
+        self.remove_source(name)
+        stat = os.stat(path)
+        self._add_passages({'source': name, 'text': chunk} for chunk in chunks)
+        self.sources[name] = dict(meta or {}, size=stat.st_size, mtime=stat.st_mtime, sha256=sha256, chunks=len(chunks))
+        self._refresh_stats()
+
+    def remove_source(self, name):
+        """자료 하나의 문단을 색인에서 제거 (해당 문단의 용어만 다시 토큰화, 문단 번호는 save 시 정리)"""
+        if name not in self.sources: return
+        removed = [i for i, p in enumerate(self.passages) if p is not None and p['source'] == name]
+        removed_set = set(removed)
+        for term in {t for i in removed for t in tokenize(self.passages[i]['text'])}:
+            posting = [p for p in self.postings.get(term, []) if p[0] not in removed_set]
+            if posting: self.postings[term] = posting
+            else: self.postings.pop(term, None)
+        for i in removed:
+            self.passages[i] = None
+            self.doc_lengths[i] = 0
+        del self.sources[name]
+        self._refresh_stats()
+
+    def compact(self):
+        """삭제된 문단 자리를 없애고 문단 번호를 다시 매김"""
+        if self.live_count == len(self.passages): return
+        remap, passages, lengths = {}, [], []
+        for old_id, passage in enumerate(self.passages):
+            if passage is None: continue
+            remap[old_id] = len(passages)
+            passages.append(passage)
+            lengths.append(self.doc_lengths[old_id])
+        self.postings = {term: [(remap[d], tf) for d, tf in plist] for term, plist in self.postings.items()}
+        self.passages, self.doc_lengths = passages, lengths
+        self._refresh_stats()
+
+    def search(self, query, k=5):
+        """질의(문자열 또는 용어 목록)와 관련된 상위 k개 문단 [{'source', 'text', 'score'}]"""
+        terms = tokenize(" ".join(query) if isinstance(query, (list, tuple, set)) else query)
+        if not terms or not self.live_count: return []
+        n = self.live_count
+        scores = {}
+        for term, qtf in Counter(terms).items():
+            posting = self.postings.get(term)
+            if not posting: continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + qtf * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        top = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        return [dict(self.passages[doc_id], score=round(score, 4)) for doc_id, score in top]
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        self.compact()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = {'version': INDEX_VERSION, 'sources': self.sources, 'passages': self.passages,
+                   'postings': self.postings, 'doc_lengths': self.doc_lengths}
+        tmp = path + ".tmp"
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('version') != INDEX_VERSION:
+            raise ValueError("색인 버전이 다릅니다. 색인을 다시 생성하세요.")
+        postings = {term: [tuple(p) for p in plist] for term, plist in payload['postings'].items()}
+        return cls(payload['passages'], postings, payload['doc_lengths'], payload.get('sources'))
+
+def build_index(data_dir="data", path=DEFAULT_INDEX_PATH):
+    """data 디렉토리 전체로 색인 생성 후 저장"""
+    from backend.file_registry import list_knowledge_files
+    index = KnowledgeIndex.build(list_knowledge_files(data_dir))
+    index.save(path)
+    return index
+
+_index = None
+_index_lock = threading.Lock()
+
+def set_knowledge_index(index):
+    """프로세스 전역 색인 교체 (증분 반영 후 호출)"""
+    global _index
+    with _index_lock:
+        _index = index
+
+def get_knowledge_index(path=DEFAULT_INDEX_PATH):
+    """디스크의 색인 (없거나 읽을 수 없으면 None, 프로세스 전역 캐시)"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None and os.path.exists(path):
+                try:
+                    _index = KnowledgeIndex.load(path)
+                except Exception as e:
+                    print(f"지식 색인 로드 실패: {e}")
+    return _index
+
+# 관계 표기(예: '년-시 합', '월형') -> 자료에서 쓰는 검색어
+RELATION_TERMS = {'천간충': '천간충 沖', '천간합': '천간합 合', '원진': '원진', '귀문': '귀문',
+                  '충': '충 沖', '합': '합 合', '형': '형 刑', '파': '파 破', '해': '해 害'}
+
+def _relation_terms(label):
+    for key, terms in RELATION_TERMS.items():
+        if label.endswith(key): return terms
+    return ''
+
+def build_chart_query(data, *lucks):
+    """명식·선택 운에서 검색어 추출 (십성, 12운성, 신살, 관계, 공망 등, 중복 제거)"""
+    terms = []
+    pillars = data.get('pillars', {})
+    for p in ['year', 'month', 'day', 'hour']:
+        terms.append(pillars.get(p, {}).get('pillar', ''))
+    terms.extend((data.get('ten_gods') or {}).values())
+    terms.extend((data.get('jiji_ten_gods') or {}).values())
+    terms.extend((data.get('twelve_growth') or {}).values())
+    for detail in (data.get('sinsal_details') or {}).values():
+        terms.extend(detail.get('sinsal', '').split(','))
+    terms.extend(_relation_terms(r) for r in (data.get('relations') or []))
+    for luck in lucks:
+        if not luck: continue
+        terms.extend([luck.get('ganzhi', ''), luck.get('stem_ten_god', ''), luck.get('branch_ten_god', ''),
+                      luck.get('twelve_growth', '')])
+        terms.extend(luck.get('sinsal', '').split(','))
+        terms.extend(_relation_terms(r) for r in luck.get('relations', '').split(','))
+    return list(dict.fromkeys(t.strip() for t in terms if t and t.strip() not in ('-', '본인')))
+
+def format_passages(passages):
+    """검색 결과 -> 프롬프트 첨부용 텍스트"""
+    return "\n\n".join(f"[{p['source']}] {p['text']}" for p in passages)
+
+if __name__ == "__main__":
+    sys.path.insert(0, PROJECT_ROOT)
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PROJECT_ROOT, "data")
+    index = build_index(data_dir)
+    print(f"색인 생성 완료: 문단 {len(index.passages)}개, 용어 {len(index.postings)}개 -> {DEFAULT_INDEX_PATH}")
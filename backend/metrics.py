@@ -0,0 +1,288 @@
+"""
+metrics.py - 운영 지표 (Prometheus 텍스트 형식)
+
+스레드 안전 카운터·게이지·히스토그램 레지스트리와, 조회 시점에 값을 읽어 오는 수집기(collector)를 제공합니다.
+- 요청 처리 중 수, LLM 지연 시간·토큰 수(분석 유형별), 컨텍스트 캐시 생성/재사용, 파일 업로드, 단계별 오류 수
+- 명식 캐시·리포트 캐시 적중률은 수집기로 읽음 (해당 모듈이 이미 로드된 경우만, 지표 조회가 무거운 import 를 일으키지 않도록)
+출력: render_metrics() (backend/tracing.py 의 단계별 구간 히스토그램과 함께 노출)
+- Flask 웹 서버: /metrics 경로
+- Streamlit 앱 등 /metrics 경로가 없는 프로세스: start_metrics_server() 로 별도 포트에서 노출
+  (SAJU_METRICS_PORT 를 지정한 경우만, 예: 9464. 기본 주소 127.0.0.1, 외부 노출은 SAJU_METRICS_ADDR 로 지정)
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.tracing import Histogram, DEFAULT_BUCKETS, render_prometheus
+
+METRICS_PORT = int(os.environ.get("SAJU_METRICS_PORT") or 0)
+METRICS_ADDR = os.environ.get("SAJU_METRICS_ADDR", "127.0.0.1")
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# LLM 응답 시간 구간 경계 (초)
+LLM_BUCKETS = (0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    """{'a': 1} -> '{a="1"}' (라벨이 없으면 빈 문자열)"""
+    if not labels: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """라벨 조합별 값 보관 (라벨 순서는 labelnames 기준)"""
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 라벨이 맞지 않습니다: {sorted(labels)} (필요: {list(self.labelnames)})")
+        return tuple((k, labels[k]) for k in self.labelnames)
+
+    def samples(self):
+        """[(이름 접미사, 라벨 튜플, 값)]"""
+        with self._lock:
+            return [("", key, value) for key, value in sorted(self._values.items())]
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class HistogramMetric(_Metric):
+    """라벨 조합별 고정 구간 히스토그램 (분위수 추정 지원)"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            hist = self._values.get(key)
+            if hist is None:
+                hist = self._values[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    def quantile(self, q, **labels):
+        with self._lock:
+            hist = self._values.get(self._key(labels))
+            return hist.quantile(q) if hist else 0.0
+
+    def value(self, **labels):
+        with self._lock:
+            hist = self._values.get(self._key(labels))
+            return hist.count if hist else 0
+
+    def samples(self):
+        res = []
+        with self._lock:
+            for key, h in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    res.append(("_bucket", key + (('le', f"{bound:g}"),), cumulative))
+                res.append(("_bucket", key + (('le', "+Inf"),), h.count))
+                res.append(("_sum", key, round(h.sum, 6)))
+                res.append(("_count", key, h.count))
+        return res
+
+class MetricsRegistry:
+    """지표 등록·출력 (같은 이름을 다시 등록하면 기존 지표 반환)"""
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(HistogramMetric, name, help_text, labelnames, buckets=buckets)
+
+    def register_collector(self, collector):
+        """조회 시점에 호출되는 수집기 등록. collector() -> [(이름, 종류, 설명, [(라벨 dict, 값)])]"""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self):
+        """Prometheus 텍스트 형식 출력"""
+        lines = []
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        for metric in metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += [f"{metric.name}{suffix}{format_labels(key)} {_format_value(value)}"
+                      for suffix, key, value in metric.samples()]
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"지표 수집 실패 ({getattr(collector, '__name__', collector)}): {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{format_labels(sorted(labels.items()))} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+# 프로세스 전역 레지스트리와 기본 지표
+registry = MetricsRegistry()
+
+HTTP_IN_FLIGHT = registry.gauge('saju_http_requests_in_flight', "처리 중인 HTTP 요청 수", ('endpoint',))
+HTTP_REQUESTS = registry.counter('saju_http_requests_total', "HTTP 요청 수", ('endpoint', 'status'))
+LLM_LATENCY = registry.histogram('saju_llm_latency_seconds', "LLM 응답 완료까지 걸린 시간",
+                                 ('analysis_type', 'mode'), buckets=LLM_BUCKETS)
+LLM_TOKENS = registry.counter('saju_llm_tokens_total', "LLM 토큰 수 (prompt / output / cached)", ('analysis_type', 'kind'))
+CONTEXT_CACHE = registry.counter('saju_context_cache_total', "컨텍스트 캐시 조회 결과 (reuse / refresh / found / create)", ('result',))
+FILE_UPLOADS = registry.counter('saju_file_uploads_total', "학습 파일 처리 결과 (uploaded / reused / failed)", ('result',))
+ERRORS = registry.counter('saju_errors_total', "단계별 오류 수", ('stage',))
+
+def count_error(stage):
+    ERRORS.inc(stage=stage)
+
+# usage_metadata 필드 -> 토큰 종류
+_USAGE_FIELDS = (('prompt_token_count', 'prompt'), ('candidates_token_count', 'output'),
+                 ('cached_content_token_count', 'cached'))
+
+def record_llm_usage(analysis_type, response):
+    """응답(또는 스트리밍 마지막 청크)의 usage_metadata 토큰 수 누적 (정보가 없으면 무시)"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None: return
+    for field, kind in _USAGE_FIELDS:
+        count = getattr(usage, field, None)
+        if count: LLM_TOKENS.inc(int(count), analysis_type=analysis_type, kind=kind)
+
+def _cache_families(prefix, help_name, stats, hit_keys):
+    hits = sum(stats.get(k, 0) for k in hit_keys)
+    return [
+        (f'{prefix}_hits_total', 'counter', f"{help_name} 적중 수", [({}, hits)]),
+        (f'{prefix}_misses_total', 'counter', f"{help_name} 실패 수", [({}, stats.get('misses', 0))]),
+        (f'{prefix}_hit_ratio', 'gauge', f"{help_name} 적중률", [({}, round(stats.get('hit_rate', 0.0), 6))]),
+        (f'{prefix}_entries', 'gauge', f"{help_name} 항목 수", [({}, stats.get('size', 0))]),
+    ]
+
+def chart_cache_collector():
+    """명식 캐시 적중률 (saju_cache 가 로드된 프로세스에서만)"""
+    module = sys.modules.get('saju_cache')
+    if module is None: return []
+    stats = module.get_chart_cache_stats()
+    return _cache_families('saju_chart_cache', "명식 캐시", stats, ('hits',)) + [
+        ('saju_chart_cache_evictions_total', 'counter', "명식 캐시 제거 수", [({}, stats.get('evictions', 0))])]
+
+def report_cache_collector():
+    """리포트 캐시 적중률 (프로세스 전역 캐시가 만들어진 경우만)"""
+    module = sys.modules.get('backend.report_cache')
+    cache = getattr(module, '_report_cache', None) if module else None
+    if cache is None: return []
+    stats = cache.stats()
+    return _cache_families('saju_report_cache', "리포트 캐시", stats, ('hits', 'near_hits')) + [
+        ('saju_report_cache_near_hits_total', 'counter', "리포트 캐시 유사 질문 적중 수", [({}, stats.get('near_hits', 0))])]
+
+def serving_collector(service):
+    """분석 서비스 동시 실행·대기 수 수집기"""
+    def collect():
+        stats = service.stats()
+        return [
+            ('saju_llm_active', 'gauge', "실행 중인 분석 수", [({}, stats['active'])]),
+            ('saju_llm_waiting', 'gauge', "대기 중인 분석 수", [({}, stats['waiting'])]),
+            ('saju_llm_max_concurrent', 'gauge', "동시 실행 한도", [({}, stats['max_concurrent'])]),
+        ]
+    collect.__name__ = 'serving_collector'
+    return collect
+
+registry.register_collector(chart_cache_collector)
+registry.register_collector(report_cache_collector)
+
+def render_metrics():
+    """운영 지표 + 단계별 구간 히스토그램 (Prometheus 텍스트 형식)"""
+    return registry.render() + render_prometheus()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics -> render_metrics()"""
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_metrics_server = None
+_metrics_server_failed = False
+_metrics_server_lock = threading.Lock()
+
+def start_metrics_server(port=None, addr=None):
+    """프로세스당 1회 지표 HTTP 서버를 데몬 스레드로 시작 (이미 실행 중이면 기존 서버, 꺼져 있거나 포트를 못 열면 None)
+    포트를 열지 못하면 실패를 기록하고 다시 시도하지 않음 (Streamlit 재실행마다 같은 오류를 출력하지 않도록)"""
+    global _metrics_server, _metrics_server_failed
+    port = METRICS_PORT if port is None else port
+    if _metrics_server is not None or _metrics_server_failed or not port: return _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is not None or _metrics_server_failed: return _metrics_server
+        try:
+            server = ThreadingHTTPServer((addr or METRICS_ADDR, port), _MetricsHandler)
+        except OSError as e:
+            _metrics_server_failed = True
+            print(f"지표 서버 시작 실패 (포트 {port}): {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="saju-metrics", daemon=True).start()
+        _metrics_server = server
+    return _metrics_server
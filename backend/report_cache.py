@@ -0,0 +1,210 @@
+"""
+report_cache.py - AI 분석 리포트 캐시
+
+프롬프트 입력(원국, 선택한 대운/세운/월운, 분석 유형, 질문, 모델, 프롬프트 템플릿 버전)의
+정규화된 지문(fingerprint)을 키로 생성 결과를 SQLite 에 보관합니다.
+같은 입력의 분석은 LLM 을 다시 호출하지 않고 즉시 반환하며, 개수·보관 기간 기준으로 정리합니다.
+
+2단계 캐시: 정확히 같은 지문이 없으면 구조화된 부분(분석 유형, 모델, 템플릿 버전, 원국, 선택 운)이 같은 리포트 중
+질문이 비어 있거나 거의 같은(검색 토큰 Jaccard 유사도) 항목을 재사용합니다.
+- 구조화 지문에는 프롬프트에 들어가는 원국 값(성별·생년월일시·사주팔자)을 모두 포함하므로,
+  재사용한 리포트가 요청자와 다른 개인 정보를 인용하지 않음
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from backend.knowledge_index import tokenize
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPORT_CACHE_PATH = os.environ.get(
+    "SAJU_REPORT_CACHE", os.path.join(PROJECT_ROOT, "cache", "report_cache.sqlite3"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SAJU_REPORT_CACHE_SIZE", 5000))
+DEFAULT_MAX_AGE = float(os.environ.get("SAJU_REPORT_CACHE_MAX_AGE", 30 * 24 * 60 * 60))
+# 질문 유사도 기준 (0~1, 1 이면 정확히 같은 질문만 재사용)
+DEFAULT_SIMILARITY = float(os.environ.get("SAJU_REPORT_SIMILARITY", 0.85))
+# 구조화 지문에 포함할 원국 항목 (프롬프트에 들어가는 원국 값 전부)
+STRUCTURED_CHART_KEYS = ('gender', 'birth_date', 'birth_time', 'pillars')
+# 유사 질문 비교 대상 최대 개수 (구조화 키별 최근 항목)
+MAX_SIMILAR_CANDIDATES = 50
+
+def normalize_query(text):
+    """질문 문자열 정규화 (앞뒤·연속 공백 제거)"""
+    return " ".join((text or "").split())
+
+def make_fingerprint(analysis_type, model, template_version, chart, selection=None, query=None):
+    """리포트 지문 (JSON 직렬화 가능한 dict)"""
+    return {
+        'analysis_type': analysis_type,
+        'model': model,
+        'template_version': template_version,
+        'chart': chart,
+        'selection': selection or {},
+        'query': normalize_query(query),
+    }
+
+def fingerprint_key(fingerprint):
+    """지문 -> 캐시 키 (정렬된 JSON 의 SHA-256)"""
+    canonical = json.dumps(fingerprint, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def structured_fingerprint(fingerprint):
+    """자유 질문을 뺀 구조화 지문"""
+    chart = fingerprint.get('chart') or {}
+    return {
+        'analysis_type': fingerprint.get('analysis_type'),
+        'model': fingerprint.get('model'),
+        'template_version': fingerprint.get('template_version'),
+        'chart': {k: chart.get(k) for k in STRUCTURED_CHART_KEYS},
+        'selection': fingerprint.get('selection') or {},
+    }
+
+def query_similarity(a, b):
+    """두 질문의 유사도 (정규화한 질문의 검색 토큰 Jaccard, 둘 다 비었으면 1.0)"""
+    a, b = normalize_query(a), normalize_query(b)
+    if a == b: return 1.0
+    ta, tb = set(tokenize(a)), set(tokenize(b))
+    if not ta or not tb: return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+class ReportCache:
+    """SQLite 리포트 캐시 (최대 개수 초과 시 오래 조회되지 않은 항목부터, 보관 기간 초과 항목은 즉시 정리)"""
+    def __init__(self, path=DEFAULT_REPORT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE,
+                 similarity=DEFAULT_SIMILARITY):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.similarity = similarity
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                " key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, analysis_type TEXT, model TEXT,"
+                " text TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER DEFAULT 0)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+            if 'structured_key' not in columns:
+                conn.execute("ALTER TABLE reports ADD COLUMN structured_key TEXT")
+            if 'query' not in columns:
+                conn.execute("ALTER TABLE reports ADD COLUMN query TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_last_access ON reports (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_structured ON reports (structured_key, last_access)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, fingerprint, similar=True):
+        """저장된 리포트 텍스트 (없거나 만료되었으면 None)"""
+        return self.lookup(fingerprint, similar=similar)[0]
+
+    def lookup(self, fingerprint, similar=True):
+        """(리포트 텍스트, 'exact' | 'near' | None) - similar=False 이면 정확히 같은 지문만 조회"""
+        key = fingerprint_key(fingerprint)
+        now = time.time()
+        kind = None
+        with self._connect() as conn:
+            row = conn.execute("SELECT text, created_at FROM reports WHERE key = ?", (key,)).fetchone()
+            if row and (self.max_age is None or now - row[1] <= self.max_age):
+                kind = 'exact'
+            else:
+                if row:
+                    conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                row = None
+                if similar:
+                    row = self._find_similar(conn, fingerprint, now)
+                    if row:
+                        kind = 'near'
+                        key = row[2]
+            if row:
+                conn.execute("UPDATE reports SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        with self._lock:
+            if kind == 'exact': self.hits += 1
+            elif kind == 'near': self.near_hits += 1
+            else: self.misses += 1
+        return (row[0] if row else None), kind
+
+    def _find_similar(self, conn, fingerprint, now):
+        """구조화 지문이 같고 질문이 가장 유사한 리포트 (text, created_at, key, 기준 미만이면 None)"""
+        min_created = now - self.max_age if self.max_age is not None else float('-inf')
+        candidates = conn.execute(
+            "SELECT text, created_at, key, query FROM reports"
+            " WHERE structured_key = ? AND created_at >= ? ORDER BY last_access DESC LIMIT ?",
+            (fingerprint_key(structured_fingerprint(fingerprint)), min_created, MAX_SIMILAR_CANDIDATES)).fetchall()
+        query = fingerprint.get('query')
+        best, best_score = None, self.similarity
+        for text, created_at, key, cand_query in candidates:
+            score = query_similarity(query, cand_query)
+            if score >= best_score:
+                best, best_score = (text, created_at, key), score
+        return best
+
+    def put(self, fingerprint, text):
+        """리포트 저장 후 정리"""
+        if not text: return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports (key, fingerprint, analysis_type, model, text, created_at, last_access, hits,"
+                " structured_key, query) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                (fingerprint_key(fingerprint), json.dumps(fingerprint, sort_keys=True, ensure_ascii=False, default=str),
+                 fingerprint.get('analysis_type'), fingerprint.get('model'), text, now, now,
+                 fingerprint_key(structured_fingerprint(fingerprint)), normalize_query(fingerprint.get('query'))))
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.max_age is not None:
+            conn.execute("DELETE FROM reports WHERE created_at < ?", (now - self.max_age,))
+        if self.max_entries is not None:
+            conn.execute(
+                "DELETE FROM reports WHERE key IN ("
+                " SELECT key FROM reports ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM reports")
+        with self._lock:
+            self.hits = self.near_hits = self.misses = 0
+
+    def stats(self):
+        """적중/실패 통계 (적중·실패는 현재 프로세스 기준, size 는 디스크 전체)"""
+        with self._connect() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        with self._lock:
+            total = self.hits + self.near_hits + self.misses
+            return {
+                'size': size,
+                'max_entries': self.max_entries,
+                'max_age': self.max_age,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.near_hits) / total if total else 0.0,
+            }
+
+_report_cache = None
+_report_cache_lock = threading.Lock()
+
+def get_report_cache():
+    """프로세스 전역 리포트 캐시 (기본 경로)"""
+    global _report_cache
+    if _report_cache is None:
+        with _report_cache_lock:
+            if _report_cache is None:
+                _report_cache = ReportCache()
+    return _report_cache
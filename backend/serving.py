@@ -0,0 +1,317 @@
+"""
+serving.py - 분석 요청 동시 처리 계층
+
+LLM 호출을 프로세스 전역 asyncio 이벤트 루프(백그라운드 스레드 1개)에서 비동기로 실행합니다.
+- 동시 실행 수 제한(대기열 상한 초과 시 즉시 거절)
+- 모델 초기화 단일 실행(single-flight): 동시에 들어온 첫 요청들이 파일 업로드·캐시 생성을 중복 수행하지 않음
+- 요청별 제한 시간
+- 스트리밍 응답 (청크 단위 텍스트, Flask SSE / Streamlit st.write_stream 공용)
+- 비동기 API 가 없는 모델은 서비스 전용 스레드 풀(동시 실행 한도 크기)에서 호출
+
+작업자 모델:
+- ASGI (asgi.py, uvicorn): analyze()/stream() 을 서버 이벤트 루프에서 바로 await -> 요청당 스레드 없이 수백 건 동시 처리
+- WSGI (app.py, Flask 개발 서버 등): analyze_sync()/stream_sync() 가 요청 스레드에서 결과를 기다림
+  -> LLM 호출은 공유 이벤트 루프에서 처리되지만, 동시 요청 수는 WSGI 서버의 작업자 스레드 수를 넘을 수 없음
+"""
+
+import os
+import time
+import queue
+import asyncio
+import functools
+import threading
+import concurrent.futures
+
+from backend.tracing import span
+from backend.metrics import LLM_LATENCY, count_error, record_llm_usage
+
+MAX_CONCURRENCY = int(os.environ.get("SAJU_MAX_CONCURRENCY", 64))
+MAX_WAITING = int(os.environ.get("SAJU_MAX_WAITING", 256))
+REQUEST_TIMEOUT = float(os.environ.get("SAJU_REQUEST_TIMEOUT", 120))
+# 로컬 가짜 모델 사용 여부 (API 키 없이 스트리밍·부하 점검)
+USE_FAKE_MODEL = os.environ.get("SAJU_FAKE_MODEL") == "1"
+# 모델(컨텍스트 캐시 포함)을 다시 준비하는 주기. 캐시 TTL 보다 짧아야 만료 전 연장됨
+MODEL_MAX_AGE = float(os.environ.get("SAJU_MODEL_MAX_AGE", 15 * 60))
+
+class Overloaded(Exception):
+    """동시 실행·대기 한도를 넘어 요청을 받을 수 없음"""
+
+class AnalysisTimeout(TimeoutError):
+    """요청 제한 시간 초과"""
+
+_STREAM_END = object()
+
+def chunk_text(chunk):
+    """응답 청크의 텍스트 (안전 필터 등으로 텍스트가 없는 청크는 빈 문자열)"""
+    try:
+        return chunk.text or ''
+    except (ValueError, AttributeError):
+        return ''
+
+def iter_response_text(response):
+    """generate_content(stream=True) 응답 -> 텍스트 조각 제너레이터 (st.write_stream 등)"""
+    for chunk in response:
+        text = chunk_text(chunk)
+        if text:
+            yield text
+
+def close_response(response):
+    """중단된 스트리밍 응답 정리: 하위 스트림(gRPC 호출 등)을 취소·종료하여 실행기 스레드에서 대기 중인 next() 를 풀어 줌"""
+    for target in (response, getattr(response, '_iterator', None)):
+        if target is None: continue
+        for name in ('cancel', 'close'):
+            method = getattr(target, name, None)
+            if not callable(method): continue
+            try:
+                method()
+            except Exception:
+                # 다른 스레드에서 실행 중인 제너레이터는 close 할 수 없음 (다음 조각 후 소비자가 없으므로 종료)
+                pass
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    """로컬 가짜 생성 모델 (generate_content / generate_content_async, stream 지원)"""
+    def __init__(self, text=None, chunk_size=40, first_token_delay=0.3, chunk_delay=0.05):
+        self.text = text or "가짜 모델 응답입니다. " * 100
+        self.chunk_size = chunk_size
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+
+    def _chunks(self):
+        return [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+
+    def _iter(self):
+        time.sleep(self.first_token_delay)
+        for i, piece in enumerate(self._chunks()):
+            if i: time.sleep(self.chunk_delay)
+            yield FakeResponse(piece)
+
+    async def _aiter(self):
+        await asyncio.sleep(self.first_token_delay)
+        for i, piece in enumerate(self._chunks()):
+            if i: await asyncio.sleep(self.chunk_delay)
+            yield FakeResponse(piece)
+
+    def generate_content(self, contents, stream=False):
+        if stream: return self._iter()
+        time.sleep(self.first_token_delay + self.chunk_delay * (len(self._chunks()) - 1))
+        return FakeResponse(self.text)
+
+    async def generate_content_async(self, contents, stream=False):
+        if stream: return self._aiter()
+        await asyncio.sleep(self.first_token_delay + self.chunk_delay * (len(self._chunks()) - 1))
+        return FakeResponse(self.text)
+
+class ConcurrencyLimiter:
+    """asyncio 동시 실행 제한 (대기 요청이 max_waiting 을 넘으면 Overloaded)"""
+    def __init__(self, max_concurrent=MAX_CONCURRENCY, max_waiting=MAX_WAITING):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self._sem = None
+        self.active = 0
+        self.waiting = 0
+
+    async def __aenter__(self):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrent)
+        if self._sem.locked() and self.waiting >= self.max_waiting:
+            count_error('llm.overloaded')
+            raise Overloaded("요청이 많아 잠시 후 다시 시도해 주세요.")
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.active -= 1
+        self._sem.release()
+        return False
+
+class SingleFlight:
+    """비동기 단일 실행 초기화 (동시 호출자는 같은 결과를 기다림, 실패 시 다음 호출에서 재시도)"""
+    def __init__(self, factory, max_age=None):
+        self.factory = factory
+        self.max_age = max_age
+        self._value = None
+        self._created = 0.0
+        self._pending = None
+
+    def _is_fresh(self):
+        return self._value is not None and (self.max_age is None or time.monotonic() - self._created < self.max_age)
+
+    async def get(self):
+        if self._is_fresh():
+            return self._value
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._create())
+            self._pending.add_done_callback(self._done)
+        if self._value is not None:
+            # 주기적 재준비 중에는 기존 값을 그대로 사용
+            return self._value
+        return await asyncio.shield(self._pending)
+
+    def _done(self, future):
+        self._pending = None
+        if not future.cancelled():
+            future.exception()  # 실패는 대기 중인 호출자에게만 전달하고 다음 호출에서 재시도
+
+    async def _create(self):
+        # 팩토리는 블로킹(업로드 등)이므로 스레드 풀에서 실행
+        value = await asyncio.get_running_loop().run_in_executor(None, self.factory)
+        self._value, self._created = value, time.monotonic()
+        return value
+
+    def reset(self):
+        self._value = None
+
+class AnalysisService:
+    """모델 초기화·동시성 제한·제한 시간을 묶은 분석 서비스"""
+    def __init__(self, model_factory, max_concurrent=MAX_CONCURRENCY, max_waiting=MAX_WAITING,
+                 timeout=REQUEST_TIMEOUT, model_max_age=MODEL_MAX_AGE):
+        self.model = SingleFlight(model_factory, max_age=model_max_age)
+        self.limiter = ConcurrencyLimiter(max_concurrent, max_waiting)
+        self.timeout = timeout
+        # 동기 모델 호출 전용 스레드 풀 (기본 실행기 크기가 아니라 동시 실행 한도만큼 실행)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="saju-llm")
+
+    async def _generate(self, model, prompt):
+        if hasattr(model, 'generate_content_async'):
+            return await model.generate_content_async(prompt)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, model.generate_content, prompt)
+
+    async def analyze(self, prompt, timeout=None, analysis_type='total'):
+        """프롬프트 분석 결과 텍스트 (비동기, 지연 시간·토큰 수는 analysis_type 별로 집계)"""
+        timeout = timeout or self.timeout
+        async with self.limiter:
+            start = time.perf_counter()
+            try:
+                with span('llm.model_ready'):
+                    model = await asyncio.wait_for(self.model.get(), timeout)
+                with span('llm.generate'):
+                    response = await asyncio.wait_for(self._generate(model, prompt), timeout)
+            except asyncio.TimeoutError:
+                count_error('llm.timeout')
+                raise AnalysisTimeout(f"분석 시간이 {timeout:g}초를 초과했습니다.")
+            except Exception:
+                count_error('llm.generate')
+                raise
+        LLM_LATENCY.observe(time.perf_counter() - start, analysis_type=analysis_type, mode='sync')
+        record_llm_usage(analysis_type, response)
+        return response.text
+
+    def analyze_sync(self, prompt, timeout=None, analysis_type='total'):
+        """동기 호출용 래퍼 (Flask 뷰 등). LLM 호출은 공유 이벤트 루프에서 수행하고 호출 스레드는 결과를 기다림"""
+        timeout = timeout or self.timeout
+        future = run_coroutine(self.analyze(prompt, timeout, analysis_type))
+        try:
+            # 대기열 시간까지 고려하여 여유를 둔 뒤 강제 취소
+            return future.result(timeout * 2)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise AnalysisTimeout(f"분석 시간이 {timeout:g}초를 초과했습니다.")
+
+    async def stream(self, prompt, timeout=None, analysis_type='total'):
+        """프롬프트 분석 결과를 텍스트 조각 단위로 생성 (비동기 제너레이터, 조각 간 대기도 제한 시간 적용)"""
+        timeout = timeout or self.timeout
+        async with self.limiter:
+            start, last = time.perf_counter(), None
+            try:
+                with span('llm.model_ready'):
+                    model = await asyncio.wait_for(self.model.get(), timeout)
+                with span('llm.stream'):
+                    if hasattr(model, 'generate_content_async'):
+                        response = await asyncio.wait_for(model.generate_content_async(prompt, stream=True), timeout)
+                        chunks = response.__aiter__()
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                            except StopAsyncIteration:
+                                break
+                            last = chunk
+                            text = chunk_text(chunk)
+                            if text: yield text
+                    else:
+                        loop = asyncio.get_running_loop()
+                        response = await asyncio.wait_for(
+                            loop.run_in_executor(self.executor, functools.partial(model.generate_content, prompt, stream=True)), timeout)
+                        chunks, finished = iter(response), False
+                        try:
+                            while True:
+                                chunk = await asyncio.wait_for(loop.run_in_executor(self.executor, next, chunks, _STREAM_END), timeout)
+                                if chunk is _STREAM_END:
+                                    finished = True
+                                    break
+                                last = chunk
+                                text = chunk_text(chunk)
+                                if text: yield text
+                        finally:
+                            # 취소·제한 시간 초과·소비 중단 시 버려진 응답이 실행기 스레드를 붙잡지 않도록 정리
+                            if not finished:
+                                close_response(chunks)
+                                if chunks is not response: close_response(response)
+            except asyncio.TimeoutError:
+                count_error('llm.timeout')
+                raise AnalysisTimeout(f"분석 시간이 {timeout:g}초를 초과했습니다.")
+            except Exception:
+                count_error('llm.stream')
+                raise
+            LLM_LATENCY.observe(time.perf_counter() - start, analysis_type=analysis_type, mode='stream')
+            # 스트리밍 응답의 토큰 수는 마지막 청크에 담겨 옴
+            record_llm_usage(analysis_type, last)
+
+    def stream_sync(self, prompt, timeout=None, analysis_type='total'):
+        """동기 제너레이터 래퍼 (Flask SSE 등). 소비를 중단하면 진행 중인 생성도 취소"""
+        timeout = timeout or self.timeout
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for text in self.stream(prompt, timeout, analysis_type):
+                    chunks.put(('chunk', text))
+                chunks.put(('done', None))
+            except Exception as e:
+                chunks.put(('error', e))
+
+        future = run_coroutine(pump())
+        try:
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=timeout * 2)
+                except queue.Empty:
+                    raise AnalysisTimeout(f"분석 시간이 {timeout:g}초를 초과했습니다.")
+                if kind == 'chunk':
+                    yield value
+                elif kind == 'done':
+                    return
+                else:
+                    raise value
+        finally:
+            future.cancel()
+
+    def stats(self):
+        return {'active': self.limiter.active, 'waiting': self.limiter.waiting,
+                'max_concurrent': self.limiter.max_concurrent, 'max_waiting': self.limiter.max_waiting}
+
+# --- 프로세스 전역 이벤트 루프 (백그라운드 데몬 스레드) ---
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="saju-serving-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def run_coroutine(coro):
+    """코루틴을 공유 이벤트 루프에 제출하고 concurrent.futures.Future 반환"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
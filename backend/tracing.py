@@ -0,0 +1,247 @@
+"""
+tracing.py - 명식 계산·LLM 호출 구간 시간 측정
+
+단계(stage) 이름별로 구간 시간을 재어 히스토그램에 누적하고, 끝난 구간을 내보내기 대상(exporter)에 전달합니다.
+- span(name): with 문 구간, traced(name): 함수 데코레이터 (async 함수 지원)
+- 구간 안에서 예외가 나면 오류로 기록한 뒤 그대로 전달 (바깥의 try/except 가 삼켜도 기록은 남음)
+- 꺼져 있으면 공유 no-op 객체만 반환하므로 부하가 거의 없음
+
+설정: 환경 변수 SAJU_TRACE
+- 미설정/0: 끔
+- 1 또는 memory: 히스토그램 + 메모리 보관 (최근 구간)
+- log 또는 log:경로: 히스토그램 + JSON Lines 로그 파일 (기본 cache/trace.log)
+Prometheus 텍스트 형식 출력: render_prometheus() (Flask /metrics)
+"""
+
+import os
+import json
+import time
+import uuid
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from collections import deque
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TRACE_LOG = os.path.join(PROJECT_ROOT, "cache", "trace.log")
+# 히스토그램 구간 경계 (초)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_current_span = contextvars.ContextVar('saju_current_span', default=None)
+
+class Histogram:
+    """고정 구간 누적 히스토그램 (초 단위)"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max: self.max = seconds
+        if error: self.errors += 1
+
+    def quantile(self, q):
+        """구간 경계 기준 분위수 추정 (해당 분위가 속한 구간의 상한)"""
+        if not self.count: return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+class Span:
+    """측정 중인 구간 (끝나면 기록 dict 로 내보냄)"""
+    __slots__ = ('tracer', 'name', 'attrs', 'trace_id', 'span_id', 'parent', 'start', '_wall')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """구간 속성 추가 (토큰 수, 파일 수 등)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        # contextvars 토큰 대신 이전 값을 직접 복원 (비동기 제너레이터에서 문맥이 바뀌어도 안전)
+        _current_span.set(self)
+        self._wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_span.set(self.parent)
+        if exc_type is not None:
+            self.attrs['error'] = f"{exc_type.__name__}: {exc}"
+        self.tracer.finish(self, duration, exc_type is not None)
+        return False
+
+class _NoopSpan:
+    """추적이 꺼져 있을 때 쓰는 빈 구간"""
+    __slots__ = ()
+    def set(self, **attrs): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+NOOP_SPAN = _NoopSpan()
+
+class InMemoryExporter:
+    """최근 구간을 메모리에 보관 (점검·개발용)"""
+    def __init__(self, maxlen=1000):
+        self.spans = deque(maxlen=maxlen)
+
+    def export(self, record):
+        self.spans.append(record)
+
+    def find(self, name):
+        return [s for s in self.spans if s['name'] == name]
+
+    def clear(self):
+        self.spans.clear()
+
+class LogFileExporter:
+    """구간을 JSON Lines 로 파일에 추가"""
+    def __init__(self, path=DEFAULT_TRACE_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def export(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+class Tracer:
+    """단계별 히스토그램과 내보내기 대상 관리"""
+    def __init__(self, enabled=False, exporters=None, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.exporters = list(exporters or [])
+        self.buckets = buckets
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, **attrs):
+        if not self.enabled: return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def finish(self, span, duration, error):
+        with self._lock:
+            hist = self.histograms.get(span.name)
+            if hist is None:
+                hist = self.histograms[span.name] = Histogram(self.buckets)
+            hist.observe(duration, error)
+        if not self.exporters: return
+        record = {'name': span.name, 'trace_id': span.trace_id, 'span_id': span.span_id,
+                  'parent_id': span.parent.span_id if span.parent is not None else None,
+                  'start': round(span._wall, 6), 'duration_ms': round(duration * 1000, 3), 'error': error,
+                  'attrs': span.attrs}
+        for exporter in self.exporters:
+            try:
+                exporter.export(record)
+            except Exception as e:
+                print(f"추적 내보내기 실패: {e}")
+
+    def stats(self):
+        """단계별 요약 (호출 수, 오류 수, 평균·p50·p95·최대 ms)"""
+        with self._lock:
+            return {name: {'count': h.count, 'errors': h.errors,
+                           'avg_ms': round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                           'p50_ms': round(h.quantile(0.5) * 1000, 3), 'p95_ms': round(h.quantile(0.95) * 1000, 3),
+                           'max_ms': round(h.max * 1000, 3)}
+                    for name, h in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def render_prometheus(self, prefix="saju"):
+        """히스토그램 -> Prometheus 텍스트 형식"""
+        lines = [f"# HELP {prefix}_stage_duration_seconds 단계별 구간 시간",
+                 f"# TYPE {prefix}_stage_duration_seconds histogram"]
+        errors = []
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{name}"}} {h.sum:.6f}')
+                lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{name}"}} {h.count}')
+                errors.append(f'{prefix}_stage_errors_total{{stage="{name}"}} {h.errors}')
+        lines += [f"# HELP {prefix}_stage_errors_total 단계별 오류 수", f"# TYPE {prefix}_stage_errors_total counter"]
+        return "\n".join(lines + errors) + "\n"
+
+def _exporters_from_env(value):
+    mode, _, arg = value.partition(':')
+    if mode == 'log':
+        return [LogFileExporter(arg or DEFAULT_TRACE_LOG)]
+    return [InMemoryExporter()]
+
+def _tracer_from_env():
+    value = os.environ.get("SAJU_TRACE", "").strip()
+    if value in ("", "0"):
+        return Tracer(enabled=False)
+    return Tracer(enabled=True, exporters=_exporters_from_env(value))
+
+# 프로세스 전역 추적기 (모듈 로드 시 환경 변수로 설정)
+_tracer = _tracer_from_env()
+
+def get_tracer():
+    return _tracer
+
+def configure_tracing(enabled=True, exporters=None):
+    """프로세스 전역 추적 설정 변경 (exporters 미지정 시 기존 대상 유지)"""
+    _tracer.enabled = enabled
+    if exporters is not None:
+        _tracer.exporters = list(exporters)
+    return _tracer
+
+def span(name, **attrs):
+    """with span('chart.calculate_saju'): ... (꺼져 있으면 no-op)"""
+    if not _tracer.enabled: return NOOP_SPAN
+    return Span(_tracer, name, attrs)
+
+def traced(name=None):
+    """함수 호출 구간 측정 데코레이터 (name 미지정 시 모듈.함수명)"""
+    def decorator(func):
+        stage = name or f"{func.__module__}.{func.__name__}"
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _tracer.enabled:
+                    return await func(*args, **kwargs)
+                with Span(_tracer, stage, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(_tracer, stage, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_trace_stats():
+    return _tracer.stats()
+
+def render_prometheus():
+    return _tracer.render_prometheus()
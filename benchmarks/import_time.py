@@ -0,0 +1,75 @@
+"""
+import_time.py - 시작 시 import 시간 점검 (python -X importtime 기반)
+
+모듈마다 새 인터프리터에서 `python -X importtime -c "import 모듈"` 을 실행하여
+누적 import 시간이 예산 안에 있는지, 첫 화면에 필요 없는 무거운 모듈(LLM SDK 등)을 끌어오지 않는지 확인합니다.
+예산을 넘거나 금지 모듈이 로드되면 종료 코드 1 을 반환합니다.
+
+실행: python benchmarks/import_time.py [--repeat 3] [--json 결과.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 모듈 -> (누적 import 시간 예산 ms, import 후 로드되면 안 되는 모듈)
+IMPORT_BUDGETS = {
+    'saju_cache': (250, ('google.generativeai', 'sajupy', 'pandas')),
+    'backend.data_caching_util': (100, ('google.generativeai', 'sajupy', 'pandas', 'numpy')),
+    'backend.serving': (150, ('google.generativeai', 'sajupy', 'pandas', 'numpy')),
+    'app': (450, ('google.generativeai', 'sajupy', 'pandas')),
+    # streamlit 자체 import 가 대부분 (첫 화면은 LLM SDK·sajupy 없이 그려져야 함)
+    'streamlit_app': (1500, ('google.generativeai', 'sajupy')),
+}
+
+def measure_import(module, forbidden=()):
+    """새 인터프리터에서 모듈 import -> (누적 시간 ms, 로드된 금지 모듈 목록)"""
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {list(forbidden)!r} if m in sys.modules]))")
+    # 백그라운드 사전 로드가 import 시간 기록에 섞이지 않도록 끔
+    env = dict(os.environ, SAJU_WARMUP='0', PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=PROJECT_ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{module} import 실패:\n{proc.stderr[-2000:]}")
+    total = 0
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:'): continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            total = int(parts[1])
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return total / 1000, loaded
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="import 시간 예산 점검")
+    parser.add_argument('--repeat', type=int, default=3, help="모듈별 측정 횟수 (최솟값 사용)")
+    parser.add_argument('--json', help="측정 결과를 저장할 JSON 경로")
+    args = parser.parse_args(argv)
+
+    results, failures = {}, []
+    for module, (budget, forbidden) in IMPORT_BUDGETS.items():
+        runs = [measure_import(module, forbidden) for _ in range(args.repeat)]
+        elapsed = min(ms for ms, _ in runs)
+        loaded = runs[0][1]
+        results[module] = {'ms': round(elapsed, 1), 'budget_ms': budget, 'forbidden_loaded': loaded}
+        print(f"{module:<28}{elapsed:>9.1f}ms  (예산 {budget}ms)" + (f"  금지 모듈 로드: {', '.join(loaded)}" if loaded else ""))
+        if elapsed > budget:
+            failures.append(f"{module} import {elapsed:.1f}ms > 예산 {budget}ms")
+        if loaded:
+            failures.append(f"{module} import 시 {', '.join(loaded)} 로드")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+    for failure in failures:
+        print(f"import 예산 초과: {failure}")
+    print("import 예산 통과" if not failures else f"import 예산 초과 {len(failures)}건")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+run_benchmarks.py - 사주 계산 파이프라인 성능 측정 (오프라인)
+
+고정 시드 코퍼스로 함수별 지연 시간(중앙값·p95), 초당 명식 수, 메모리를 측정하고
+benchmarks/thresholds.json 의 기준과 비교하여 초과하면 종료 코드 1 을 반환합니다.
+
+코퍼스
+- random: 1900-2100 사이 무작위 출생 일시
+- jeol: 12절기 절입 시각 전후 (표준시 기준 ±1분, 태양시 보정 후 경계 ±1분)
+- zi: 子時 경계 (태양시 보정 기준 23:30·00:30 전후)
+- leap: 음력 윤달 출생
+
+실행: python benchmarks/run_benchmarks.py [--quick] [--json 결과.json] [--update-thresholds]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows: 최대 RSS 는 psutil 로 측정 (없으면 생략)
+    resource = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+SEED = 20240601
+# 앱(streamlit_app)과 같은 계산 옵션
+CALC_OPTIONS = {'use_solar_time': True, 'longitude': 127.5, 'early_zi_time': False}
+# 태양시 보정량 (분): 경도 127.5 - 표준 자오선 135 -> -30분
+SOLAR_OFFSET = int((CALC_OPTIONS['longitude'] - 135) * 4)
+# 기준 갱신 시 현재 측정값에 곱할 여유 배수 (장비 편차 흡수)
+THRESHOLD_MARGIN = 2.5
+# 수 us 단위 함수는 측정 잡음이 커서 기준 하한을 둠
+MIN_THRESHOLD_US = 10.0
+BATCH_SIZE = 20000
+
+def _birth(dt, gender):
+    return {'year': dt.year, 'month': dt.month, 'day': dt.day, 'hour': dt.hour, 'minute': dt.minute, 'gender': gender}
+
+def random_corpus(n, rng):
+    """1900-03-01 ~ 2100-10-31 무작위 출생 일시 (달력 데이터 양 끝은 제외)"""
+    start, end = datetime(1900, 3, 1), datetime(2100, 10, 31, 23, 59)
+    span = int((end - start).total_seconds() // 60)
+    return [_birth(start + timedelta(minutes=rng.randrange(span)), rng.choice('남여')) for _ in range(n)]
+
+def jeol_corpus(n, rng):
+    """절입 시각 전후 출생 일시 (표준시 경계와 태양시 보정 후 경계)"""
+    from saju_utils import get_jeol_index, _EPOCH
+    terms = [int(t) for t in get_jeol_index() if datetime(1900, 3, 1) <= _EPOCH + timedelta(minutes=int(t)) <= datetime(2100, 10, 1)]
+    res = []
+    for t in rng.sample(terms, min(len(terms), max(1, n // 6))):
+        for offset in (-1, 0, 1, -SOLAR_OFFSET - 1, -SOLAR_OFFSET, -SOLAR_OFFSET + 1):
+            res.append(_birth(_EPOCH + timedelta(minutes=t + offset), rng.choice('남여')))
+    return res[:n]
+
+def zi_corpus(n, rng):
+    """子時 경계 출생 일시 (보정 후 23:00·00:00 이 되는 현지 23:30·00:30 전후와 자정)"""
+    res = []
+    times = [(23, 29), (23, 30), (23, 31), (23, 59), (0, 0), (0, 29), (0, 30), (0, 31), (22, 59), (23, 0)]
+    while len(res) < n:
+        day = datetime(1900, 3, 1) + timedelta(days=rng.randrange(73000))
+        for hh, mm in times:
+            res.append(_birth(day.replace(hour=hh, minute=mm), rng.choice('남여')))
+    return res[:n]
+
+def leap_corpus(n, rng):
+    """음력 윤달 출생 일시 (양력으로 변환한 입력, 'lunar' 에 원래 음력 날짜)"""
+    import numpy as np
+    from saju_calendar import get_calendar
+    calendar = get_calendar()
+    rows = np.flatnonzero(np.asarray(calendar.table['is_leap']))
+    res = []
+    for row in sorted(rng.sample(list(rows), min(n, len(rows)))):
+        r = calendar.table[row]
+        lunar = (int(r['lunar_year']), int(r['lunar_month']), int(r['lunar_day']), True)
+        y, m, d = calendar.lunar_to_solar(*lunar)
+        birth = _birth(datetime(y, m, d, rng.randrange(24), rng.randrange(60)), rng.choice('남여'))
+        birth['lunar'] = lunar
+        res.append(birth)
+    return res
+
+def build_corpora(size):
+    rng = random.Random(SEED)
+    return {
+        'random': random_corpus(size, rng),
+        'jeol': jeol_corpus(size, rng),
+        'zi': zi_corpus(size, rng),
+        'leap': leap_corpus(size, rng),
+    }
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def measure(func, items, rounds=3, warm=False):
+    """항목별 1회 호출 지연 시간 통계 (us, warm 이면 같은 항목을 한 번 먼저 호출하여 캐시 적중만 측정)"""
+    samples = []
+    for _ in range(rounds):
+        for item in items:
+            if warm: func(item)
+            start = time.perf_counter_ns()
+            func(item)
+            samples.append((time.perf_counter_ns() - start) / 1000)
+    samples.sort()
+    median = _percentile(samples, 0.5)
+    return {'calls': len(samples), 'median_us': round(median, 2), 'p95_us': round(_percentile(samples, 0.95), 2),
+            'mean_us': round(sum(samples) / len(samples), 2), 'ops_per_sec': round(1e6 / median, 1) if median else None}
+
+def prepare(corpus):
+    """단계별 입력 미리 계산 (calculate_saju 결과, 상세 정보, 확장 명식)"""
+    from sajupy import calculate_saju, get_saju_details
+    from saju_utils import get_extended_saju_data
+    for b in corpus:
+        b['saju'] = calculate_saju(b['year'], b['month'], b['day'], b['hour'], b['minute'], **CALC_OPTIONS)
+        b['details'] = get_saju_details(b['saju'])
+        b['chart'] = get_extended_saju_data(dict(b['details']), gender=b['gender'])
+    return corpus
+
+def run_function_benchmarks(corpora, rounds):
+    """함수별 지연 시간 ({벤치마크명: {코퍼스명: 통계}})"""
+    from sajupy import calculate_saju, get_saju_details
+    import saju_utils
+    from saju_utils import get_extended_saju_data, calculate_daeun, get_seyun_list, get_wolun_data
+    from saju_cache import compute_chart, normalize_birth_input, ChartCache
+    from saju_calendar import lunar_to_solar
+
+    def seyun(b, cold):
+        p = b['chart']['pillars']
+        if cold: saju_utils._get_seyun_range_cached.cache_clear()
+        return get_seyun_list(p['day']['stem'], p['year']['branch'], b['year'], count=10, pillars=p, day_branch=p['day']['branch'])
+
+    def wolun(b, cold):
+        p = b['chart']['pillars']
+        if cold: saju_utils._get_wolun_table_cached.cache_clear()
+        seyun_pillar = saju_utils.get_seyun_pillar(b['year'])
+        return [get_wolun_data(p['day']['stem'], p['year']['branch'], seyun_pillar, m, p, p['day']['branch']) for m in range(1, 13)]
+
+    def key(b):
+        return normalize_birth_input(b['year'], b['month'], b['day'], b['hour'], b['minute'], b['gender'], **CALC_OPTIONS)
+
+    warm_cache = ChartCache(maxsize=100000, ttl=None)
+
+    def cached_chart(b):
+        k = key(b)
+        value = warm_cache.get(k)
+        if value is None:
+            warm_cache.put(k, compute_chart(k))
+
+    benches = {
+        'calculate_saju': lambda b: calculate_saju(b['year'], b['month'], b['day'], b['hour'], b['minute'], **CALC_OPTIONS),
+        'get_saju_details': lambda b: get_saju_details(b['saju']),
+        # get_extended_saju_data 는 입력 dict 에 키를 추가하므로 얕은 사본 사용
+        'get_extended_saju_data': lambda b: get_extended_saju_data(dict(b['details']), gender=b['gender']),
+        'calculate_daeun': lambda b: calculate_daeun(b['details'], b['gender']),
+        'get_seyun_list_cold': lambda b: seyun(b, True),
+        'get_seyun_list_warm': lambda b: seyun(b, False),
+        'get_wolun_data_12m_cold': lambda b: wolun(b, True),
+        'get_wolun_data_12m_warm': lambda b: wolun(b, False),
+        'compute_chart': lambda b: compute_chart(key(b)),
+        'chart_cache_hit': cached_chart,
+    }
+    results = {}
+    for name, func in benches.items():
+        results[name] = {}
+        for corpus_name, corpus in corpora.items():
+            if name == 'chart_cache_hit':
+                for b in corpus: cached_chart(b)  # 직전 계산이 CPU 캐시를 비우지 않도록 미리 전부 채움
+            results[name][corpus_name] = measure(func, corpus, rounds, warm=name.endswith('_warm'))
+    leap = corpora['leap']
+    results['lunar_to_solar'] = {'leap': measure(lambda b: lunar_to_solar(*b['lunar']), leap, rounds)}
+    return results
+
+def run_throughput(corpora):
+    """초당 명식 수 (건별 파이프라인, 일괄 계산)"""
+    from saju_cache import compute_chart, normalize_birth_input
+    from saju_batch import get_extended_saju_batch
+    births = [b for corpus in corpora.values() for b in corpus]
+
+    start = time.perf_counter()
+    for b in births:
+        compute_chart(normalize_birth_input(b['year'], b['month'], b['day'], b['hour'], b['minute'], b['gender'], **CALC_OPTIONS))
+    single = len(births) / (time.perf_counter() - start)
+
+    import pandas as pd
+    # 일괄 계산은 고정 비용이 있으므로 코퍼스 크기와 무관하게 같은 건수로 측정
+    batch_births = (births * (BATCH_SIZE // len(births) + 1))[:BATCH_SIZE]
+    frame = pd.DataFrame({'birth': [datetime(b['year'], b['month'], b['day'], b['hour'], b['minute']) for b in batch_births]})
+    genders = [b['gender'] for b in batch_births]
+    get_extended_saju_batch(frame['birth'][:10], genders=genders[:10])  # 일자 테이블 준비
+    start = time.perf_counter()
+    get_extended_saju_batch(frame['birth'], genders=genders)
+    batch = BATCH_SIZE / (time.perf_counter() - start)
+    return {'pipeline_charts': len(births), 'batch_charts': BATCH_SIZE, 'pipeline_charts_per_sec': round(single, 1), 'batch_charts_per_sec': round(batch, 1)}
+
+def max_rss_mb():
+    """프로세스 최대 RSS (MB, 측정할 수 없으면 None)"""
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / 1024 if sys.platform != 'darwin' else rss / 1024 / 1024, 1)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    # Windows 는 최대 작업 집합(peak_wset), 그 외에는 현재 RSS
+    return round(getattr(info, 'peak_wset', info.rss) / 1024 / 1024, 1)
+
+def run_memory(corpora):
+    """메모리 (파이프라인 1회 순회 중 Python 할당 최고치, 일자 테이블 크기, 프로세스 최대 RSS)"""
+    from saju_cache import compute_chart, normalize_birth_input
+    from saju_calendar import get_calendar
+    births = corpora['random']
+    tracemalloc.start()
+    charts = [compute_chart(normalize_birth_input(b['year'], b['month'], b['day'], b['hour'], b['minute'], b['gender'], **CALC_OPTIONS))
+              for b in births]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'pipeline_peak_kb': round(peak / 1024, 1), 'per_chart_kb': round(current / 1024 / len(charts), 2),
+            'calendar_table_kb': round(get_calendar().table.nbytes / 1024, 1),
+            'max_rss_mb': max_rss_mb()}
+
+def check_thresholds(report, thresholds):
+    """기준 초과 항목 목록"""
+    failures = []
+    for name, corpus_limits in thresholds.get('median_us', {}).items():
+        for corpus_name, limit in corpus_limits.items():
+            stats = report['latency'].get(name, {}).get(corpus_name)
+            if stats and stats['median_us'] > limit:
+                failures.append(f"{name}[{corpus_name}] 중앙값 {stats['median_us']}us > 기준 {limit}us")
+    for name, limit in thresholds.get('min_charts_per_sec', {}).items():
+        value = report['throughput'].get(name)
+        if value is not None and value < limit:
+            failures.append(f"{name} {value}/s < 기준 {limit}/s")
+    for name, limit in thresholds.get('max_memory', {}).items():
+        value = report['memory'].get(name)
+        if value is not None and value > limit:
+            failures.append(f"{name} {value} > 기준 {limit}")
+    return failures
+
+def make_thresholds(report, margin=THRESHOLD_MARGIN):
+    """현재 측정값에 여유 배수를 적용한 기준"""
+    return {
+        'margin': margin,
+        'median_us': {name: {c: round(max(s['median_us'] * margin, MIN_THRESHOLD_US), 1) for c, s in corpora.items()}
+                      for name, corpora in report['latency'].items()},
+        'min_charts_per_sec': {k: round(v / margin, 1) for k, v in report['throughput'].items() if k.endswith('_per_sec')},
+        'max_memory': {k: round(report['memory'][k] * margin, 1) for k in ('pipeline_peak_kb', 'per_chart_kb')},
+    }
+
+def print_report(report):
+    print(f"코퍼스: {', '.join(f'{k} {v}건' for k, v in report['corpora'].items())}")
+    print(f"{'벤치마크':<26}{'코퍼스':<8}{'중앙값(us)':>12}{'p95(us)':>12}{'ops/s':>12}")
+    for name, corpora in report['latency'].items():
+        for corpus_name, s in corpora.items():
+            print(f"{name:<26}{corpus_name:<8}{s['median_us']:>12}{s['p95_us']:>12}{s['ops_per_sec']:>12}")
+    t = report['throughput']
+    print(f"처리량: 건별 파이프라인 {t['pipeline_charts_per_sec']}건/s ({t['pipeline_charts']}건), 일괄 계산 {t['batch_charts_per_sec']}건/s ({t['batch_charts']}건)")
+    m = report['memory']
+    print(f"메모리: 파이프라인 최고 {m['pipeline_peak_kb']}KB, 명식당 {m['per_chart_kb']}KB, "
+          f"일자 테이블 {m['calendar_table_kb']}KB, 최대 RSS {m['max_rss_mb'] if m['max_rss_mb'] is not None else '-'}MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="사주 계산 파이프라인 벤치마크")
+    parser.add_argument('--quick', action='store_true', help="작은 코퍼스로 빠르게 측정")
+    parser.add_argument('--size', type=int, default=None, help="코퍼스별 출생 건수 (기본 300, --quick 50)")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--json', help="측정 결과를 저장할 JSON 경로")
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH)
+    parser.add_argument('--update-thresholds', action='store_true', help="현재 측정값으로 기준 파일 갱신")
+    args = parser.parse_args(argv)
+    size = args.size or (50 if args.quick else 300)
+    rounds = 1 if args.quick else args.rounds
+
+    corpora = {name: prepare(corpus) for name, corpus in build_corpora(size).items()}
+    report = {
+        'corpora': {name: len(corpus) for name, corpus in corpora.items()},
+        'latency': run_function_benchmarks(corpora, rounds),
+        'throughput': run_throughput(corpora),
+        'memory': run_memory(corpora),
+    }
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+
+    if args.update_thresholds:
+        with open(args.thresholds, 'w', encoding='utf-8') as f:
+            json.dump(make_thresholds(report), f, ensure_ascii=False, indent=1)
+        print(f"기준 갱신: {args.thresholds}")
+        return 0
+    try:
+        with open(args.thresholds, encoding='utf-8') as f:
+            thresholds = json.load(f)
+    except OSError:
+        print("기준 파일이 없어 비교를 건너뜁니다. (--update-thresholds 로 생성)")
+        return 0
+    failures = check_thresholds(report, thresholds)
+    for failure in failures:
+        print(f"성능 기준 초과: {failure}")
+    print("성능 기준 통과" if not failures else f"성능 기준 초과 {len(failures)}건")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
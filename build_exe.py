@@ -7,10 +7,14 @@ import os
 
 def build():
     print("사주 앱 실행 파일(.exe) 빌드를 시작합니다...")
+
+    # 만세력 일자 테이블 미리 생성 (실행 시 메모리 매핑으로 읽음)
+    from saju_calendar import save_calendar
+    save_calendar()
     
     # PyInstaller 명령어 실행
     # --onefile: 단일 파일로 생성
-    # --add-data: 프론트엔드 및 데이터 폴더 포함
+    # --add-data: 프론트엔드, 데이터 및 미리 계산한 테이블 폴더 포함
     # --windowed: 콘솔 창 없이 실행
     cmd = [
         "pyinstaller",
@@ -19,8 +23,14 @@ def build():
         "--windowed",
         "--add-data", "frontend;frontend",
         "--add-data", "data;data",
+        "--add-data", "precomputed;precomputed",
+        # 지연 import(saju_warmup.lazy_import)는 정적 분석에 잡히지 않으므로 명시
+        "--hidden-import", "google.generativeai",
+        # uvicorn 은 이벤트 루프·프로토콜 구현을 이름으로 불러오므로 하위 모듈 전체 포함
+        "--collect-submodules", "uvicorn",
         "--name", "사주풀이AI",
-        "app.py"
+        # ASGI 진입점: 분석 요청이 작업자 스레드를 차지하지 않음 (app.py 는 Flask 앱으로 함께 포함)
+        "asgi.py"
     ]
     
     try:
@@ -0,0 +1,175 @@
+"""
+사주 명식 일괄 계산 모듈
+- 수천~수백만 건의 출생 정보를 saju_utils 의 정수 코드와 룩업 테이블로 한 번에 계산 (야간 배치 작업용)
+- calculate_saju -> get_saju_details -> get_extended_saju_data 를 건별로 호출한 결과와 동일한 값을 산출
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from saju_utils import (
+    GANZHI_LIST, TEN_GOD_NAMES, GROWTH_NAMES, ELEMENT_NAMES, GONGMANG_NAMES,
+    TEN_GOD_TABLE, BRANCH_TEN_GOD_TABLE, GROWTH_TABLE, STEM_ELEMENT, BRANCH_ELEMENT,
+    get_jeol_index
+)
+from saju_calendar import NO_TERM, get_calendar
+
+_PILLAR_KEYS = ['year', 'month', 'day', 'hour']
+_NO_TERM = np.iinfo(np.int64).min
+
+# --- 일자별 달력 테이블 (saju_calendar 의 메모리 매핑 테이블 기반, 최초 사용 시 1회 구성) ---
+_day_table = None
+_day_table_lock = threading.Lock()
+
+def _build_day_table():
+    """만세력 일자 테이블을 일자 순번(1970-01-01 기준 일수)으로 색인한 정수 배열 묶음으로 변환"""
+    calendar = get_calendar()
+    days = np.arange(calendar.size, dtype=np.int64) + calendar.start_day
+    # 절입일(12절기)의 절입 시각 (epoch 분), 절입일이 아니면 _NO_TERM
+    offsets = np.asarray(calendar.jeol_term, dtype=np.int64)
+    jeol_term = np.where(offsets != NO_TERM, days * 1440 + offsets, _NO_TERM)
+    return {
+        'start': calendar.start_day,
+        'year': calendar.year_pillar,
+        'month': calendar.month_pillar,
+        'day': calendar.day_pillar,
+        'jeol_term': jeol_term,
+    }
+
+def get_day_table():
+    """일자별 달력 테이블 (프로세스 전역 캐시)"""
+    global _day_table
+    if _day_table is None:
+        with _day_table_lock:
+            if _day_table is None:
+                _day_table = _build_day_table()
+    return _day_table
+
+def _to_epoch_minutes_array(births):
+    """datetime 계열 배열 -> epoch 분(int64) 배열"""
+    values = pd.to_datetime(pd.Series(births)).to_numpy()
+    return values.astype('datetime64[m]').astype(np.int64)
+
+def calculate_pillars_batch(births, longitude=127.5, use_solar_time=True, utc_offset=9, early_zi_time=False):
+    """
+    출생 일시 배열 -> 4주 60갑자 코드 배열 (sajupy calculate_saju 와 동일한 규칙)
+    기본값은 앱(streamlit_app)의 계산 옵션(태양시 보정, 경도 127.5, 야자시 미사용)과 같음
+    """
+    table = get_day_table()
+    t = _to_epoch_minutes_array(births)
+    orig_day = np.floor_divide(t, 1440)
+    total = (t - orig_day * 1440).astype(np.float64)
+
+    # 태양시 보정 (경도 1도당 4분)
+    if use_solar_time and longitude is not None:
+        total = total + (longitude - utc_offset * 15) * 4
+    date_change = np.where(total < 0, -1, np.where(total >= 1440, 1, 0))
+    total = total - date_change * 1440
+    hour = np.floor_divide(total, 60).astype(np.int64)
+    minute = np.floor(np.mod(total, 60)).astype(np.int64)
+    solar_day = orig_day + date_change
+
+    # 23시는 야자시 미사용 시 다음날로 계산
+    row_day = solar_day + ((hour == 23) & (not early_zi_time))
+
+    size = len(table['day'])
+    orig_idx = orig_day - table['start']
+    row_idx = row_day - table['start']
+    if np.any((orig_idx < 0) | (orig_idx >= size) | (row_idx < 0) | (row_idx >= size)):
+        raise ValueError("달력 데이터 범위(1900-2100)를 벗어난 출생 일시가 포함되어 있습니다.")
+
+    year_code = table['year'][row_idx]
+    day_code = table['day'][row_idx]
+    month_code = table['month'][row_idx]
+
+    # 절입일의 절입 시각 이전 출생이면 이전 달(약 20일 전)의 월주
+    before_term = (row_day * 1440 + hour * 60 + minute) < table['jeol_term'][row_idx]
+    prev_idx = row_idx - 20
+    use_prev = before_term & (prev_idx >= 0)
+    month_code = np.where(use_prev, table['month'][np.maximum(prev_idx, 0)], month_code)
+
+    # 시주: 23시는 (태양시 보정 후) 다음날 일간, 그 외에는 원래 날짜의 일간 기준
+    next_idx = solar_day + 1 - table['start']
+    hour_day_code = np.where(
+        (hour == 23) & (next_idx < size),
+        table['day'][np.minimum(next_idx, size - 1)],
+        table['day'][orig_idx])
+    hour_branch = (hour + 1) // 2 % 12
+    hour_stem = ((hour_day_code % 10) % 5 * 2 + hour_branch) % 10
+    hour_code = (6 * hour_stem - 5 * hour_branch) % 60
+
+    return {
+        'year': year_code.astype(np.int8),
+        'month': month_code.astype(np.int8),
+        'day': day_code.astype(np.int8),
+        'hour': hour_code.astype(np.int8),
+        'birth_minutes': t,
+    }
+
+def _decode(names, codes):
+    return np.asarray(names, dtype=object)[codes]
+
+def get_extended_saju_batch(births, genders=None, decode=True, **calc_options):
+    """
+    다수의 출생 정보를 한 번에 계산하여 열(column) 단위 DataFrame 으로 반환
+    - births: datetime 배열 또는 'birth', 'gender' 열을 가진 DataFrame
+    - genders: '남'/'여' 배열 (births 가 DataFrame 이면 생략 가능)
+    - decode: False 이면 문자열 대신 정수 코드 그대로 반환 (대량 처리 시 더 빠름)
+    - calc_options: calculate_pillars_batch 의 계산 옵션 (longitude, early_zi_time 등)
+    """
+    if isinstance(births, pd.DataFrame):
+        if genders is None: genders = births['gender']
+        births = births['birth']
+    genders = np.asarray(genders)
+
+    codes = calculate_pillars_batch(births, **calc_options)
+    stems = {p: codes[p] % 10 for p in _PILLAR_KEYS}
+    branches = {p: codes[p] % 12 for p in _PILLAR_KEYS}
+    day_gan = stems['day']
+
+    cols = {}
+    for p in _PILLAR_KEYS:
+        cols[f'{p}_pillar'] = codes[p]
+    for p in ['year', 'month', 'hour']:
+        cols[f'{p}_ten_god'] = TEN_GOD_TABLE[day_gan, stems[p]]
+    for p in _PILLAR_KEYS:
+        cols[f'{p}_branch_ten_god'] = BRANCH_TEN_GOD_TABLE[day_gan, branches[p]]
+    for p in _PILLAR_KEYS:
+        cols[f'{p}_twelve_growth'] = GROWTH_TABLE[day_gan, branches[p]]
+
+    # 오행 분포 (8글자)
+    elems = np.stack([STEM_ELEMENT[stems[p]] for p in _PILLAR_KEYS] +
+                     [BRANCH_ELEMENT[branches[p]] for p in _PILLAR_KEYS], axis=1)
+    for e, name in enumerate(ELEMENT_NAMES):
+        cols[name] = (elems == e).sum(axis=1).astype(np.int8)
+
+    cols['gongmang_year'] = codes['year'] // 10
+    cols['gongmang_day'] = codes['day'] // 10
+
+    # 대운 순역행: 연간의 음양 + 성별, 대운수: 출생 시각과 절입 시각의 차이
+    is_yang = stems['year'] % 2 == 0
+    is_forward = (is_yang & (genders == '남')) | (~is_yang & (genders == '여'))
+    jeol = get_jeol_index()
+    t = codes['birth_minutes']
+    nxt = np.searchsorted(jeol, t, side='left')
+    prv = np.searchsorted(jeol, t, side='right') - 1
+    target_pos = np.where(is_forward, nxt, prv)
+    has_target = (target_pos >= 0) & (target_pos < len(jeol))
+    target = jeol[np.clip(target_pos, 0, len(jeol) - 1)]
+    daeun_num = np.floor(np.abs(target - t) / (24 * 60) / 3 + 0.5).astype(np.int64)
+    cols['daeun_direction'] = is_forward
+    cols['daeun_num'] = np.where(has_target, np.maximum(daeun_num, 1), 1)
+
+    if decode:
+        for p in _PILLAR_KEYS:
+            cols[f'{p}_pillar'] = _decode(GANZHI_LIST, cols[f'{p}_pillar'])
+            cols[f'{p}_branch_ten_god'] = _decode(TEN_GOD_NAMES, cols[f'{p}_branch_ten_god'])
+            cols[f'{p}_twelve_growth'] = _decode(GROWTH_NAMES, cols[f'{p}_twelve_growth'])
+        for p in ['year', 'month', 'hour']:
+            cols[f'{p}_ten_god'] = _decode(TEN_GOD_NAMES, cols[f'{p}_ten_god'])
+        cols['gongmang_year'] = _decode(GONGMANG_NAMES, cols['gongmang_year'])
+        cols['gongmang_day'] = _decode(GONGMANG_NAMES, cols['gongmang_day'])
+        cols['daeun_direction'] = np.where(is_forward, '순행', '역행')
+
+    return pd.DataFrame(cols)
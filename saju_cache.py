@@ -0,0 +1,170 @@
+"""
+사주 명식 계산 결과 캐시 모듈
+- calculate_saju -> get_saju_details -> get_extended_saju_data 전체 과정을 정규화된 출생 정보 기준으로 캐시
+- 한 프로세스 안의 모든 세션이 공유하며, 크기(LRU)와 유효 시간(TTL)으로 제한
+- 캐시된 결과는 읽기 전용(FrozenDict / tuple)으로 반환되어 호출 측에서 변경할 수 없음
+- 일부 항목이 빠진 계산 결과(확장 단계 실패)는 캐시하지 않고 오류로 전달
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from saju_utils import get_extended_saju_data
+from backend.tracing import span
+from backend.metrics import count_error
+
+DEFAULT_MAXSIZE = int(os.environ.get('SAJU_CHART_CACHE_SIZE', 2048))
+DEFAULT_TTL = float(os.environ.get('SAJU_CHART_CACHE_TTL', 6 * 60 * 60))
+# 화면·분석에 필요한 확장 명식 항목 (get_extended_saju_data 는 실패해도 중간 결과를 반환하므로 확인)
+REQUIRED_CHART_KEYS = ('pillars', 'ten_gods', 'jiji_ten_gods', 'twelve_growth', 'five_elements',
+                       'sinsal_details', 'gongmang', 'relations', 'sinsal', 'fortune')
+
+class FrozenDict(dict):
+    """변경 불가능한 dict (조회 방식은 일반 dict 와 동일)"""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("캐시된 사주 명식은 수정할 수 없습니다. thaw() 로 사본을 만들어 사용하세요.")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.items(), key=lambda kv: str(kv[0]))))
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+def freeze(obj):
+    """dict/list 중첩 구조 -> FrozenDict/tuple 중첩 구조"""
+    if isinstance(obj, FrozenDict): return obj
+    if isinstance(obj, dict): return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)): return tuple(freeze(v) for v in obj)
+    if isinstance(obj, set): return frozenset(obj)
+    return obj
+
+def thaw(obj):
+    """freeze 의 역변환 (수정 가능한 사본)"""
+    if isinstance(obj, dict): return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, tuple): return [thaw(v) for v in obj]
+    if isinstance(obj, frozenset): return set(obj)
+    return obj
+
+def normalize_birth_input(year, month, day, hour, minute, gender, calendar_type='양력', is_leap=False,
+                          longitude=127.5, use_solar_time=True, early_zi_time=False):
+    """
+    출생 정보 -> 캐시 키 (양력 날짜, 시각, 성별, 경도, 야자시, 태양시 보정)
+    음력 입력은 양력으로 변환한 날짜로 키를 만들어 같은 생일의 음력·양력 입력이 하나의 항목을 공유하도록 함
+    """
+    year, month, day, hour, minute = int(year), int(month), int(day), int(hour), int(minute)
+    if calendar_type == '음력':
+        from saju_calendar import lunar_to_solar
+        with span('chart.lunar_to_solar'):
+            year, month, day = lunar_to_solar(year, month, day, bool(is_leap))
+    lon = round(float(longitude), 4) if longitude is not None else None
+    return (year, month, day, hour, minute, gender, lon, bool(early_zi_time), bool(use_solar_time))
+
+def check_chart(details):
+    """확장 명식 항목 확인 (빠진 항목이 있거나 대운 목록이 비었으면 ValueError)"""
+    missing = [k for k in REQUIRED_CHART_KEYS if k not in details]
+    if not missing and not details['fortune'].get('list'):
+        missing = ['fortune.list']
+    if missing:
+        raise ValueError(f"명식 계산 결과에 {', '.join(missing)} 항목이 없습니다.")
+    return details
+
+def compute_chart(key):
+    """정규화된 키로 명식 전체 계산 (캐시 미사용, 불완전한 결과는 ValueError)
+    4주는 만세력 일자 테이블(메모리 매핑 저장본)에서 조회하므로 sajupy 달력 DataFrame 을 만들지 않음"""
+    from saju_calendar import calculate_saju, get_saju_details
+    year, month, day, hour, minute, gender, longitude, early_zi_time, use_solar_time = key
+    with span('chart.calculate_saju'):
+        saju_res = calculate_saju(year, month, day, hour, minute,
+                                  use_solar_time=use_solar_time, longitude=longitude, early_zi_time=early_zi_time)
+    try:
+        with span('chart.extended'):
+            return check_chart(get_extended_saju_data(get_saju_details(saju_res), gender=gender))
+    except Exception:
+        count_error('chart.extended')
+        raise
+
+class ChartCache:
+    """스레드 안전 LRU + TTL 명식 캐시"""
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """캐시 조회 (없거나 만료되었으면 None)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if self.ttl is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        value = freeze(value)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, func):
+        """캐시 조회, 없으면 계산 후 저장 (계산 중 예외는 저장하지 않고 그대로 전달)"""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, func(key))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """적중/실패 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+# 프로세스 전역 캐시 (모든 세션 공유)
+chart_cache = ChartCache()
+
+def get_chart(year, month, day, hour, minute, gender, calendar_type='양력', is_leap=False,
+              longitude=127.5, use_solar_time=True, early_zi_time=False):
+    """캐시를 거쳐 확장 명식 반환 (읽기 전용 결과)"""
+    key = normalize_birth_input(year, month, day, hour, minute, gender, calendar_type, is_leap,
+                                longitude, use_solar_time, early_zi_time)
+    with span('chart.get_chart'):
+        return chart_cache.get_or_compute(key, compute_chart)
+
+def get_chart_cache_stats():
+    return chart_cache.stats()
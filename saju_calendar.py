@@ -0,0 +1,433 @@
+"""
+만세력 일자 테이블 모듈
+- sajupy 달력(1900-2100)을 하루 한 행의 고정 폭 정수 테이블로 미리 계산하여 .npy 파일로 저장
+- 행: 연/월/일주 60갑자 코드, 음력 연월일, 윤달 여부, 절입 시각, 이전/다음 절입 시각 (당일 0시 기준 분 오프셋)
+- 실행 시에는 메모리 매핑으로 읽으므로 시작 비용이 거의 없고, 여러 워커 프로세스가 같은 페이지를 공유
+- 음력 -> 양력 변환은 (음력 연, 월 또는 윤달, 일) 순번 색인으로 O(1) 조회, 일괄 변환(lunar_to_solar_many) 지원
+- 사주 4주 계산(calculate_saju, get_saju_details)도 이 테이블에서 조회하여 명식 계산 경로가 sajupy DataFrame 을 만들지 않음
+  (sajupy calculate_saju 와 같은 규칙·같은 결과 구조, saju_batch 의 일괄 계산과 같은 방식)
+- 파생 배열(절입 시각 정렬 배열, 음력 색인, 해마다 윤달)도 함께 저장하여 시작 시 다시 계산하지 않음
+- 메타 정보(json)의 형식 버전·sajupy 버전·dtype 이 현재와 다르거나 파일이 없으면 sajupy 달력에서 즉시 구축하고 이유를 출력
+  (python saju_calendar.py 로 미리 생성, python saju_calendar.py check 로 저장본과 재계산 결과 비교)
+- sajupy 변환과의 비교·속도 측정: python saju_calendar.py bench [간격]
+"""
+import os
+import sys
+import json
+import time
+import threading
+from datetime import date
+
+import numpy as np
+
+from saju_utils import GANZHI_LIST, GANZHI_CODES, HEAVENLY_STEMS, EARTHLY_BRANCHES, JEOL_NAMES, term_time_to_minutes
+
+PRECOMPUTED_DIR = os.environ.get(
+    'SAJU_PRECOMPUTED_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'precomputed'))
+CALENDAR_PATH = os.path.join(PRECOMPUTED_DIR, 'saju_calendar.npy')
+CALENDAR_META_PATH = os.path.join(PRECOMPUTED_DIR, 'saju_calendar.json')
+# 파생 배열 파일 (이름 -> 파일명, 일자 테이블과 같은 디렉토리)
+DERIVED_FILES = {
+    'jeol': 'saju_jeol.npy',                # 절입 시각(epoch 분) 정렬 배열
+    'lunar_index': 'saju_lunar_index.npy',  # 음력 날짜 순번 -> 행 번호
+    'leap_month': 'saju_leap_month.npy',    # 해마다 윤달이 든 달 (없으면 0)
+}
+# 저장 형식 버전 (테이블 구성·계산 방식을 바꾸면 올려서 이전 저장본을 무시)
+SNAPSHOT_VERSION = 2
+
+CALENDAR_DTYPE = np.dtype([
+    ('year_pillar', 'i1'), ('month_pillar', 'i1'), ('day_pillar', 'i1'),
+    ('lunar_month', 'i1'), ('lunar_day', 'i1'), ('is_leap', 'i1'), ('lunar_year', 'i2'),
+    ('jeol_term', 'i4'),   # 당일 절입 시각 (sajupy 행 기준, 없으면 NO_TERM)
+    ('prev_jeol', 'i4'),   # 당일 24시 이전의 마지막 절입 시각 (없으면 NO_TERM)
+    ('next_jeol', 'i4'),   # 당일 0시 이후의 첫 절입 시각 (없으면 NO_NEXT)
+])
+NO_TERM = int(np.iinfo(np.int32).min)
+NO_NEXT = int(np.iinfo(np.int32).max)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def to_epoch_day(year, month, day):
+    """양력 날짜 -> 1970-01-01 기준 일수"""
+    return date(year, month, day).toordinal() - _EPOCH_ORDINAL
+
+def build_calendar_array():
+    """sajupy 달력 -> (CALENDAR_DTYPE 배열, 첫 행의 epoch 일수)"""
+    import pandas as pd
+    from sajupy import get_saju_calculator
+    df = get_saju_calculator().data
+    # sajupy는 같은 날짜가 여러 행이면 첫 행을 사용하므로 동일하게 중복 제거
+    df = df.drop_duplicates(subset=['year', 'month', 'day'], keep='first').reset_index(drop=True)
+    days = pd.to_datetime(df[['year', 'month', 'day']]).to_numpy().astype('datetime64[D]').astype(np.int64)
+    if len(days) != days[-1] - days[0] + 1 or not np.all(np.diff(days) == 1):
+        raise ValueError("sajupy 달력 데이터가 연속된 일자가 아닙니다.")
+    start = int(days[0])
+    day_start = days * 1440
+
+    table = np.zeros(len(df), dtype=CALENDAR_DTYPE)
+    for col in ['year_pillar', 'month_pillar', 'day_pillar']:
+        table[col] = df[col].map(GANZHI_CODES).to_numpy()
+    table['lunar_year'] = df['lunar_year'].to_numpy()
+    table['lunar_month'] = df['lunar_month'].to_numpy()
+    table['lunar_day'] = df['lunar_day'].to_numpy()
+
+    # 윤달: 같은 음력 연월이 바로 이어서 다시 1일부터 시작하는 두 번째 구간 (원본 데이터에 윤달 표시 없음)
+    ym = df['lunar_year'].to_numpy().astype(np.int64) * 100 + df['lunar_month'].to_numpy()
+    lunar_day = df['lunar_day'].to_numpy()
+    run_start = np.r_[True, (ym[1:] != ym[:-1]) | (lunar_day[1:] <= lunar_day[:-1])]
+    run_id = np.cumsum(run_start)
+    first_run = pd.Series(run_id).groupby(ym).transform('min').to_numpy()
+    table['is_leap'] = run_id != first_run
+
+    # 절입 시각 (당일 0시 기준 분)
+    is_jeol = df['solar_term_korean'].isin(JEOL_NAMES).to_numpy() & df['term_time'].notna().to_numpy()
+    term_minutes = np.full(len(df), np.iinfo(np.int64).min, dtype=np.int64)
+    for pos, t in zip(np.flatnonzero(is_jeol), df['term_time'].to_numpy()[is_jeol].astype(np.int64)):
+        term_minutes[pos] = term_time_to_minutes(t)
+    table['jeol_term'] = np.where(is_jeol, term_minutes - day_start, NO_TERM)
+
+    jeol = np.unique(term_minutes[is_jeol])
+    nxt = np.searchsorted(jeol, day_start, side='left')
+    prv = np.searchsorted(jeol, day_start + 1440, side='left') - 1
+    table['next_jeol'] = np.where(nxt < len(jeol), jeol[np.minimum(nxt, len(jeol) - 1)] - day_start, NO_NEXT)
+    table['prev_jeol'] = np.where(prv >= 0, jeol[np.maximum(prv, 0)] - day_start, NO_TERM)
+    return table, start
+
+def _sajupy_version():
+    """설치된 sajupy 버전 (sajupy 를 import 하지 않고 패키지 정보에서 읽음)"""
+    try:
+        from importlib.metadata import version
+        return version('sajupy')
+    except Exception:
+        return None
+
+def snapshot_signature():
+    """저장본이 현재 코드·데이터와 맞는지 확인하는 항목"""
+    return {'version': SNAPSHOT_VERSION, 'sajupy_version': _sajupy_version(), 'dtype': str(CALENDAR_DTYPE.descr)}
+
+def _save_array(path, array):
+    tmp = path + '.tmp.npy'
+    np.save(tmp, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+def save_calendar(path=CALENDAR_PATH, meta_path=CALENDAR_META_PATH):
+    """일자 테이블과 파생 배열을 .npy 로, 버전·크기 정보를 json 으로 저장 (메타 정보를 마지막에 교체)"""
+    table, start = build_calendar_array()
+    calendar = CalendarTable(table, start)
+    first_year, years, index, leap_month = calendar.lunar_index()
+    derived = {'jeol': calendar.jeol_term_minutes(), 'lunar_index': index, 'leap_month': leap_month}
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    _save_array(path, table)
+    for name, array in derived.items():
+        _save_array(os.path.join(directory, DERIVED_FILES[name]), array)
+    meta = dict(snapshot_signature(), start_day=start, rows=len(table), first_lunar_year=first_year,
+                lunar_years=years, files={name: len(array) for name, array in derived.items()})
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+    return table, start
+
+class CalendarTable:
+    """일자 테이블 조회 (행 번호 = epoch 일수 - start_day)"""
+    def __init__(self, table, start_day, jeol=None, lunar=None):
+        self.table = table
+        self.start_day = int(start_day)
+        self.size = len(table)
+        # 필드별 뷰 (구조화 배열에서 필드를 매번 꺼내지 않도록)
+        self.year_pillar = table['year_pillar']
+        self.month_pillar = table['month_pillar']
+        self.day_pillar = table['day_pillar']
+        self.jeol_term = table['jeol_term']
+        self.prev_jeol = table['prev_jeol']
+        self.next_jeol = table['next_jeol']
+        # 저장본에서 읽은 파생 배열 (없으면 최초 사용 시 계산)
+        self._jeol = jeol
+        self._lunar = lunar
+
+    def lunar_index(self):
+        """음력 날짜 순번 -> 행 번호 색인 (최초 사용 시 1회 구성)
+        순번 = ((음력 연 - 첫 해) * 13 + 월 칸) * 30 + 일 - 1, 월 칸은 평달 0-11, 윤달 12"""
+        if self._lunar is None:
+            ly = np.asarray(self.table['lunar_year'], dtype=np.int64)
+            lm = np.asarray(self.table['lunar_month'], dtype=np.int64)
+            ld = np.asarray(self.table['lunar_day'], dtype=np.int64)
+            leap = np.asarray(self.table['is_leap'], dtype=bool)
+            first_year = int(ly.min())
+            years = int(ly.max()) - first_year + 1
+            slot = np.where(leap, 12, lm - 1)
+            index = np.full(years * 13 * 30, -1, dtype=np.int32)
+            index[((ly - first_year) * 13 + slot) * 30 + ld - 1] = np.arange(self.size, dtype=np.int32)
+            # 해마다 윤달이 든 달 (없으면 0)
+            leap_month = np.zeros(years, dtype=np.int8)
+            leap_month[ly[leap] - first_year] = lm[leap]
+            self._lunar = (first_year, years, index, leap_month)
+        return self._lunar
+
+    def _lunar_rows(self, year, month, day, is_leap):
+        """음력 날짜 배열 -> 행 번호 배열 (없는 날짜는 -1)"""
+        first_year, years, index, leap_month = self.lunar_index()
+        y = np.asarray(year, dtype=np.int64) - first_year
+        m = np.asarray(month, dtype=np.int64)
+        d = np.asarray(day, dtype=np.int64)
+        leap = np.asarray(is_leap, dtype=bool)
+        valid = (y >= 0) & (y < years) & (m >= 1) & (m <= 12) & (d >= 1) & (d <= 30)
+        y, m, d = np.where(valid, y, 0), np.where(valid, m, 1), np.where(valid, d, 1)
+        # 윤달 요청은 그 해의 윤달과 월이 같을 때만 유효
+        valid &= ~leap | (leap_month[y] == m)
+        rows = index[(y * 13 + np.where(leap, 12, m - 1)) * 30 + d - 1]
+        return np.where(valid, rows, -1)
+
+    def lunar_to_solar(self, year, month, day, is_leap=False):
+        """음력 날짜 -> 양력 (연, 월, 일), 없는 날짜·윤달이면 ValueError"""
+        first_year, years, index, leap_month = self.lunar_index()
+        y, month, day = int(year) - first_year, int(month), int(day)
+        row = -1
+        if 0 <= y < years and 1 <= month <= 12 and 1 <= day <= 30 and (not is_leap or leap_month[y] == month):
+            row = int(index[(y * 13 + (12 if is_leap else month - 1)) * 30 + day - 1])
+        if row < 0:
+            if is_leap:
+                raise ValueError(f"음력 {year}년 {month}월은 윤달이 아니거나 {day}일이 없습니다.")
+            raise ValueError(f"음력 {year}년 {month}월 {day}일은 달력 데이터에 없는 날짜입니다.")
+        solar = date.fromordinal(self.start_day + row + _EPOCH_ORDINAL)
+        return solar.year, solar.month, solar.day
+
+    def lunar_to_solar_many(self, years, months, days, leaps=None):
+        """음력 날짜 배열 -> 양력 datetime64[D] 배열 (없는 날짜는 NaT)"""
+        if leaps is None: leaps = np.zeros(np.shape(years), dtype=bool)
+        rows = self._lunar_rows(years, months, days, leaps)
+        solar = (rows.astype(np.int64) + self.start_day).astype('datetime64[D]')
+        return np.where(rows >= 0, solar, np.datetime64('NaT'))
+
+    def row_of(self, year, month, day):
+        """양력 날짜의 행 번호 (범위 밖이면 ValueError)"""
+        row = to_epoch_day(year, month, day) - self.start_day
+        if not 0 <= row < self.size:
+            raise ValueError("달력 데이터 범위(1900-2100)를 벗어난 날짜입니다.")
+        return row
+
+    def pillar_codes(self, year, month, day):
+        """양력 날짜 -> (연주, 월주, 일주) 60갑자 코드 (절입 시각 보정 전 값)"""
+        r = self.row_of(year, month, day)
+        return int(self.year_pillar[r]), int(self.month_pillar[r]), int(self.day_pillar[r])
+
+    def calculate_saju(self, year, month, day, hour, minute=0, longitude=None, use_solar_time=False, utc_offset=9,
+                       early_zi_time=True):
+        """출생 일시 -> 사주 4주 (sajupy calculate_saju 와 같은 규칙·결과 dict, 도시명 경도 조회는 미지원)"""
+        if not 0 <= hour <= 23: raise ValueError("Hour must be between 0 and 23")
+        if not 0 <= minute <= 59: raise ValueError("Minute must be between 0 and 59")
+        orig_day = to_epoch_day(year, month, day)
+        orig_row = self.row_of(year, month, day)
+        original_time = f"{hour:02d}:{minute:02d}"
+
+        # 태양시 보정 (경도 1도당 4분, 날짜가 바뀔 수 있음)
+        solar_day, solar_correction = orig_day, None
+        if use_solar_time and longitude is not None:
+            correction = (longitude - utc_offset * 15) * 4
+            total = hour * 60 + minute + correction
+            if total < 0:
+                total, solar_day = total + 1440, solar_day - 1
+            elif total >= 1440:
+                total, solar_day = total - 1440, solar_day + 1
+            hour, minute = int(total // 60), int(total % 60)
+            solar_correction = {'city': None, 'longitude': round(longitude, 4), 'longitude_source': 'manual',
+                                'utc_offset': utc_offset, 'standard_longitude': utc_offset * 15,
+                                'correction_minutes': round(correction, 1), 'original_time': original_time,
+                                'solar_time': f"{hour:02d}:{minute:02d}"}
+
+        # 자시 처리: 야자시 미사용이면 23시부터 다음날로 계산
+        zi_time_type = None
+        if hour == 23: zi_time_type = "夜子時" if early_zi_time else "子時"
+        elif hour == 0: zi_time_type = "早子時" if early_zi_time else "子時"
+        adjustment = 1 if hour == 23 and not early_zi_time else 0
+        row = solar_day + adjustment - self.start_day
+        if not 0 <= row < self.size:
+            raise ValueError("달력 데이터 범위(1900-2100)를 벗어난 날짜입니다.")
+
+        # 절입일의 절입 시각 이전이면 이전 달(약 20일 전)의 월주
+        month_code = int(self.month_pillar[row])
+        term = int(self.jeol_term[row])
+        if term != NO_TERM and hour * 60 + minute < term and row >= 20:
+            month_code = int(self.month_pillar[row - 20])
+
+        # 시주: 23시는 (태양시 보정 후) 다음날 일간, 그 외에는 원래 날짜의 일간 기준
+        next_row = solar_day + 1 - self.start_day
+        hour_day = int(self.day_pillar[next_row if hour == 23 and next_row < self.size else orig_row])
+        hour_branch = (hour + 1) // 2 % 12
+        hour_stem = (hour_day % 10 % 5 * 2 + hour_branch) % 10
+
+        year_pillar, month_pillar = GANZHI_LIST[int(self.year_pillar[row])], GANZHI_LIST[month_code]
+        day_pillar = GANZHI_LIST[int(self.day_pillar[row])]
+        stem, branch = HEAVENLY_STEMS[hour_stem], EARTHLY_BRANCHES[hour_branch]
+        result = {
+            'year_pillar': year_pillar, 'month_pillar': month_pillar, 'day_pillar': day_pillar, 'hour_pillar': stem + branch,
+            'year_stem': year_pillar[0], 'year_branch': year_pillar[1],
+            'month_stem': month_pillar[0], 'month_branch': month_pillar[1],
+            'day_stem': day_pillar[0], 'day_branch': day_pillar[1],
+            'hour_stem': stem, 'hour_branch': branch,
+            'birth_time': original_time, 'birth_date': f"{year}-{month:02d}-{day:02d}",
+            'zi_time_type': zi_time_type, 'solar_correction': solar_correction,
+        }
+        if adjustment:
+            adjusted = date.fromordinal(self.start_day + row + _EPOCH_ORDINAL)
+            result.update(date_adjusted=True, adjusted_date=adjusted.isoformat(), date_adjustment=adjustment)
+        return result
+
+    def solar_to_lunar(self, year, month, day):
+        """양력 날짜 -> (음력 연, 월, 일, 윤달 여부)"""
+        row = self.table[self.row_of(year, month, day)]
+        return int(row['lunar_year']), int(row['lunar_month']), int(row['lunar_day']), bool(row['is_leap'])
+
+    def jeol_term_minutes(self):
+        """절입 시각(epoch 분) 정렬 배열"""
+        if self._jeol is None:
+            days = np.arange(self.size, dtype=np.int64) + self.start_day
+            mask = self.jeol_term != NO_TERM
+            self._jeol = np.unique(days[mask] * 1440 + self.jeol_term[mask])
+        return self._jeol
+
+    def find_jeol(self, birth_minutes, is_forward):
+        """출생 시각(epoch 분) 기준 다음(순행, 같으면 포함) 또는 이전(역행) 절입 시각, 범위 밖이면 None"""
+        day, minute = divmod(int(birth_minutes), 1440)
+        r = day - self.start_day
+        if not 0 <= r < self.size: return None
+        base = day * 1440
+        if is_forward:
+            off = int(self.next_jeol[r])
+            if off != NO_NEXT and off >= minute: return base + off
+            if r + 1 < self.size and self.next_jeol[r + 1] != NO_NEXT:
+                return base + 1440 + int(self.next_jeol[r + 1])
+            return None
+        off = int(self.prev_jeol[r])
+        if off != NO_TERM and off <= minute: return base + off
+        if r > 0 and self.prev_jeol[r - 1] != NO_TERM:
+            return base - 1440 + int(self.prev_jeol[r - 1])
+        return None
+
+def load_snapshot(path=CALENDAR_PATH, meta_path=CALENDAR_META_PATH):
+    """저장본을 메모리 매핑으로 읽기 (버전·dtype·크기가 맞지 않으면 ValueError, 파일이 없으면 OSError)"""
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    expected = snapshot_signature()
+    for key, value in expected.items():
+        if meta.get(key) != value:
+            raise ValueError(f"저장본 {key} 불일치 (저장본 {meta.get(key)!r}, 현재 {value!r})")
+    table = np.load(path, mmap_mode='r')
+    if table.dtype != CALENDAR_DTYPE or len(table) != meta['rows']:
+        raise ValueError("일자 테이블 형식이 다릅니다.")
+    directory = os.path.dirname(path)
+    derived = {name: np.load(os.path.join(directory, filename), mmap_mode='r') for name, filename in DERIVED_FILES.items()}
+    if any(len(derived[name]) != rows for name, rows in meta['files'].items()):
+        raise ValueError("파생 배열 크기가 메타 정보와 다릅니다.")
+    lunar = (meta['first_lunar_year'], meta['lunar_years'], derived['lunar_index'], derived['leap_month'])
+    return CalendarTable(table, meta['start_day'], jeol=derived['jeol'], lunar=lunar)
+
+def load_calendar(path=CALENDAR_PATH, meta_path=CALENDAR_META_PATH):
+    """저장본을 읽고, 없거나 버전이 맞지 않으면 sajupy 달력에서 구축"""
+    try:
+        return load_snapshot(path, meta_path)
+    except OSError as e:
+        print(f"만세력 저장본이 없어 sajupy 달력에서 다시 계산합니다 (python saju_calendar.py 로 미리 생성): {e}")
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"만세력 저장본을 사용하지 않고 다시 계산합니다: {e}")
+    table, start = build_calendar_array()
+    return CalendarTable(table, start)
+
+def check_snapshot(path=CALENDAR_PATH, meta_path=CALENDAR_META_PATH):
+    """저장본과 sajupy 달력 재계산 결과 비교 -> 다른 항목 이름 목록"""
+    saved = load_snapshot(path, meta_path)
+    table, start = build_calendar_array()
+    live = CalendarTable(table, start)
+    diffs = [] if saved.start_day == live.start_day and np.array_equal(saved.table, live.table) else ['table']
+    if not np.array_equal(saved.jeol_term_minutes(), live.jeol_term_minutes()): diffs.append('jeol')
+    for name, a, b in zip(['first_lunar_year', 'lunar_years', 'lunar_index', 'leap_month'], saved.lunar_index(), live.lunar_index()):
+        if not np.array_equal(a, b): diffs.append(name)
+    return diffs
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+def get_calendar():
+    """일자 테이블 (프로세스 전역, 최초 사용 시 1회 로드)"""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = load_calendar()
+    return _calendar
+
+def lunar_to_solar(year, month, day, is_leap=False):
+    """음력 날짜 -> 양력 (연, 월, 일) (sajupy lunar_to_solar 대체, 없는 날짜면 ValueError)"""
+    return get_calendar().lunar_to_solar(year, month, day, is_leap)
+
+def lunar_to_solar_many(years, months, days, leaps=None):
+    """음력 날짜 배열 -> 양력 datetime64[D] 배열 (일괄 가져오기용, 없는 날짜는 NaT)"""
+    return get_calendar().lunar_to_solar_many(years, months, days, leaps)
+
+def solar_to_lunar(year, month, day):
+    """양력 날짜 -> (음력 연, 월, 일, 윤달 여부)"""
+    return get_calendar().solar_to_lunar(year, month, day)
+
+def calculate_saju(year, month, day, hour, minute=0, longitude=None, use_solar_time=False, utc_offset=9, early_zi_time=True):
+    """sajupy calculate_saju 대체 (일자 테이블 조회, sajupy 달력 DataFrame 을 만들지 않음)"""
+    return get_calendar().calculate_saju(year, month, day, hour, minute, longitude=longitude,
+                                         use_solar_time=use_solar_time, utc_offset=utc_offset, early_zi_time=early_zi_time)
+
+def get_saju_details(saju_dict):
+    """sajupy get_saju_details 와 같은 구조의 상세 dict (sajupy·pandas 를 import 하지 않음)"""
+    return {
+        'pillars': {p: {'pillar': saju_dict[f'{p}_pillar'], 'stem': saju_dict[f'{p}_stem'], 'branch': saju_dict[f'{p}_branch']}
+                    for p in ['year', 'month', 'day', 'hour']},
+        'birth_time': saju_dict['birth_time'],
+        'birth_date': saju_dict.get('birth_date'),
+        'zi_time_type': saju_dict.get('zi_time_type'),
+        'date_adjusted': saju_dict.get('date_adjusted', False),
+        'solar_correction': saju_dict.get('solar_correction'),
+    }
+
+def benchmark_lunar_to_solar(step=1):
+    """달력 전체(step 일 간격) 음력 날짜를 sajupy 변환과 비교하고 소요 시간 측정"""
+    from sajupy import lunar_to_solar as sajupy_lunar_to_solar
+    calendar = get_calendar()
+    rows = calendar.table[::step]
+    dates = [(int(r['lunar_year']), int(r['lunar_month']), int(r['lunar_day']), bool(r['is_leap'])) for r in rows]
+
+    start = time.perf_counter()
+    ours = [calendar.lunar_to_solar(*d) for d in dates]
+    ours_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ours_many = calendar.lunar_to_solar_many(rows['lunar_year'], rows['lunar_month'], rows['lunar_day'], rows['is_leap'])
+    many_time = time.perf_counter() - start
+
+    mismatches = []
+    start = time.perf_counter()
+    for d, solar in zip(dates, ours):
+        try:
+            res = sajupy_lunar_to_solar(*d[:3], is_leap_month=d[3])
+            expected = (int(res['solar_year']), int(res['solar_month']), int(res['solar_day']))
+        except Exception as e:
+            expected = repr(e)
+        if expected != solar: mismatches.append((d, solar, expected))
+    sajupy_time = time.perf_counter() - start
+
+    many_ok = [tuple(map(int, str(v).split('-'))) for v in ours_many] == ours
+    return {'dates': len(dates), 'mismatches': mismatches, 'many_matches_single': many_ok,
+            'ours_us': ours_time / len(dates) * 1e6, 'many_us': many_time / len(dates) * 1e6,
+            'sajupy_us': sajupy_time / len(dates) * 1e6}
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        result = benchmark_lunar_to_solar(int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+        print(f"음력 {result['dates']}일 변환: 건별 {result['ours_us']:.2f}us, 일괄 {result['many_us']:.3f}us, "
+              f"sajupy {result['sajupy_us']:.1f}us (건당)")
+        print(f"sajupy 와 다른 결과 {len(result['mismatches'])}건, 일괄/건별 일치: {result['many_matches_single']}")
+        for mismatch in result['mismatches'][:10]:
+            print("  ", mismatch)
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'check':
+        diffs = check_snapshot()
+        print("저장본이 재계산 결과와 같습니다." if not diffs else f"저장본이 재계산 결과와 다릅니다: {', '.join(diffs)}")
+        sys.exit(1 if diffs else 0)
+    table, start = save_calendar()
+    print(f"만세력 일자 테이블 생성 완료: {len(table)}행, {table.nbytes / 1024:.0f}KB -> {CALENDAR_PATH}")
@@ -3,8 +3,13 @@
 사주 명리학 계산을 위한 유틸리티 모듈
 - 오행, 십성, 12운성, 대운, 세운, 신살, 형충회합 매핑 및 계산 로직 포함
 """
-import pandas as pd
-from datetime import datetime
+import os
+import threading
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
 
 # 천간 및 지지
 HEAVENLY_STEMS = ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸']
@@ -87,124 +92,248 @@ BRANCH_RELATIONS = {
     '귀문': {'子':'未', '未':'子', '丑':'午', '午':'丑', '寅':'未', '未':'寅', '卯':'申', '申':'卯', '辰':'亥', '亥':'辰', '巳':'戌', '戌':'巳'}
 }
 
+# --- 정수 코드 표현 (천간 0-9, 지지 0-11, 60갑자 0-59) 및 O(1) 룩업 테이블 ---
+STEM_CODES = {s: i for i, s in enumerate(HEAVENLY_STEMS)}
+BRANCH_CODES = {b: i for i, b in enumerate(EARTHLY_BRANCHES)}
+GANZHI_CODES = {gz: i for i, gz in enumerate(GANZHI_LIST)}
+
+TEN_GOD_NAMES = ['비견', '겁재', '식신', '상관', '편재', '정재', '편관', '정관', '편인', '정인']
+GROWTH_NAMES = ['장생', '목욕', '관대', '건록', '제왕', '쇠', '병', '사', '묘', '절', '태', '양']
+SINSAL_NAMES = ['지살', '년살', '월살', '망신살', '장성살', '반안살', '역마살', '육해살', '화개살', '겁살', '재살', '천살']
+ELEMENT_NAMES = ['목', '화', '토', '금', '수']
+# 60갑자를 10개씩 묶은 6개 순(旬)별 공망
+GONGMANG_NAMES = ['戌亥', '申酉', '午未', '辰巳', '寅卯', '子丑']
+
+# 삼합 기준 12신살 시작 지지 (화국 -> 인지살, 수국 -> 신지살, 금국 -> 사지살, 목국 -> 해지살)
+SINSAL_GROUP_START = {
+    '寅':'寅', '午':'寅', '戌':'寅',
+    '申':'申', '子':'申', '辰':'申',
+    '巳':'巳', '酉':'巳', '丑':'巳',
+    '亥':'亥', '卯':'亥', '未':'亥'
+}
+
+# 관계 비트 플래그 (천간 합/충, 지지 형충회합)
+REL_STEM_CHUNG = 1 << 0
+REL_STEM_HAP = 1 << 1
+REL_CHUNG = 1 << 2
+REL_HAP = 1 << 3
+REL_HYEONG = 1 << 4
+REL_PA = 1 << 5
+REL_HAE = 1 << 6
+REL_WONJIN = 1 << 7
+REL_GWIMUN = 1 << 8
+BASIC_RELATION_BITS = REL_STEM_CHUNG | REL_STEM_HAP | REL_CHUNG | REL_HAP
+SINSAL_RELATION_BITS = REL_WONJIN | REL_GWIMUN
+# 비트 순서대로의 관계 라벨 (기본 / 천간 접두어 / 한자 병기)
+RELATION_LABELS = [
+    (REL_STEM_CHUNG, '충'), (REL_STEM_HAP, '합'), (REL_CHUNG, '충'), (REL_HAP, '합'),
+    (REL_HYEONG, '형'), (REL_PA, '파'), (REL_HAE, '해'), (REL_WONJIN, '원진'), (REL_GWIMUN, '귀문')
+]
+RELATION_LABELS_PREFIXED = [
+    (REL_STEM_CHUNG, '천간충'), (REL_STEM_HAP, '천간합'), (REL_CHUNG, '충'), (REL_HAP, '합'),
+    (REL_HYEONG, '형'), (REL_PA, '파'), (REL_HAE, '해'), (REL_WONJIN, '원진'), (REL_GWIMUN, '귀문')
+]
+RELATION_LABELS_HANJA = [
+    (REL_STEM_CHUNG, '천간충(沖)'), (REL_STEM_HAP, '천간합(合)'), (REL_CHUNG, '충(沖)'), (REL_HAP, '합(合)'),
+    (REL_HYEONG, '형(刑)'), (REL_PA, '파(破)'), (REL_HAE, '해(害)'), (REL_WONJIN, '원진(元嗔)'), (REL_GWIMUN, '귀문(鬼門)')
+]
+
+def stem_code(stem):
+    """천간 문자 -> 0-9 (알 수 없으면 -1)"""
+    return STEM_CODES.get(stem, -1)
+
+def branch_code(branch):
+    """지지 문자 -> 0-11 (알 수 없으면 -1)"""
+    return BRANCH_CODES.get(branch, -1)
+
+def ganzhi_code(ganzhi):
+    """간지 문자열 -> 0-59 (알 수 없으면 -1)"""
+    try: return GANZHI_CODES.get(ganzhi, -1)
+    except TypeError: return -1
+
+def ganzhi_from_code(code):
+    """0-59 -> 간지 문자열"""
+    return GANZHI_LIST[code % 60]
+
+def make_ganzhi_code(s_code, b_code):
+    """천간/지지 코드 -> 60갑자 코드 (음양이 같은 조합만 유효)"""
+    return (6 * s_code - 5 * b_code) % 60
+
+def split_ganzhi_code(code):
+    """60갑자 코드 -> (천간 코드, 지지 코드)"""
+    return code % 10, code % 12
+
+def _build_table(rows, cols, func, dtype=np.int8):
+    return np.array([[func(r, c) for c in cols] for r in rows], dtype=dtype)
+
+# [일간, 천간] -> 십성, [일간, 지지] -> 지장간(정기) 십성 / 12운성, [기준 지지, 지지] -> 12신살
+TEN_GOD_TABLE = _build_table(HEAVENLY_STEMS, HEAVENLY_STEMS, lambda d, s: TEN_GOD_NAMES.index(GAN_TEN_GODS[d][s]))
+BRANCH_TEN_GOD_TABLE = _build_table(
+    HEAVENLY_STEMS, EARTHLY_BRANCHES, lambda d, b: TEN_GOD_NAMES.index(GAN_TEN_GODS[d][BRANCH_HIDDEN_GANS[b]]))
+GROWTH_TABLE = _build_table(HEAVENLY_STEMS, EARTHLY_BRANCHES, lambda d, b: GROWTH_NAMES.index(TWELVE_GROWTH[d][b]))
+SINSAL_TABLE = _build_table(
+    EARTHLY_BRANCHES, EARTHLY_BRANCHES,
+    lambda r, b: (BRANCH_CODES[b] - BRANCH_CODES[SINSAL_GROUP_START[r]]) % 12)
+STEM_ELEMENT = np.array([ELEMENT_NAMES.index(ELEMENTS_MAP[s]) for s in HEAVENLY_STEMS], dtype=np.int8)
+BRANCH_ELEMENT = np.array([ELEMENT_NAMES.index(ELEMENTS_MAP[b]) for b in EARTHLY_BRANCHES], dtype=np.int8)
+
+def _branch_relation_mask(a, b):
+    mask = 0
+    for bit, key in [(REL_CHUNG, '충'), (REL_HAP, '합'), (REL_PA, '파'), (REL_HAE, '해'),
+                     (REL_WONJIN, '원진'), (REL_GWIMUN, '귀문')]:
+        if BRANCH_RELATIONS[key].get(a) == b: mask |= bit
+    h_val = BRANCH_RELATIONS['형'].get(a)
+    if h_val and (b in h_val if isinstance(h_val, list) else h_val == b): mask |= REL_HYEONG
+    return mask
+
+# [기준 천간, 대상 천간] / [기준 지지, 대상 지지] -> 관계 비트마스크
+STEM_RELATION_TABLE = _build_table(
+    HEAVENLY_STEMS, HEAVENLY_STEMS,
+    lambda a, b: (REL_STEM_CHUNG if STEM_RELATIONS['충'].get(a) == b else 0) |
+                 (REL_STEM_HAP if STEM_RELATIONS['합'].get(a) == b else 0), dtype=np.uint16)
+BRANCH_RELATION_TABLE = _build_table(EARTHLY_BRANCHES, EARTHLY_BRANCHES, _branch_relation_mask, dtype=np.uint16)
+
+# [기준 간지, 대상 간지] -> 천간 + 지지 관계 비트마스크 (60x60, 관계 판정은 배열 1회 조회)
+_CYCLE = np.arange(60)
+RELATION_MATRIX = (STEM_RELATION_TABLE[(_CYCLE % 10)[:, None], (_CYCLE % 10)[None, :]] |
+                   BRANCH_RELATION_TABLE[(_CYCLE % 12)[:, None], (_CYCLE % 12)[None, :]])
+
+# 단건 계산용 파이썬 리스트 사본 (numpy 스칼라 인덱싱보다 빠름, 배치 계산은 위 numpy 테이블 사용)
+_TEN_GOD = TEN_GOD_TABLE.tolist()
+_BRANCH_TEN_GOD = BRANCH_TEN_GOD_TABLE.tolist()
+_GROWTH = GROWTH_TABLE.tolist()
+_SINSAL = SINSAL_TABLE.tolist()
+_STEM_ELEMENT = STEM_ELEMENT.tolist()
+_BRANCH_ELEMENT = BRANCH_ELEMENT.tolist()
+_RELATION = RELATION_MATRIX.tolist()
+
+# 관계 비트마스크(9비트) -> 기본 라벨 리스트 (비트 순서)
+_MASK_LABELS = [[label for bit, label in RELATION_LABELS if mask & bit] for mask in range(1 << len(RELATION_LABELS))]
+
+def get_relation_mask(ganzhi, target):
+    """두 간지 사이의 관계 비트마스크 (간지를 알 수 없으면 0)"""
+    a, b = ganzhi_code(ganzhi), ganzhi_code(target)
+    if a < 0 or b < 0: return 0
+    return _RELATION[a][b]
+
+def decode_relations(mask, labels=RELATION_LABELS):
+    """관계 비트마스크 -> 라벨 리스트 (비트 순서, labels 에 없는 비트는 무시)"""
+    if labels is RELATION_LABELS: return list(_MASK_LABELS[mask])
+    return [label for bit, label in labels if mask & bit]
+
 def get_ganzhi_index(ganzhi):
-    try: return GANZHI_LIST.index(ganzhi)
-    except: return -1
+    return ganzhi_code(ganzhi)
 
 def get_next_ganzhi(ganzhi, step=1):
-    idx = get_ganzhi_index(ganzhi)
+    idx = ganzhi_code(ganzhi)
     if idx == -1: return ""
     return GANZHI_LIST[(idx + step) % 60]
 
 def get_prev_ganzhi(ganzhi, step=1):
-    idx = get_ganzhi_index(ganzhi)
+    idx = ganzhi_code(ganzhi)
     if idx == -1: return ""
     return GANZHI_LIST[(idx - step) % 60]
 
+# 12절기 (월을 바꾸는 절입, 명리학 대운수는 절기 기준임)
+JEOL_NAMES = ['입춘', '경칩', '청명', '입하', '망종', '소서', '입추', '백로', '한로', '입동', '대설', '소한']
+
+_EPOCH = datetime(1970, 1, 1)
+_MINUTE = timedelta(minutes=1)
+_jeol_index = None
+_jeol_lock = threading.Lock()
+
+def to_epoch_minutes(dt):
+    """naive datetime -> 1970-01-01 기준 경과 분(int)"""
+    return (dt - _EPOCH) // _MINUTE
+
+def term_time_to_minutes(term_time):
+    """sajupy 달력의 term_time(YYYYMMDDHHMM 정수) -> epoch 분"""
+    t = int(term_time)
+    return to_epoch_minutes(datetime(t // 10**8, t // 10**6 % 100, t // 10**4 % 100, t // 100 % 100, t % 100))
+
+def _build_jeol_index():
+    """만세력 일자 테이블(saju_calendar)에서 12절기 절입 시각을 뽑아 정렬된 int64(epoch 분) 배열로 구성"""
+    from saju_calendar import get_calendar
+    return get_calendar().jeol_term_minutes()
+
+def get_jeol_index():
+    """12절기 절입 시각 인덱스 (프로세스 전역, 최초 사용 시 1회 구축)"""
+    global _jeol_index
+    if _jeol_index is None:
+        with _jeol_lock:
+            if _jeol_index is None:
+                _jeol_index = _build_jeol_index()
+    return _jeol_index
+
+def find_jeol_minutes(birth_minutes, is_forward):
+    """출생 시각(epoch 분) 기준 다음(순행) 또는 이전(역행) 절입 시각, 없으면 None"""
+    from saju_calendar import get_calendar
+    # 일자 테이블의 당일 이전/다음 절입 오프셋으로 O(1) 조회, 범위 밖이면 절입 인덱스 탐색
+    target = get_calendar().find_jeol(birth_minutes, is_forward)
+    if target is not None: return target
+    index = get_jeol_index()
+    if is_forward:
+        pos = int(np.searchsorted(index, birth_minutes, side='left'))
+        return int(index[pos]) if pos < len(index) else None
+    pos = int(np.searchsorted(index, birth_minutes, side='right')) - 1
+    return int(index[pos]) if pos >= 0 else None
+
+def daeun_number_from_minutes(diff_minutes):
+    """생일과 절기 사이의 분 차이 -> 대운수 (일수 / 3, 반올림, 최소 1)"""
+    return max(1, int((abs(diff_minutes) / (24 * 60) / 3) + 0.5))
+
 def calculate_daeun_number(year, month, day, hour, minute, is_forward):
     """대운수 계산 (12절기 Jeol 기준 정밀화)"""
     try:
-        from sajupy import get_saju_calculator
-        calc = get_saju_calculator()
-        df = calc.data
-        birth_dt = datetime(year, month, day, hour, minute)
-        
-        # 12절기만 필터링 (명리학 대운수는 절기 기준임)
-        jeols = ['입춘', '경칩', '청명', '입하', '망종', '소서', '입추', '백로', '한로', '입동', '대설', '소한']
-        df_jeol = df[df['solar_term_korean'].isin(jeols)].copy()
-        
-        df_jeol['term_dt'] = pd.to_datetime(df_jeol['term_time'].astype(str).str.split('.').str[0], format='%Y%m%d%H%M')
-        
-        if is_forward:
-            future_terms = df_jeol[df_jeol['term_dt'] >= birth_dt]
-            if future_terms.empty: return 1
-            target_term = future_terms.iloc[0]['term_dt']
-        else:
-            past_terms = df_jeol[df_jeol['term_dt'] <= birth_dt]
-            if past_terms.empty: return 1
-            target_term = past_terms.iloc[-1]['term_dt']
-            
-        diff_seconds = abs((target_term - birth_dt).total_seconds())
-        # 대운수 = 생일과 절기 사이의 일수 / 3
-        daeun_num = int((diff_seconds / (24 * 3600) / 3) + 0.5)
-        return max(1, daeun_num)
+        birth_minutes = to_epoch_minutes(datetime(year, month, day, hour, minute))
+        target = find_jeol_minutes(birth_minutes, is_forward)
+        if target is None: return 1
+        return daeun_number_from_minutes(target - birth_minutes)
     except: return 1
 
 def get_sinsal_list(ref_branch, branch):
     """지지 기반 12신살 산출 (참조 지지 기준)"""
-    groups_start = {
-        '寅':'寅', '午':'寅', '戌':'寅',     # 화국 -> 인지살
-        '申':'申', '子':'申', '辰':'申',     # 수국 -> 신지살
-        '巳':'巳', '酉':'巳', '丑':'巳',     # 금국 -> 사지살
-        '亥':'亥', '卯':'亥', '未':'亥'      # 목국 -> 해지살
-    }
-    start_branch = groups_start.get(ref_branch, '寅')
-    order = ['지살', '년살', '월살', '망신살', '장성살', '반안살', '역마살', '육해살', '화개살', '겁살', '재살', '천살']
-    diff = (EARTHLY_BRANCHES.index(branch) - EARTHLY_BRANCHES.index(start_branch) + 12) % 12
-    return order[diff]
+    ref = BRANCH_CODES.get(ref_branch, BRANCH_CODES['寅'])
+    return SINSAL_NAMES[_SINSAL[ref][BRANCH_CODES[branch]]]
 
 def get_gongmang(ganzhi):
     """공망(Void) 산출"""
-    idx = get_ganzhi_index(ganzhi)
+    idx = ganzhi_code(ganzhi)
     if idx == -1: return "-"
-    # 60갑자를 10개씩 묶어 6개 조로 나눔
-    group_idx = idx // 10
-    gongmang_list = ['戌亥', '申酉', '午未', '辰巳', '寅卯', '子丑']
-    return gongmang_list[group_idx]
+    return GONGMANG_NAMES[idx // 10]
 
 def get_ganzhi_details(day_gan, year_branch, ganzhi, pillars=None, day_branch=None):
     """특정 간지의 상세 명리 데이터 산출 (다중 신살 포함)"""
     if not ganzhi or len(ganzhi) < 2: return {}
-    stem, branch = ganzhi[0], ganzhi[1]
+    s, b = STEM_CODES.get(ganzhi[0], -1), BRANCH_CODES.get(ganzhi[1], -1)
+    d = STEM_CODES.get(day_gan, -1)
     
     # 십성 및 십이운성
-    s_ten = GAN_TEN_GODS.get(day_gan, {}).get(stem, '-')
-    b_ten = GAN_TEN_GODS.get(day_gan, {}).get(BRANCH_HIDDEN_GANS.get(branch), '-')
-    growth = TWELVE_GROWTH.get(day_gan, {}).get(branch, '-')
+    s_ten = TEN_GOD_NAMES[_TEN_GOD[d][s]] if d >= 0 and s >= 0 else '-'
+    b_ten = TEN_GOD_NAMES[_BRANCH_TEN_GOD[d][b]] if d >= 0 and b >= 0 else '-'
+    growth = GROWTH_NAMES[_GROWTH[d][b]] if d >= 0 and b >= 0 else '-'
     
     # 다중 신살 (년지 기준 + 가능하면 일지 기준)
-    sinsal_year = get_sinsal_list(year_branch, branch)
+    sinsal_year = get_sinsal_list(year_branch, ganzhi[1])
     sinsal_combined = [sinsal_year]
     if day_branch:
-        sinsal_day = get_sinsal_list(day_branch, branch)
+        sinsal_day = get_sinsal_list(day_branch, ganzhi[1])
         if sinsal_day not in sinsal_combined:
             sinsal_combined.append(sinsal_day)
     
-    # 원국과의 관계
+    # 원국과의 관계 (천간 합/충 + 지지 합/충/형/파/해/원진/귀문)
     rels = []
-    if pillars:
+    code = GANZHI_CODES.get(ganzhi[:2], -1)
+    if pillars and code >= 0:
         p_map = {'year':'년', 'month':'월', 'day':'일', 'hour':'시'}
+        row = _RELATION[code]
         for k, p in pillars.items():
-            name = p_map.get(k, k)
-            p_stem = p.get('stem')
-            p_branch = p.get('branch')
-            
-            # 천간 관계
-            if STEM_RELATIONS['충'].get(stem) == p_stem: rels.append(f"{name}충")
-            if STEM_RELATIONS['합'].get(stem) == p_stem: rels.append(f"{name}합")
-            
-            # 지지 관계
-            if BRANCH_RELATIONS['충'].get(branch) == p_branch: rels.append(f"{name}충")
-            if BRANCH_RELATIONS['합'].get(branch) == p_branch: rels.append(f"{name}합")
-            
-            # 지지 형(刑)
-            h_val = BRANCH_RELATIONS['형'].get(branch)
-            if h_val:
-                if isinstance(h_val, list):
-                    if p_branch in h_val: rels.append(f"{name}형")
-                elif h_val == p_branch: rels.append(f"{name}형")
-                
-            # 지지 파(破)
-            if BRANCH_RELATIONS['파'].get(branch) == p_branch: rels.append(f"{name}파")
-            
-            # 지지 해(害)
-            if BRANCH_RELATIONS['해'].get(branch) == p_branch: rels.append(f"{name}해")
-            
-            # 지지 원진(元嗔)
-            if BRANCH_RELATIONS['원진'].get(branch) == p_branch: rels.append(f"{name}원진")
-            
-            # 지지 귀문(鬼門)
-            if BRANCH_RELATIONS['귀문'].get(branch) == p_branch: rels.append(f"{name}귀문")
+            p_code = GANZHI_CODES.get(f"{p.get('stem')}{p.get('branch')}", -1)
+            if p_code < 0: continue
+            mask = row[p_code]
+            if mask:
+                name = p_map.get(k, k)
+                for label in _MASK_LABELS[mask]: rels.append(f"{name}{label}")
             
     return {
         'ganzhi': ganzhi,
@@ -212,7 +341,26 @@ def get_ganzhi_details(day_gan, year_branch, ganzhi, pillars=None, day_branch=No
         'branch_ten_god': b_ten,
         'twelve_growth': growth,
         'sinsal': ",".join(sinsal_combined),
-        'relations': ",".join(list(set(rels))) if rels else "-"
+        'relations': ",".join(dict.fromkeys(rels)) if rels else "-"
+    }
+
+def get_interaction_details(day_gan, year_branch, ganzhi, target):
+    """운(대운/세운 등) 간지가 대상 기둥과 맺는 십성·운성·신살·상호관계 (상세 분석표용)"""
+    if not ganzhi or len(ganzhi) < 2 or not target or len(target) < 2: return {}
+    mask = get_relation_mask(ganzhi, target)
+    inter_rels = decode_relations(mask & ~SINSAL_RELATION_BITS, RELATION_LABELS_HANJA)
+    sinsal_rels = decode_relations(mask & SINSAL_RELATION_BITS, RELATION_LABELS_HANJA)
+    twelve_sinsal = get_sinsal_list(year_branch, ganzhi[1])
+    if twelve_sinsal and twelve_sinsal not in sinsal_rels: sinsal_rels.append(twelve_sinsal)
+    
+    d, ts = STEM_CODES.get(day_gan, -1), STEM_CODES.get(target[0], -1)
+    s, tb = STEM_CODES.get(ganzhi[0], -1), BRANCH_CODES.get(target[1], -1)
+    return {
+        "ganzhi": target,
+        "ten_god": TEN_GOD_NAMES[_TEN_GOD[d][ts]] if d >= 0 and ts >= 0 else '-',
+        "growth": GROWTH_NAMES[_GROWTH[s][tb]] if s >= 0 and tb >= 0 else '-',
+        "sinsal": ", ".join(sinsal_rels) if sinsal_rels else "-",
+        "interaction": ", ".join(inter_rels) if inter_rels else "평온"
     }
 
 def calculate_daeun(details, gender):
@@ -224,56 +372,244 @@ def calculate_daeun(details, gender):
         day_branch = pillars['day']['branch']
         
         # 순역행 판단: 연간의 음양 + 성별
-        is_yang = year_stem in ['甲', '丙', '戊', '庚', '壬']
+        is_yang = STEM_CODES[year_stem] % 2 == 0
         is_forward = (is_yang and gender == '남') or (not is_yang and gender == '여')
         
         y, m, d = map(int, details['birth_date'].split('-'))
         hh, mm = map(int, details['birth_time'].split(':'))
         daeun_num = calculate_daeun_number(y, m, d, hh, mm, is_forward)
         
-        res_list = []
-        curr = month_pillar
-        for i in range(10):
-            curr = get_next_ganzhi(curr) if is_forward else get_prev_ganzhi(curr)
-            item = get_ganzhi_details(day_gan, year_branch, curr, pillars=pillars, day_branch=day_branch)
-            item['age'] = daeun_num + (i * 10)
-            res_list.append(item)
-        return {'num': daeun_num, 'list': res_list, 'direction': '순행' if is_forward else '역행'}
+        timeline = DaeunTimeline(day_gan, year_branch, month_pillar, daeun_num, is_forward, y, pillars=pillars, day_branch=day_branch)
+        # 'list' 는 기존과 같은 10개 대운 목록이지만 항목은 조회할 때 계산
+        return {'num': daeun_num, 'list': DaeunList(timeline), 'direction': timeline.direction}
     except:
         return {'num': 1, 'list': [], 'direction': '순행'}
 
-def get_seyun_data(day_gan, year_branch, target_year, pillars=None, day_branch=None):
-    """세운 산출 (안전 관리 방식)"""
+# 대운 타임라인이 다루는 최대 나이 (한국 나이)
+DAEUN_MAX_AGE = 120
+
+class DaeunTimeline:
+    """
+    대운 타임라인 (대운 i 는 대운수 + 10*i 세부터 10년)
+    - 대운 상세는 처음 조회할 때 계산하여 보관 (10개를 넘는 장기 조회도 필요한 만큼만 계산)
+    - 나이 -> 대운 순번은 산술로 O(1), 대운별 세운·연도별 월운은 saju_utils 캐시 사용
+    """
+    def __init__(self, day_gan, year_branch, month_pillar, num, is_forward, birth_year, pillars=None, day_branch=None,
+                 max_age=DAEUN_MAX_AGE):
+        self.day_gan = day_gan
+        self.year_branch = year_branch
+        self.month_code = GANZHI_CODES[month_pillar]
+        self.num = int(num)
+        self.is_forward = is_forward
+        self.direction = '순행' if is_forward else '역행'
+        self.birth_year = int(birth_year)
+        self.pillars = pillars
+        self.day_branch = day_branch
+        self.size = max(0, (max_age - self.num) // 10 + 1)
+        self._cycles = {}
+
+    def __len__(self):
+        return self.size
+
+    def index_for_age(self, age):
+        """나이(한국 나이)가 속한 대운 순번 (첫 대운 이전이거나 범위 밖이면 None)"""
+        age = int(age)
+        if age < self.num: return None
+        index = (age - self.num) // 10
+        return index if index < self.size else None
+
+    def seed(self, items):
+        """이미 계산된 대운 목록(명식의 fortune['list'])을 앞 순번부터 채움"""
+        for i, item in enumerate(items):
+            if i < self.size and item: self._cycles.setdefault(i, dict(item))
+
+    def cycle(self, index):
+        """대운 순번 -> 대운 상세 사본 (순번이 범위 밖이면 IndexError)"""
+        if not 0 <= index < self.size:
+            raise IndexError(f"대운 순번 {index} 은 0~{self.size - 1} 범위를 벗어납니다.")
+        item = self._cycles.get(index)
+        if item is None:
+            step = 1 if self.is_forward else -1
+            pillar = GANZHI_LIST[(self.month_code + step * (index + 1)) % 60]
+            item = get_ganzhi_details(self.day_gan, self.year_branch, pillar, pillars=self.pillars, day_branch=self.day_branch)
+            item['age'] = self.num + index * 10
+            item = self._cycles.setdefault(index, item)
+        return dict(item)
+
+    def cycle_for_age(self, age):
+        """나이가 속한 대운 상세 (없으면 None)"""
+        index = self.index_for_age(age)
+        return self.cycle(index) if index is not None else None
+
+    def cycles(self, start=0, count=None):
+        """start 번째부터 count 개 대운 목록 (count 미지정 시 끝까지)"""
+        end = self.size if count is None else min(self.size, start + count)
+        return [self.cycle(i) for i in range(start, end)]
+
+    def start_year(self, index):
+        """대운이 시작되는 연도 (한국 나이 기준)"""
+        return self.birth_year + self.num + index * 10 - 1
+
+    def seyun(self, index, count=10):
+        """대운 기간의 세운 목록"""
+        return get_seyun_list(self.day_gan, self.year_branch, self.start_year(index), count=count,
+                              pillars=self.pillars, day_branch=self.day_branch)
+
+    def wolun(self, year):
+        """해당 연도 세운의 12개월 월운 표"""
+        return get_wolun_table(self.day_gan, self.year_branch, get_seyun_pillar(year), pillars=self.pillars,
+                               day_branch=self.day_branch)
+
+class DaeunList(Sequence):
+    """fortune['list'] 호환 대운 목록 (앞 count 개, 항목은 처음 조회할 때 타임라인에서 계산하고 사본 반환)"""
+    def __init__(self, timeline, count=10):
+        self.timeline = timeline
+        self.count = min(count, len(timeline))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.timeline.cycle(i) for i in range(*index.indices(self.count))]
+        if index < 0: index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("대운 목록 범위를 벗어났습니다.")
+        return self.timeline.cycle(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (DaeunList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __hash__(self):
+        # 읽기 전용 목록: 같은 항목의 FrozenDict tuple(freeze 결과)과 같은 해시
+        return hash(tuple(tuple(sorted(item.items())) for item in self))
+
+    def __repr__(self):
+        return f"DaeunList({self.timeline.num}, {self.timeline.direction}, {self.count})"
+
+@lru_cache(maxsize=256)
+def _get_daeun_timeline_cached(day_gan, year_branch, month_pillar, num, is_forward, birth_year, pillars_key, day_branch):
+    pillars = {k: {'stem': s, 'branch': b} for k, s, b in pillars_key} if pillars_key else None
+    return DaeunTimeline(day_gan, year_branch, month_pillar, num, is_forward, birth_year, pillars=pillars, day_branch=day_branch)
+
+def get_daeun_timeline(data):
+    """확장 명식 -> 대운 타임라인 (명식별 캐시, fortune['list'] 의 대운은 다시 계산하지 않음)"""
+    pillars, fortune = data['pillars'], data['fortune']
+    if isinstance(fortune['list'], DaeunList): return fortune['list'].timeline
+    timeline = _get_daeun_timeline_cached(
+        pillars['day']['stem'], pillars['year']['branch'], pillars['month']['pillar'], fortune['num'],
+        fortune['direction'] == '순행', int(data['birth_date'].split('-')[0]), _pillars_key(pillars), pillars['day']['branch'])
+    if not timeline._cycles: timeline.seed(fortune['list'])
+    return timeline
+
+# 세운 검증 모드: 산술 결과를 매번 sajupy 만세력과 대조 (느림, 점검용)
+SEYUN_VALIDATE = os.environ.get('SAJU_VALIDATE_SEYUN') == '1'
+
+def get_seyun_pillar(target_year):
+    """세운 간지 (입춘 이후 시점의 연주: 서기 4년 甲子 기준 60갑자 순환)"""
+    return GANZHI_LIST[(int(target_year) - 4) % 60]
+
+def _sajupy_seyun_pillar(target_year):
+    """sajupy 만세력으로 구한 세운 간지 (검증용: 해당 연도 2월 15일 정오의 연주)"""
+    from sajupy import get_saju_calculator
+    return get_saju_calculator().calculate_saju(int(target_year), 2, 15, 12, 0).get('year_pillar')
+
+def validate_seyun_pillars(start_year=1900, end_year=2100):
+    """산술 세운 간지를 sajupy 만세력과 대조하여 불일치 연도 목록 [(연도, 산술값, sajupy값)] 반환"""
+    mismatches = []
+    for y in range(int(start_year), int(end_year) + 1):
+        expected = _sajupy_seyun_pillar(y)
+        if get_seyun_pillar(y) != expected:
+            mismatches.append((y, get_seyun_pillar(y), expected))
+    return mismatches
+
+def get_seyun_data(day_gan, year_branch, target_year, pillars=None, day_branch=None, validate=None):
+    """세운 산출 (validate=True 또는 SAJU_VALIDATE_SEYUN=1 이면 sajupy 결과와 대조)"""
     try:
-        from sajupy import get_saju_calculator
-        calc = get_saju_calculator()
-        res = calc.calculate_saju(int(target_year), 2, 15, 12, 0)
-        return get_ganzhi_details(day_gan, year_branch, res.get('year_pillar'), pillars=pillars, day_branch=day_branch)
+        pillar = get_seyun_pillar(target_year)
+        if validate if validate is not None else SEYUN_VALIDATE:
+            expected = _sajupy_seyun_pillar(target_year)
+            if expected != pillar:
+                print(f"세운 간지 불일치 ({target_year}): 산술 {pillar} / sajupy {expected}")
+                pillar = expected
+        return get_ganzhi_details(day_gan, year_branch, pillar, pillars=pillars, day_branch=day_branch)
     except:
         return {}
 
-def get_seyun_list(day_gan, year_branch, start_year, count=10, pillars=None, day_branch=None):
-    """지정된 시작 연도부터 N개년 세운 리스트 산출"""
+def _pillars_key(pillars):
+    """원국 pillars dict -> 캐시 키로 쓸 수 있는 튜플"""
+    if not pillars: return None
+    return tuple((k, p.get('stem'), p.get('branch')) for k, p in pillars.items())
+
+@lru_cache(maxsize=256)
+def _get_seyun_range_cached(day_gan, year_branch, start_year, end_year, pillars_key, day_branch):
+    pillars = {k: {'stem': s, 'branch': b} for k, s, b in pillars_key} if pillars_key else None
     res = []
-    for i in range(count):
-        y = start_year + i
-        data = get_seyun_data(day_gan, year_branch, y, pillars=pillars, day_branch=day_branch)
+    for y in range(start_year, end_year + 1):
+        data = get_seyun_data(day_gan, year_branch, y, pillars=pillars, day_branch=day_branch, validate=False)
         if data:
             data['year'] = y
             res.append(data)
-    return res
+    return tuple(res)
+
+def get_seyun_range(day_gan, year_branch, start_year, end_year, pillars=None, day_branch=None, validate=None):
+    """start_year ~ end_year(포함) 세운 리스트를 한 번에 산출 (결과 캐시, 호출마다 사본 반환)"""
+    start_year, end_year = int(start_year), int(end_year)
+    if validate if validate is not None else SEYUN_VALIDATE:
+        res = []
+        for y in range(start_year, end_year + 1):
+            data = get_seyun_data(day_gan, year_branch, y, pillars=pillars, day_branch=day_branch, validate=True)
+            if data:
+                data['year'] = y
+                res.append(data)
+        return res
+    cached = _get_seyun_range_cached(day_gan, year_branch, start_year, end_year, _pillars_key(pillars), day_branch)
+    return [dict(d) for d in cached]
+
+def get_seyun_list(day_gan, year_branch, start_year, count=10, pillars=None, day_branch=None):
+    """지정된 시작 연도부터 N개년 세운 리스트 산출"""
+    return get_seyun_range(day_gan, year_branch, start_year, int(start_year) + count - 1, pillars=pillars, day_branch=day_branch)
+
+# 연간(年干) x 월(1=寅월 ~ 12=丑월) 월주 간지 표 (寅월 천간: 甲己->丙, 乙庚->戊, 丙辛->庚, 丁壬->壬, 戊癸->甲)
+_WOLUN_FIRST_STEM = {'甲': 2, '己': 2, '乙': 4, '庚': 4, '丙': 6, '辛': 6, '丁': 8, '壬': 8, '戊': 0, '癸': 0}
+WOLUN_PILLARS = {
+    stem: tuple(HEAVENLY_STEMS[(first + m) % 10] + EARTHLY_BRANCHES[(m + 2) % 12] for m in range(12))
+    for stem, first in _WOLUN_FIRST_STEM.items()
+}
+
+def get_wolun_pillar(year_pillar, month):
+    """세운 간지의 연간과 월(1~12) -> 월운 간지 (알 수 없는 연간은 戊癸년 기준)"""
+    return WOLUN_PILLARS.get(year_pillar[0], WOLUN_PILLARS['戊'])[int(month) - 1]
+
+@lru_cache(maxsize=256)
+def _get_wolun_table_cached(day_gan, year_branch, year_stem, pillars_key, day_branch):
+    pillars = {k: {'stem': s, 'branch': b} for k, s, b in pillars_key} if pillars_key else None
+    res = []
+    for m, pillar in enumerate(WOLUN_PILLARS.get(year_stem, WOLUN_PILLARS['戊']), 1):
+        try:
+            data = get_ganzhi_details(day_gan, year_branch, pillar, pillars=pillars, day_branch=day_branch)
+            data['month'] = m
+        except:
+            data = {}
+        res.append(data)
+    return tuple(res)
+
+def get_wolun_table(day_gan, year_branch, year_pillar, pillars=None, day_branch=None):
+    """세운 1년의 12개월 월운 표 (원국·연도별 결과 캐시, 호출마다 사본 반환)"""
+    if not year_pillar: return []
+    cached = _get_wolun_table_cached(day_gan, year_branch, year_pillar[0], _pillars_key(pillars), day_branch)
+    return [dict(d) for d in cached]
 
 def get_wolun_data(day_gan, year_branch, year_pillar, target_month, pillars=None, day_branch=None):
     """월운 산출"""
     if not year_pillar: return {}
     try:
-        y_stem = year_pillar[0]
-        m_map = {'甲': 2, '己': 2, '乙': 4, '庚': 4, '丙': 6, '辛': 6, '丁': 8, '壬': 8, '戊': 0, '癸': 0}
-        s_idx = (m_map.get(y_stem, 0) + int(target_month) - 1) % 10
-        b_idx = (int(target_month) + 1) % 12
-        pillar = HEAVENLY_STEMS[s_idx] + EARTHLY_BRANCHES[b_idx]
-        res = get_ganzhi_details(day_gan, year_branch, pillar, pillars=pillars, day_branch=day_branch)
-        res['month'] = target_month
+        month = int(target_month)
+        if not 1 <= month <= 12: return {}
+        res = dict(_get_wolun_table_cached(day_gan, year_branch, year_pillar[0], _pillars_key(pillars), day_branch)[month - 1])
+        if res: res['month'] = target_month
         return res
     except:
         return {}
@@ -285,35 +621,35 @@ def get_extended_saju_data(details, gender='여'):
         day_gan, year_branch = pillars['day']['stem'], pillars['year']['branch']
         day_branch = pillars['day']['branch']
         
-        details['ten_gods'] = {p: GAN_TEN_GODS.get(day_gan, {}).get(pillars[p]['stem'], '-') for p in ['year', 'month', 'hour']}
+        d = STEM_CODES[day_gan]
+        keys = ['year', 'month', 'day', 'hour']
+        s_codes = {p: STEM_CODES[pillars[p]['stem']] for p in keys}
+        b_codes = {p: BRANCH_CODES[pillars[p]['branch']] for p in keys}
+        
+        details['ten_gods'] = {p: TEN_GOD_NAMES[_TEN_GOD[d][s_codes[p]]] for p in ['year', 'month', 'hour']}
         details['ten_gods']['day'] = '본인'
-        details['jiji_ten_gods'] = {p: GAN_TEN_GODS.get(day_gan, {}).get(BRANCH_HIDDEN_GANS.get(pillars[p]['branch']), '-') for p in ['year', 'month', 'day', 'hour']}
-        details['twelve_growth'] = {p: TWELVE_GROWTH.get(day_gan, {}).get(pillars[p]['branch'], '-') for p in ['year', 'month', 'day', 'hour']}
+        details['jiji_ten_gods'] = {p: TEN_GOD_NAMES[_BRANCH_TEN_GOD[d][b_codes[p]]] for p in keys}
+        details['twelve_growth'] = {p: GROWTH_NAMES[_GROWTH[d][b_codes[p]]] for p in keys}
         
         details['five_elements'] = {'목':0,'화':0,'토':0,'금':0,'수':0}
-        for p in ['year','month','day','hour']:
-            for k in [pillars[p]['stem'], pillars[p]['branch']]:
-                e = ELEMENTS_MAP.get(k)
-                if e: details['five_elements'][e] += 1
+        for p in keys:
+            details['five_elements'][ELEMENT_NAMES[_STEM_ELEMENT[s_codes[p]]]] += 1
+            details['five_elements'][ELEMENT_NAMES[_BRANCH_ELEMENT[b_codes[p]]]] += 1
                 
         # 다중 신살 및 공망
-        details['sinsal_details'] = {p: get_ganzhi_details(day_gan, year_branch, pillars[p]['pillar'], day_branch=day_branch) for p in ['year', 'month', 'day', 'hour']}
+        details['sinsal_details'] = {p: get_ganzhi_details(day_gan, year_branch, pillars[p]['pillar'], day_branch=day_branch) for p in keys}
         details['gongmang'] = {
             'year': get_gongmang(pillars['year']['pillar']),
             'day': get_gongmang(pillars['day']['pillar'])
         }
         
         rels = []
-        keys = ['year', 'month', 'day', 'hour']
         names = {'year':'년', 'month':'월', 'day':'일', 'hour':'시'}
+        codes = [GANZHI_CODES[pillars[p]['pillar']] for p in keys]
         for i in range(4):
             for j in range(i+1, 4):
-                s1, s2 = pillars[keys[i]].get('stem'), pillars[keys[j]].get('stem')
-                if STEM_RELATIONS['충'].get(s1) == s2: rels.append(f"{names[keys[i]]}-{names[keys[j]]} 충")
-                if STEM_RELATIONS['합'].get(s1) == s2: rels.append(f"{names[keys[i]]}-{names[keys[j]]} 합")
-                b1, b2 = pillars[keys[i]].get('branch'), pillars[keys[j]].get('branch')
-                if BRANCH_RELATIONS['충'].get(b1) == b2: rels.append(f"{names[keys[i]]}-{names[keys[j]]} 충")
-                if BRANCH_RELATIONS['합'].get(b1) == b2: rels.append(f"{names[keys[i]]}-{names[keys[j]]} 합")
+                mask = _RELATION[codes[i]][codes[j]] & BASIC_RELATION_BITS
+                for label in _MASK_LABELS[mask]: rels.append(f"{names[keys[i]]}-{names[keys[j]]} {label}")
         details['relations'] = rels
         
         # 하위 호환성을 위한 단순 sinsal 키 복구
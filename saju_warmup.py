@@ -0,0 +1,101 @@
+"""
+콜드 스타트 단축 모듈
+- lazy_import: 첫 속성 접근 때 실제로 import 하는 모듈 대리 객체 (google.generativeai 등 무거운 SDK)
+- warmup: 만세력 테이블·조회 테이블·LLM SDK 를 백그라운드 스레드에서 미리 로드
+  (명식 계산은 만세력 테이블만 사용하므로 sajupy 달력 데이터는 저장본이 없을 때만 테이블 구축 중에 로드됨)
+  (프로세스당 1회, SAJU_WARMUP=0 이면 끔)
+"""
+import os
+import time
+import importlib
+import threading
+
+from backend.tracing import span
+
+WARMUP_ENABLED = os.environ.get("SAJU_WARMUP", "1") != "0"
+
+class LazyModule:
+    """첫 속성 접근 시 import 하는 모듈 대리 객체"""
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = self.__dict__['_module'] = importlib.import_module(self._name)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_import(name):
+    return LazyModule(name)
+
+def _load_calendar():
+    from saju_calendar import get_calendar
+    get_calendar()
+
+def _load_tables():
+    """절기 색인과 세운·월운 캐시를 채우도록 명식 하나를 계산"""
+    from saju_utils import get_jeol_index
+    from saju_cache import compute_chart, normalize_birth_input
+    get_jeol_index()
+    compute_chart(normalize_birth_input(2000, 1, 1, 12, 0, '남'))
+
+def _load_llm_sdk():
+    importlib.import_module('google.generativeai')
+    importlib.import_module('google.generativeai.caching')
+
+# (단계 이름, 함수, 분류) - 분류별로 건너뛸 수 있음
+WARMUP_STEPS = (
+    ('calendar', _load_calendar, 'chart'),
+    ('tables', _load_tables, 'chart'),
+    ('llm_sdk', _load_llm_sdk, 'llm'),
+)
+
+# 단계별 소요 시간 (초, 실패 시 None)
+warmup_timings = {}
+
+def run_warmup(chart=True, llm=True):
+    """사전 로드 단계 실행 (실패한 단계는 건너뛰고 실제 사용 시점에 다시 로드)"""
+    for name, func, kind in WARMUP_STEPS:
+        if (kind == 'chart' and not chart) or (kind == 'llm' and not llm): continue
+        start = time.perf_counter()
+        try:
+            with span(f'warmup.{name}'):
+                func()
+            warmup_timings[name] = round(time.perf_counter() - start, 4)
+        except Exception as e:
+            warmup_timings[name] = None
+            print(f"사전 로드 실패 ({name}): {e}")
+    return warmup_timings
+
+_warmup_started = False
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def warmup(background=True, chart=True, llm=True):
+    """프로세스당 1회 사전 로드 시작 (background 면 데몬 스레드 반환, 이미 시작했으면 기존 스레드)"""
+    global _warmup_started, _warmup_thread
+    if not WARMUP_ENABLED or _warmup_started: return _warmup_thread
+    with _warmup_lock:
+        if _warmup_started: return _warmup_thread
+        _warmup_started = True
+        if background:
+            _warmup_thread = threading.Thread(target=run_warmup, args=(chart, llm), name="saju-warmup", daemon=True)
+            _warmup_thread.start()
+            return _warmup_thread
+    run_warmup(chart, llm)
+    return None
+
+def wait_warmup(timeout=None):
+    """백그라운드 사전 로드가 끝날 때까지 대기 (시작하지 않았으면 즉시 반환)"""
+    thread = _warmup_thread
+    if thread is not None and thread.is_alive():
+        thread.join(timeout)
+    return warmup_timings
@@ -1,209 +1,72 @@
 import streamlit as st
 import os
+import time
 import datetime
-import google.generativeai as genai
-from google.generativeai import caching
-import glob
-from sajupy import calculate_saju, get_saju_details, lunar_to_solar
-from saju_utils import get_extended_saju_data
+from saju_cache import get_chart
+from saju_warmup import lazy_import, warmup
+from backend.data_caching_util import load_saju_data_as_files
+from backend.context_cache import get_context_cache_manager
+from backend.serving import FakeModel, USE_FAKE_MODEL, iter_response_text
+from backend.tracing import span
+from backend.metrics import LLM_LATENCY, count_error, record_llm_usage, start_metrics_server
+from backend.report_cache import get_report_cache, make_fingerprint
+from backend.knowledge_index import get_knowledge_index, build_chart_query, format_passages
+from saju_data import SAJU_TERMS
+from ui_templates import load_app_css, saju_card_html, table_head_html, table_label_html, summary_box_html
+
+# AI 분석 프롬프트 템플릿 버전 (프롬프트 문구를 바꾸면 올려서 이전 리포트 캐시를 무효화)
+PROMPT_TEMPLATE_VERSION = "v3"
+# 컨텍스트 캐시를 쓰지 못할 때 프롬프트에 첨부할 참고 자료 문단 수
+KNOWLEDGE_TOP_K = 6
 
 # 페이지 설정: 제목 및 아이콘 (최상단 배치 필수)
 st.set_page_config(page_title="Destiny Code - AI 사주 풀이", page_icon="🔮", layout="wide")
 
-# --- 전역 스타일 주입 (모든 버튼 및 카드 스타일 통일) ---
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Noto+Serif+KR:wght@400;700&display=swap');
-    
-    .main { background-color: #ffffff; color: #333333; }
-    .stApp { background-color: #ffffff; }
-    h1, h2, h3 {
-        font-family: 'Noto Serif KR', serif !important;
-        color: #2c3e50 !important;
-        text-align: center;
-        letter-spacing: 0.1em;
-        margin-top: 20px;
-    }
-    
-    /* 버튼 스타일 통일 (이미지의 노란색 버튼) */
-    div.stButton > button {
-        background-color: #d4af37 !important;
-        color: white !important;
-        border-radius: 8px !important;
-        border: none !important;
-        font-weight: 700 !important;
-        height: 3rem !important;
-        width: 100% !important;
-        margin: 5px 0 !important;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1) !important;
-        font-family: 'Noto Serif KR', serif;
-        white-space: nowrap !important;
-        overflow: hidden !important;
-        text-overflow: ellipsis !important;
-        font-size: 0.95rem !important;
-    }
-    div.stButton > button:hover {
-        background-color: #bfa02d !important;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.15) !important;
-        transform: translateY(-2px);
-    }
-    
-    /* 메인 컨테이너 (600px로 콤팩트하게 제한하여 늘어짐 방지) */
-    .main .block-container {
-        max-width: 600px !important;
-        padding-top: 1.5rem !important;
-        margin: 0 auto !important;
-    }
-    
-    /* 모바일에서 자연스러운 수직 쌓임 허용 (롤백) */
-    @media (max-width: 768px) {
-        div[data-testid="stHorizontalBlock"] {
-            flex-wrap: wrap !important;
-        }
-    }
-    
-    /* 가변형 폰트 및 모바일 최적화 조정 */
-    @media (max-width: 768px) {
-        .main .block-container {
-            padding-left: 8px !important;
-            padding-right: 8px !important;
-        }
-        /* 폰트 크기를 화면 너비에 따라 가변적으로 축소 (clamp 사용) */
-        div[data-testid="stPopover"] > button {
-            font-size: clamp(0.6rem, 2.5vw, 0.8rem) !important;
-            padding: 4px 2px !important;
-            min-height: auto !important;
-            height: 2.2rem !important;
-        }
-        h1 { font-size: clamp(1.5rem, 5vw, 2.2rem) !important; }
-        h3 { font-size: clamp(0.9rem, 3vw, 1.2rem) !important; }
-    }
-    
-    /* 카드 공통 스타일 (이미지 1 참조) - 패딩 축소 */
-    .saju-card {
-        border: 1px solid #e0e0e0;
-        border-radius: 10px;
-        padding: 8px 4px;
-        text-align: center;
-        background-color: white;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-        margin-bottom: 4px;
-        transition: all 0.2s ease;
-        height: 185px !important; /* 높이 고정으로 가로 정렬 안정화 */
-        display: flex;
-        flex-direction: column;
-        justify-content: space-between;
-        overflow: hidden;
-    }
-    .saju-card.selected {
-        border: 2px solid #d4af37 !important;
-        background-color: #fffcf0 !important;
-        box-shadow: 0 6px 15px rgba(212, 175, 55, 0.15) !important;
-    }
-    
-    /* 상세 분석 요약 박스 (이미지 2 참조) */
-    .analysis-summary-box {
-        background-color: #e7f3ff;
-        border-radius: 8px;
-        padding: 15px;
-        margin-bottom: 20px;
-        color: #2c3e50;
-        font-size: 0.95rem;
-        border-left: 5px solid #3498db;
-    }
-
-    /* 팝업 스타일 커스텀: 텍스트가 넘치면 축소되도록 보호 */
-    div[data-testid="stPopover"] > button {
-        background-color: #ffffff !important;
-        border: 1px solid #d1d5db !important;
-        border-radius: 6px !important;
-        padding: 4px 2px !important;
-        width: 100% !important;
-        height: 2.2rem !important;
-        color: #374151 !important;
-        font-size: clamp(0.6rem, 2vw, 0.75rem) !important;
-        font-weight: 500 !important;
-        box-shadow: 0 1px 2px rgba(0,0,0,0.05) !important;
-        text-align: center !important;
-        display: flex !important;
-        justify-content: center !important;
-        align-items: center !important;
-        white-space: nowrap !important;
-        overflow: hidden !important;
-        text-overflow: ellipsis !important;
-    }
-    div[data-testid="stPopover"] > button:after {
-        content: " ˅";
-        margin-left: 6px;
-        font-size: 0.7rem;
-        color: #9ca3af;
-    }
-    div[data-testid="stPopover"] > button:hover {
-        border-color: #d4af37 !important;
-        background-color: #fffcf0 !important;
-    }
-
-    /* 오행 분포 그리드 최적화 */
-    .element-grid {
-        display: flex;
-        justify-content: space-between;
-        text-align: center;
-        margin-bottom: 20px;
-    }
-    /* 성공 메시지 박스 (이미지 1 참조) */
-    .success-box {
-        background-color: #ecfdf5;
-        border: 1px solid #10b981;
-        border-radius: 8px;
-        padding: 10px 12px; /* 패딩 축소 */
-        color: #065f46;
-        font-size: 0.85rem; /* 글자 크기 축소 */
-        margin: 10px 0;
-        text-align: left;
-    }
-</style>
-""", unsafe_allow_html=True)
+# LLM SDK 는 분석을 요청할 때 로드 (첫 화면이 SDK import 를 기다리지 않도록)
+genai = lazy_import('google.generativeai')
+# 만세력·조회 테이블과 LLM SDK 를 백그라운드에서 미리 로드 (프로세스당 1회)
+warmup()
+# 이 프로세스에서 기록한 LLM 지연·토큰·오류, 명식·리포트 캐시 적중률을 별도 포트의 /metrics 로 노출
+# (SAJU_METRICS_PORT 를 지정한 경우만, 프로세스당 1회 시도)
+start_metrics_server()
+
+# --- 전역 스타일 주입 (모든 버튼 및 카드 스타일 통일, static/saju.css 를 1회 읽어 압축한 결과 재사용) ---
+st.markdown(load_app_css(), unsafe_allow_html=True)
 
 # --- 서비스 로직 ---
 
 def initialize_saju_engine(api_key):
     """지식 베이스를 초기화합니다. 캐싱이 지원되지 않으면 일반 모드로 작동합니다."""
-    if 'saju_engine_ready' in st.session_state and st.session_state['saju_engine_ready']:
-        return genai.GenerativeModel(st.session_state.get('saju_model_name', 'gemini-flash-latest'))
-
     genai.configure(api_key=api_key)
     data_dir = "data"
+    model_name = 'gemini-flash-latest'
+    sys_instr = (
+        "당신은 평생을 명리학 연구에 바친 대한민국 최고의 사주 대가이자, 한 사람의 인생을 따스한 비유로 풀어내는 스토리텔러입니다. "
+        "사용자의 사주 자료를 분석할 때는 어려운 한자어나 전문 용어보다는 일상적이고 문학적인 비유(날씨, 풍경, 계절 등)를 적극 사용하여 "
+        "일반인도 자신의 운명을 그림 보듯 쉽게 이해할 수 있도록 풀이해야 합니다. "
+        "단순한 결과 나열이 아닌, 영혼을 어루만지는 품격 있고 다정한 한글로 답변하세요."
+    )
+    
+    if USE_FAKE_MODEL:
+        # 로컬 가짜 모델 (SAJU_FAKE_MODEL=1): API 호출 없이 스트리밍 화면 점검
+        st.session_state['is_cached'] = True
+        st.session_state['saju_model_name'] = 'fake'
+        return FakeModel()
     
     with st.spinner("사주 명리학의 깊은 지식을 불러오는 중입니다..."):
         if 'uploaded_file_objects' not in st.session_state:
-            uploaded_files = []
-            for ext in ['*.pdf', '*.txt', '*.md']:
-                for filepath in glob.glob(os.path.join(data_dir, ext)):
-                    try:
-                        file = genai.upload_file(path=filepath, display_name=os.path.basename(filepath))
-                        uploaded_files.append(file)
-                    except Exception: pass
-            st.session_state['uploaded_file_objects'] = uploaded_files
+            # 내용 해시 기준 레지스트리: 변경되었거나 만료된 파일만 업로드 (Flask 서버와 공유)
+            st.session_state['uploaded_file_objects'] = load_saju_data_as_files(api_key, data_dir)
         
         files = st.session_state['uploaded_file_objects']
-        model_name = 'gemini-flash-latest'
-        sys_instr = (
-            "당신은 평생을 명리학 연구에 바친 대한민국 최고의 사주 대가이자, 한 사람의 인생을 따스한 비유로 풀어내는 스토리텔러입니다. "
-            "사용자의 사주 자료를 분석할 때는 어려운 한자어나 전문 용어보다는 일상적이고 문학적인 비유(날씨, 풍경, 계절 등)를 적극 사용하여 "
-            "일반인도 자신의 운명을 그림 보듯 쉽게 이해할 수 있도록 풀이해야 합니다. "
-            "단순한 결과 나열이 아닌, 영혼을 어루만지는 품격 있고 다정한 한글로 답변하세요."
-        )
         
         try:
-            cache = caching.CachedContent.create(
-                model=f'models/{model_name}',
+            # 프로세스 공유 컨텍스트 캐시: 모든 세션이 같은 캐시를 재사용하고 만료 전 TTL 연장
+            model = get_context_cache_manager().get_model(
+                f'models/{model_name}', sys_instr, files,
                 display_name='saju_kb_cache_v8',
-                system_instruction=sys_instr,
-                contents=files,
                 ttl=datetime.timedelta(minutes=30),
             )
-            model = genai.GenerativeModel.from_cached_content(cached_content=cache)
             st.session_state['is_cached'] = True
         except Exception:
             model = genai.GenerativeModel(model_name, system_instruction=sys_instr)
@@ -213,6 +76,344 @@ def initialize_saju_engine(api_key):
         st.session_state['saju_engine_ready'] = True
         return model
 
+# --- UI 컴포넌트 유틸리티 ---
+
+def get_term_desc(item):
+    """용어 사전에서 설명을 찾아 반환 (한자, 본인 등 예외 처리)"""
+    if not item or item == '-': return None
+    
+    # '인' -> '본인' 변환 및 '천간/지지' 접두어 제거
+    lookup_key = item if item != '인' else '본인'
+    clean_item = lookup_key.replace("천간", "").replace("지지", "")
+    
+    # 1. 원본 또는 정제된 키로 검색
+    desc = SAJU_TERMS.get(lookup_key) or SAJU_TERMS.get(clean_item)
+    if desc: return desc
+    
+    # 2. 괄호 제거 후 재검색 (예: "원진(元嗔)" -> "원진")
+    import re
+    stripped_item = re.sub(r'\(.*?\)', '', lookup_key).strip()
+    desc = SAJU_TERMS.get(stripped_item)
+    if desc: return desc
+
+    # 3. 2글자 간지(예: '甲子')인 경우 각각 분리해서 검색
+    if len(item) == 2:
+        stem_desc = SAJU_TERMS.get(item[0])
+        branch_desc = SAJU_TERMS.get(item[1])
+        if stem_desc and branch_desc:
+            return f"**{item[0]}**: {stem_desc}\n\n**{item[1]}**: {branch_desc}"
+        elif stem_desc: return stem_desc
+        elif branch_desc: return branch_desc
+    
+    return "상세 정보가 곧 업데이트될 예정입니다."
+
+def term_popover(label, value, key_suffix):
+    if not value or value == '-':
+        st.write("-")
+        return
+        
+    with st.popover(value, use_container_width=True):
+        items = [v.strip() for v in value.replace("|", ",").split(",")]
+        for i, item in enumerate(items):
+            desc = get_term_desc(item)
+            st.markdown(f"**{item}**")
+            st.caption(desc)
+            if i < len(items) - 1: st.divider()
+
+def render_saju_card(header, ganzhi, stem_tg, branch_tg, growth, sinsal, relations, is_selected=False):
+    """이미지 4-6 스타일의 고밀도 카드"""
+    st.markdown(saju_card_html(header, ganzhi, stem_tg, branch_tg, growth, sinsal, relations, is_selected),
+                unsafe_allow_html=True)
+
+def render_analysis_table(title, instruction, row_labels, column_headers, data_grid):
+    """리뷰를 반영하여 대폭 개선된 5열 표 (수직 쌓임 허용 롤백)"""
+    st.markdown(f"### 🔍 {title} 🔗")
+    st.markdown(summary_box_html(instruction), unsafe_allow_html=True)
+    
+    # 테이블 헤더
+    cols = st.columns([1.5] + [1] * len(column_headers))
+    cols[0].markdown(table_head_html("분석 항목"), unsafe_allow_html=True)
+    for i, header in enumerate(column_headers):
+        cols[i+1].markdown(table_head_html(header), unsafe_allow_html=True)
+    
+    # 데이터 행
+    for row_idx, label in enumerate(row_labels):
+        cols = st.columns([1.5] + [1] * len(column_headers))
+        cols[0].markdown(table_label_html(label), unsafe_allow_html=True)
+        for col_idx, value in enumerate(data_grid[row_idx]):
+            with cols[col_idx+1]:
+                clean_val = value.replace(" ˅", "").strip()
+                with st.popover(value if value != "-" else " - ", use_container_width=True):
+                    items = [v.strip() for v in clean_val.replace("|", ",").split(",")]
+                    for i, item in enumerate(items):
+                        desc = get_term_desc(item)
+                        st.markdown(f"**{item}**")
+                        st.caption(desc)
+                        if i < len(items) - 1: st.divider()
+
+
+# --- 대운 > 세운 > 월운 패널 (부분 재실행) ---
+# 선택 버튼은 해당 패널 fragment 와 그 하위 패널만 다시 그림 (fragment 미지원 Streamlit 버전은 전체 재실행)
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+def select_luck(**updates):
+    """선택 버튼 콜백: 재실행 전에 선택 상태를 갱신하여 한 번의 재실행으로 반영"""
+    st.session_state.update(updates)
+
+def current_daeun_age(timeline, now_year):
+    """현재 나이(한국 나이)가 속한 대운의 시작 나이 (첫 대운 이전이면 대운수)"""
+    index = timeline.index_for_age(now_year - timeline.birth_year + 1)
+    return timeline.num + index * 10 if index is not None else timeline.num
+
+def get_selected_daeun(data):
+    """선택된 대운 (선택이 없으면 현재 나이에 해당하는 대운으로 초기화, 명식별 대운 타임라인에서 O(1) 조회)"""
+    from saju_utils import get_daeun_timeline
+    timeline = get_daeun_timeline(data)
+    if st.session_state.get('selected_daeun_age') is None:
+        st.session_state['selected_daeun_age'] = current_daeun_age(timeline, datetime.datetime.now().year)
+    index = timeline.index_for_age(st.session_state['selected_daeun_age'])
+    return timeline.cycle(index) if index is not None else None
+
+def get_seyun_window(data):
+    """선택된 대운 기준 10년 세운 (시작 연도, 세운 리스트), 결과는 saju_utils 캐시 사용"""
+    from saju_utils import get_daeun_timeline
+    try:
+        timeline = get_daeun_timeline(data)
+        get_selected_daeun(data)
+        index = (st.session_state['selected_daeun_age'] - timeline.num) // 10
+        return timeline.start_year(index), timeline.seyun(index)
+    except:
+        return None, []
+
+@fragment
+def daeun_panel(data, now_year):
+    """대운 카드와 선택 대운 상세 (대운 선택 시 하위 세운·월운 패널까지 다시 그림)"""
+    pillars = data['pillars']
+    daeun_info = data['fortune']
+    st.subheader("📅 대운(大運)의 흐름")
+    st.caption(f"현재 대운수: **{daeun_info['num']}** ({daeun_info['direction']})")
+    
+    # 기본은 fortune['list'] 의 10개, 선택한 대운이 그 뒤(100세 이후 등)면 그 대운이 든 줄까지 타임라인에서 계산
+    from saju_utils import get_daeun_timeline
+    timeline = get_daeun_timeline(data)
+    sel_index = timeline.index_for_age(st.session_state.get('selected_daeun_age') or timeline.num) or 0
+    daeun_list = timeline.cycles(0, max(len(daeun_info['list']), (sel_index // 5 + 1) * 5))
+    birth_year = int(data.get('birth_date', '1990-01-01').split('-')[0])
+    for i in range(0, len(daeun_list), 5):
+        d_cols = st.columns(5)
+        chunk = daeun_list[i:i+5]
+        for idx, item in enumerate(chunk):
+            age_val = item.get('age', 0)
+            is_sel_daeun = st.session_state.get('selected_daeun_age') == age_val
+            with d_cols[idx]:
+                render_saju_card(
+                    f"{age_val}세 대운",
+                    item.get('ganzhi', '-'),
+                    item.get('stem_ten_god', '-'),
+                    item.get('branch_ten_god', '-'),
+                    item.get('twelve_growth', '-'),
+                    f"신살: {item.get('sinsal', '-')}",
+                    f"관계: {item.get('relations', '-')}",
+                    is_sel_daeun
+                )
+                st.button(f"{age_val}세 선택", key=f"btn_daeun_grid_{age_val}", use_container_width=True,
+                          on_click=select_luck,
+                          kwargs={'selected_daeun_age': age_val, 'selected_seyun_year': birth_year + age_val - 1})
+
+    # --- 대운 상세 상호작용 분석 섹션 ---
+    sel_daeun = get_selected_daeun(data)
+    if sel_daeun:
+        sel_age = sel_daeun['age']
+        # 상세 관계 데이터 재산출 (각 기둥별로 개별 관계 추출)
+        from saju_utils import get_interaction_details
+        def get_pillar_relation(pillar_key):
+            return get_interaction_details(pillars['day']['stem'], pillars['year']['branch'],
+                                           sel_daeun['ganzhi'], pillars[pillar_key]['pillar'])
+
+        p_keys = ['hour', 'day', 'month', 'year']
+        p_data = {k: get_pillar_relation(k) for k in p_keys}
+        
+        row_labels = ["천간(Stem)", "지지(Branch)", "원국 해당 십성", "대운 적용 운성", "적용 신살·귀인", "상호 관계 분석"]
+        column_headers = ["시주(時)", "일주(日)", "월주(月)", "연주(년)"]
+        data_grid = [
+            [p_data[k]['ganzhi'][0] if len(p_data[k]['ganzhi']) >= 2 else '-' for k in p_keys],
+            [p_data[k]['ganzhi'][1] if len(p_data[k]['ganzhi']) >= 2 else '-' for k in p_keys],
+            [p_data[k]['ten_god'] for k in p_keys],
+            [p_data[k]['growth'] for k in p_keys],
+            [p_data[k]['sinsal'] for k in p_keys],
+            [p_data[k]['interaction'] for k in p_keys]
+        ]
+        
+        render_analysis_table(
+            f"{sel_age}세 대운({sel_daeun['ganzhi']}) 상세 분석",
+            "선택하신 대운이 원국의 각 기둥(연,월,일,시)과 맺는 명리적 상호작용을 항목별로 풀이합니다.",
+            row_labels, column_headers, data_grid
+        )
+        
+        st.markdown("---")
+
+    seyun_panel(data, now_year)
+
+@fragment
+def seyun_panel(data, now_year):
+    """선택 대운의 10년 세운 카드와 선택 세운 상세 (세운 선택 시 하위 월운 패널까지 다시 그림)"""
+    pillars = data['pillars']
+    seyun_start_year, seyun_list = get_seyun_window(data)
+    if not seyun_list: return
+
+    st.subheader(f"📅 세운(年運): {seyun_start_year}년 ~ {seyun_start_year+9}년")
+    for i in range(0, len(seyun_list), 5):
+        s_cols = st.columns(5)
+        chunk = seyun_list[i:i+5]
+        for idx, s_item in enumerate(chunk):
+            s_year = s_item['year']
+            is_sel_year = st.session_state.get('selected_seyun_year') == s_year
+            is_now = s_year == now_year
+            with s_cols[idx]:
+                render_saju_card(
+                    f"{s_year}년 {'(현재)' if is_now else ''}",
+                    s_item['ganzhi'],
+                    s_item['stem_ten_god'],
+                    s_item['branch_ten_god'],
+                    s_item['twelve_growth'],
+                    f"✨ {s_item['sinsal']}",
+                    f"🔗 {s_item['relations']}",
+                    is_sel_year
+                )
+                st.button(f"{s_year}년 선택", key=f"btn_year_{s_year}", use_container_width=True,
+                          on_click=select_luck, kwargs={'selected_seyun_year': s_year})
+
+    # --- 세운 상세 상호작용 분석 섹션 ---
+    if 'selected_seyun_year' in st.session_state:
+        sel_year = st.session_state['selected_seyun_year']
+        sel_seyun = next((s for s in seyun_list if s['year'] == sel_year), None)
+        sel_daeun = get_selected_daeun(data)
+        
+        if sel_seyun:
+            # 세운 상호작용 데이터 산출
+            from saju_utils import get_interaction_details
+            def get_seyun_relation(target_pillar_val, target_name):
+                info = get_interaction_details(pillars['day']['stem'], pillars['year']['branch'],
+                                               sel_seyun['ganzhi'], target_pillar_val)
+                if info: info['name'] = target_name
+                return info
+
+            targets = [
+                ('hour', pillars['hour']['pillar'], "시주"),
+                ('day', pillars['day']['pillar'], "일주"),
+                ('month', pillars['month']['pillar'], "월주"),
+                ('year', pillars['year']['pillar'], "연주"),
+                ('daeun', sel_daeun['ganzhi'] if sel_daeun else None, "대운")
+            ]
+            sy_data = [get_seyun_relation(t[1], t[2]) for t in targets if t[1]]
+
+            # 이미지 2 스타일 세운 상세 분석 테이블 호출
+            syc_headers = [d['name'] for d in sy_data]
+            sy_grid = [
+                [d['ganzhi'][0] if len(d['ganzhi']) >= 2 else '-' for d in sy_data],
+                [d['ganzhi'][1] if len(d['ganzhi']) >= 2 else '-' for d in sy_data],
+                [d['ten_god'] for d in sy_data],
+                [d['growth'] for d in sy_data],
+                [d['sinsal'] for d in sy_data],
+                [d['interaction'] for d in sy_data]
+            ]
+            
+            render_analysis_table(
+                f"{sel_year}년 세운({sel_seyun['ganzhi']}) 상세 분석",
+                f"선택하신 세운이 원국(4주) 및 현재 대운({sel_daeun['ganzhi'] if sel_daeun else '-'})과 맺는 복합 상호작용을 풀이합니다.",
+                ["천간(Stem)", "지지(Branch)", "대상 기둥 십성", "세운 적용 운성", "적용 신살·귀인", "상호 관계 분석"],
+                syc_headers, sy_grid
+            )
+            
+            st.markdown("---")
+
+    wolun_panel(data, now_year, seyun_list)
+
+@fragment
+def wolun_panel(data, now_year, seyun_list):
+    """선택 연도의 12개월 월운 카드와 선택 월 상세 (월 선택 시 이 패널만 다시 그림)"""
+    from saju_utils import get_wolun_table
+    pillars = data['pillars']
+    sel_year = st.session_state.get('selected_seyun_year', now_year)
+    st.subheader(f"📅 {sel_year}년 월별 운세 흐름")
+    
+    # 선택된 연도 세운 정보 찾기
+    cur_seyun = next((s for s in seyun_list if s['year'] == sel_year), seyun_list[0])
+    # 12개월 월운 표 (원국·연도별 캐시, 상세 분석·AI 프롬프트와 공유)
+    wolun_table = get_wolun_table(pillars['day']['stem'], pillars['year']['branch'],
+                                  cur_seyun.get('ganzhi', '甲子'), pillars, pillars['day']['branch'])
+    selected_month = st.session_state.get('selected_wolun_month')
+    
+    for i in range(1, 13, 5):
+        w_cols = st.columns(5)
+        chunk = list(range(i, min(i+5, 13)))
+        for idx, m in enumerate(chunk):
+            wolun = wolun_table[m - 1]
+            with w_cols[idx]:
+                render_saju_card(
+                    f"{m}월",
+                    wolun.get('ganzhi', '-'),
+                    wolun.get('stem_ten_god', '-'),
+                    wolun.get('branch_ten_god', '-'),
+                    wolun.get('twelve_growth', '-'),
+                    f"✨ {wolun.get('sinsal', '-')}",
+                    "-",
+                    selected_month == m
+                )
+                st.button(f"{m}월 선택", key=f"btn_month_{m}", use_container_width=True,
+                          on_click=select_luck, kwargs={'selected_wolun_month': m})
+
+    # --- 월운 상세 상호작용 분석 섹션 ---
+    if not selected_month: return
+    wol_data = wolun_table[selected_month - 1]
+    sel_daeun = get_selected_daeun(data)
+    
+    # 월운 상호작용 데이터 산출
+    mw_targets = [
+        ('year', "연주"), ('month', "월주"), ('day', "일주"), ('hour', "시주"),
+        ('daeun', "대운"), ('seyun', "세운")
+    ]
+    mw_data = []
+    w_gz = wol_data['ganzhi']
+    
+    from saju_utils import (get_interaction_details, get_relation_mask, decode_relations,
+                            BASIC_RELATION_BITS, RELATION_LABELS_PREFIXED)
+    for k, label in mw_targets:
+        if k == 'daeun': gz = sel_daeun['ganzhi'] if sel_daeun else "-"
+        elif k == 'seyun': gz = cur_seyun['ganzhi'] if cur_seyun else "-"
+        else: 
+            gz_info = pillars.get(k, {})
+            gz = gz_info.get('pillar', '-') if isinstance(gz_info, dict) else "-"
+        
+        info = get_interaction_details(pillars['day']['stem'], pillars['year']['branch'], w_gz, gz)
+        rels = decode_relations(get_relation_mask(w_gz, gz) & BASIC_RELATION_BITS, RELATION_LABELS_PREFIXED)
+        
+        mw_data.append({
+            "label": label,
+            "ganzhi": gz,
+            "ten_god": info.get('ten_god', '-'),
+            "growth": info.get('growth', '-'),
+            "interaction": ", ".join(rels) if rels else "평온"
+        })
+
+    # 이미지 2 스타일 월운 상세 분석 테이블 호출
+    mw_grid = [
+        [d['ganzhi'][0] if len(d['ganzhi']) >= 2 else '-' for d in mw_data],
+        [d['ganzhi'][1] if len(d['ganzhi']) >= 2 else '-' for d in mw_data],
+        [d['ten_god'] for d in mw_data],
+        [d['growth'] for d in mw_data],
+        [d['interaction'] for d in mw_data]
+    ]
+    
+    render_analysis_table(
+        f"{selected_month}월({wol_data['ganzhi']}) 상세 분석",
+        f"선택하신 {selected_month}월의 기운이 원국(4주) 및 대운/세운과 맺는 관계를 분석합니다.",
+        ["천간(Stem)", "지지(Branch)", "해당 기둥 십성", "월운 적용 운성", "상호 관계 분석"],
+        ["연주", "월주", "일주", "시주", "대운", "세운"],
+        mw_grid
+    )
+
+
 # --- UI 레이아웃 ---
 
 def main():
@@ -229,12 +430,12 @@ def main():
         else:
             st.write("🔮")
     with t_col2:
-        st.markdown("<h1 style='text-align: center; color: #2c3e50; margin-top: 10px;'>Destiny Code</h1>", unsafe_allow_html=True)
+        st.markdown("<h1 class='app-title'>Destiny Code</h1>", unsafe_allow_html=True)
     with t_col3:
         # 우측 캐릭터 이미지 (없으면 아이콘으로 대체)
         st.write("🎎")
         
-    st.markdown("<h3 style='text-align: center; opacity: 0.8; color: #4b5563; font-weight: 400;'>Your Life, Written in Code.</h3>", unsafe_allow_html=True)
+    st.markdown("<h3 class='app-subtitle'>Your Life, Written in Code.</h3>", unsafe_allow_html=True)
     st.divider()
 
     with st.sidebar:
@@ -250,7 +451,7 @@ def main():
         with row1_c2:
             gender = st.radio("성별", ["여", "남"], horizontal=True)
         
-        st.markdown("<div style='display:flex; align-items:center; gap:5px; margin-top:10px;'>📅 <b>생년월일</b></div>", unsafe_allow_html=True)
+        st.markdown("<div class='form-label'>📅 <b>생년월일</b></div>", unsafe_allow_html=True)
         b_cols = st.columns([1.5, 1, 1])
         with b_cols[0]:
             b_year = st.number_input("년", min_value=1900, max_value=2100, value=1990, label_visibility="visible")
@@ -259,7 +460,7 @@ def main():
         with b_cols[2]:
             b_day = st.number_input("일", min_value=1, max_value=31, value=1)
             
-        st.markdown("<div style='display:flex; align-items:center; gap:5px; margin-top:10px;'>⏰ <b>태어난 시간</b></div>", unsafe_allow_html=True)
+        st.markdown("<div class='form-label'>⏰ <b>태어난 시간</b></div>", unsafe_allow_html=True)
         t_cols = st.columns(2)
         with t_cols[0]:
             b_hour = st.number_input("시", min_value=0, max_value=23, value=0)
@@ -277,46 +478,30 @@ def main():
 
     if st.button("사주 명식 계산하기"):
         try:
-            # 날짜 유효성 체크 및 객체 생성
-            birth_date = datetime.date(b_year, b_month, b_day)
+            # 날짜 유효성 체크 (음력은 양력 변환 시 확인, 예: 음력 2월 30일)
+            if calendar_type == '양력':
+                datetime.date(b_year, b_month, b_day)
             
-            # 사주 계산 (라이브러리 내 태양시 보정 및 23:30 경계 설정 사용)
-            saju_res = calculate_saju(
-                b_year, b_month, b_day, 
-                b_hour, b_minute,
-                use_solar_time=True, 
+            # 사주 계산 (라이브러리 내 태양시 보정 및 23:30 경계 설정 사용, 음력은 만세력 테이블로 양력 변환 후 1회 계산)
+            # 동일 출생 정보는 프로세스 공유 캐시에서 읽기 전용 결과를 재사용
+            details = get_chart(
+                b_year, b_month, b_day,
+                b_hour, b_minute, gender,
+                calendar_type=calendar_type, is_leap=is_leap,
+                use_solar_time=True,
                 longitude=127.5,
                 early_zi_time=False
             )
-            details = get_saju_details(saju_res)
-            
-            # 음력일 경우 보정된 양력으로 재계산
-            if calendar_type == "음력":
-                solar_res = lunar_to_solar(b_year, b_month, b_day, is_leap_month=is_leap)
-                y, m, d = solar_res['solar_year'], solar_res['solar_month'], solar_res['solar_day']
-                saju_res = calculate_saju(y, m, d, b_hour, b_minute, 
-                                        use_solar_time=True, longitude=127.5, early_zi_time=False)
-                details = get_saju_details(saju_res)
-            
-            # 확장 데이터 추가 (십성, 12운성, 오행, 대운, 신살 등)
-            details = get_extended_saju_data(details, gender=gender)
             
             st.session_state['saju_data'] = details
             st.session_state['target_name'] = name
             st.session_state['target_gender'] = gender
             # 초기 선택 상태 설정 (현재 대운 및 현재 연도)
-            birth_year = int(details.get('birth_date', '1990-01-01').split('-')[0])
             now_year = datetime.datetime.now().year
-            korean_age = now_year - birth_year + 1
-            
-            # 현재 나이에 해당하는 대운 찾기
-            cur_daeun_age = details['fortune']['num']
-            for d in details['fortune']['list']:
-                if d['age'] <= korean_age < d['age'] + 10:
-                    cur_daeun_age = d['age']
-                    break
             
-            st.session_state['selected_daeun_age'] = cur_daeun_age
+            # 현재 나이에 해당하는 대운
+            from saju_utils import get_daeun_timeline
+            st.session_state['selected_daeun_age'] = current_daeun_age(get_daeun_timeline(details), now_year)
             st.session_state['selected_seyun_year'] = now_year
             
             # 데이터 버전 관리용 플래그
@@ -330,102 +515,6 @@ def main():
         data = st.session_state['saju_data']
         pillars = data['pillars']
         
-        from saju_data import SAJU_TERMS
-
-        def get_term_desc(item):
-            """용어 사전에서 설명을 찾아 반환 (한자, 본인 등 예외 처리)"""
-            if not item or item == '-': return None
-            
-            # '인' -> '본인' 변환 및 '천간/지지' 접두어 제거
-            lookup_key = item if item != '인' else '본인'
-            clean_item = lookup_key.replace("천간", "").replace("지지", "")
-            
-            # 1. 원본 또는 정제된 키로 검색
-            desc = SAJU_TERMS.get(lookup_key) or SAJU_TERMS.get(clean_item)
-            if desc: return desc
-            
-            # 2. 괄호 제거 후 재검색 (예: "원진(元嗔)" -> "원진")
-            import re
-            stripped_item = re.sub(r'\(.*?\)', '', lookup_key).strip()
-            desc = SAJU_TERMS.get(stripped_item)
-            if desc: return desc
-
-            # 3. 2글자 간지(예: '甲子')인 경우 각각 분리해서 검색
-            if len(item) == 2:
-                stem_desc = SAJU_TERMS.get(item[0])
-                branch_desc = SAJU_TERMS.get(item[1])
-                if stem_desc and branch_desc:
-                    return f"**{item[0]}**: {stem_desc}\n\n**{item[1]}**: {branch_desc}"
-                elif stem_desc: return stem_desc
-                elif branch_desc: return branch_desc
-            
-            return "상세 정보가 곧 업데이트될 예정입니다."
-
-        def term_popover(label, value, key_suffix):
-            if not value or value == '-':
-                st.write("-")
-                return
-                
-            with st.popover(value, use_container_width=True):
-                items = [v.strip() for v in value.replace("|", ",").split(",")]
-                for i, item in enumerate(items):
-                    desc = get_term_desc(item)
-                    st.markdown(f"**{item}**")
-                    st.caption(desc)
-                    if i < len(items) - 1: st.divider()
-
-        # --- UI 컴포넌트 유틸리티 ---
-        
-        def render_saju_card(header, ganzhi, stem_tg, branch_tg, growth, sinsal, relations, is_selected=False):
-            """이미지 4-6 스타일의 고밀도 카드"""
-            card_class = "saju-card selected" if is_selected else "saju-card"
-            st.markdown(f"""
-                <div class='{card_class}'>
-                    <div style='font-size: clamp(0.6rem, 2vw, 0.7rem); color:#9ca3af; margin-bottom:2px;'>{header}</div>
-                    <div style='font-size: clamp(1.2rem, 4.5vw, 1.8rem); font-weight:700; color:#1f2937; margin-bottom:6px; line-height:1.2;'>{ganzhi}</div>
-                    <div style='border-top: 1px solid #f3f4f6; margin: 4px 0; padding-top: 4px;'>
-                        <div style='display:flex; justify-content:space-between; align-items:center;'>
-                            <div style='text-align:left;'>
-                                <div style='font-size: clamp(0.5rem, 1.8vw, 0.6rem); color:#9ca3af;'>십성</div>
-                                <div style='font-size: clamp(0.6rem, 2.2vw, 0.75rem); color:#dc2626; font-weight:600;'>{stem_tg} | {branch_tg}</div>
-                            </div>
-                            <div style='text-align:right;'>
-                                <div style='font-size: clamp(0.5rem, 1.8vw, 0.6rem); color:#9ca3af;'>운성</div>
-                                <div style='font-size: clamp(0.6rem, 2.2vw, 0.75rem); color:#2563eb; font-weight:600;'>{growth}</div>
-                            </div>
-                        </div>
-                    </div>
-                    <div style='font-size: clamp(0.55rem, 2vw, 0.65rem); color:#f59e0b; margin-top:2px;'>✨ {sinsal}</div>
-                    <div style='font-size: clamp(0.55rem, 2vw, 0.65rem); color:#8b5cf6; margin-top:1px;'>🔗 {relations}</div>
-                </div>
-            """, unsafe_allow_html=True)
-
-        def render_analysis_table(title, instruction, row_labels, column_headers, data_grid):
-            """리뷰를 반영하여 대폭 개선된 5열 표 (수직 쌓임 허용 롤백)"""
-            st.markdown(f"### 🔍 {title} 🔗")
-            st.markdown(f"<div class='analysis-summary-box'>{instruction}</div>", unsafe_allow_html=True)
-            
-            # 테이블 헤더
-            cols = st.columns([1.5] + [1] * len(column_headers))
-            cols[0].markdown(f"<div style='background:#f1f3f5; border-radius:8px; padding:6px 2px; text-align:center; font-weight:bold; font-size:0.75rem; color:#4b5563;'>분석 항목</div>", unsafe_allow_html=True)
-            for i, header in enumerate(column_headers):
-                cols[i+1].markdown(f"<div style='background:#f1f3f5; border-radius:8px; padding:6px 2px; text-align:center; font-weight:bold; font-size:0.75rem; color:#4b5563;'>{header}</div>", unsafe_allow_html=True)
-            
-            # 데이터 행
-            for row_idx, label in enumerate(row_labels):
-                cols = st.columns([1.5] + [1] * len(column_headers))
-                cols[0].markdown(f"<div style='background:#f8f9fa; border-radius:8px; padding:8px 4px; font-weight:bold; font-size:0.7rem; color:#6b7280;'>{label}</div>", unsafe_allow_html=True)
-                for col_idx, value in enumerate(data_grid[row_idx]):
-                    with cols[col_idx+1]:
-                        clean_val = value.replace(" ˅", "").strip()
-                        with st.popover(value if value != "-" else " - ", use_container_width=True):
-                            items = [v.strip() for v in clean_val.replace("|", ",").split(",")]
-                            for i, item in enumerate(items):
-                                desc = get_term_desc(item)
-                                st.markdown(f"**{item}**")
-                                st.caption(desc)
-                                if i < len(items) - 1: st.divider()
-
         # --- 사주 4주 명식 (이미지 2 스타일로 통합) ---
         p_keys = ['hour', 'day', 'month', 'year']
         p_headers = ["시주(時)", "일주(日)", "월주(月)", "연주(년)"]
@@ -454,341 +543,19 @@ def main():
         
         # 오행 분포 시각화 (이미지 3 스타일)
         elems = data['five_elements']
-        st.markdown("<h3 style='display:flex; align-items:center; gap:8px;'>🔮 오행의 기운 분포</h3>", unsafe_allow_html=True)
+        st.markdown("<h3 class='section-title'>🔮 오행의 기운 분포</h3>", unsafe_allow_html=True)
         o_cols = st.columns(5)
         labels = ["목", "화", "토", "금", "수"]
         for idx, lbl in enumerate(labels):
             val = elems.get(lbl, 0)
             with o_cols[idx]:
-                st.markdown(f"<div style='font-size:0.8rem; color:#6b7280;'>{lbl}</div>", unsafe_allow_html=True)
-                st.markdown(f"<div style='font-size:1.8rem; font-weight:400; color:#1f2937;'>{val}개</div>", unsafe_allow_html=True)
+                st.markdown(f"<div class='element-label'>{lbl}</div>", unsafe_allow_html=True)
+                st.markdown(f"<div class='element-value'>{val}개</div>", unsafe_allow_html=True)
                 progress_val = min(val / 8, 1.0)
                 st.progress(progress_val)
 
-        # --- 대운 리스트 (이미지 1 스타일, 5열 그리드 강제) ---
-        daeun_info = data['fortune']
-        st.subheader("📅 대운(大運)의 흐름")
-        st.caption(f"현재 대운수: **{daeun_info['num']}** ({daeun_info['direction']})")
-        
-        daeun_list = data['fortune']['list']
-        # Removed: st.markdown('<div class="saju-grid-5">', unsafe_allow_html=True)
-        for i in range(0, len(daeun_list), 5):
-            d_cols = st.columns(5)
-            chunk = daeun_list[i:i+5]
-            for idx, item in enumerate(chunk):
-                age_val = item.get('age', 0)
-                is_sel_daeun = st.session_state.get('selected_daeun_age') == age_val
-                with d_cols[idx]:
-                    render_saju_card(
-                        f"{age_val}세 대운",
-                        item.get('ganzhi', '-'),
-                        item.get('stem_ten_god', '-'),
-                        item.get('branch_ten_god', '-'),
-                        item.get('twelve_growth', '-'),
-                        f"신살: {item.get('sinsal', '-')}",
-                        f"관계: {item.get('relations', '-')}",
-                        is_sel_daeun
-                    )
-                    if st.button(f"{age_val}세 선택", key=f"btn_daeun_grid_{age_val}", use_container_width=True):
-                        st.session_state['selected_daeun_age'] = age_val
-                        birth_year = int(data.get('birth_date', '1990-01-01').split('-')[0])
-                        st.session_state['selected_seyun_year'] = birth_year + age_val - 1
-                        st.rerun()
-
-        # --- 대운 상세 상호작용 분석 섹션 (NEW) ---
-        if 'selected_daeun_age' in st.session_state:
-            sel_age = st.session_state['selected_daeun_age']
-            sel_daeun = next((d for d in data['fortune']['list'] if d['age'] == sel_age), None)
-            
-            if sel_daeun:
-                # 상세 관계 데이터 재산출 (각 기둥별로 개별 관계 추출)
-                def get_pillar_relation(pillar_key):
-                    p = pillars[pillar_key]
-                    d_ganzhi = sel_daeun['ganzhi']
-                    if not d_ganzhi or len(d_ganzhi) < 2: return {}
-                    d_stem, d_branch = d_ganzhi[0], d_ganzhi[1]
-                    p_stem, p_branch = p['stem'], p['branch']
-                    
-                    from saju_utils import GAN_TEN_GODS, TWELVE_GROWTH, STEM_RELATIONS, BRANCH_RELATIONS
-                    day_gan = pillars['day']['stem']
-                    
-                    inter_rels = []
-                    sinsal_rels = []
-                    if STEM_RELATIONS['충'].get(d_stem) == p_stem: inter_rels.append("천간충(沖)")
-                    if STEM_RELATIONS['합'].get(d_stem) == p_stem: inter_rels.append("천간합(合)")
-                    if BRANCH_RELATIONS['충'].get(d_branch) == p_branch: inter_rels.append("충(沖)")
-                    if BRANCH_RELATIONS['합'].get(d_branch) == p_branch: inter_rels.append("합(合)")
-                    
-                    h_val = BRANCH_RELATIONS['형'].get(d_branch)
-                    if h_val:
-                        if isinstance(h_val, list):
-                            if p_branch in h_val: inter_rels.append("형(刑)")
-                        elif h_val == p_branch: inter_rels.append("형(刑)")
-                    
-                    if BRANCH_RELATIONS['파'].get(d_branch) == p_branch: inter_rels.append("파(破)")
-                    if BRANCH_RELATIONS['해'].get(d_branch) == p_branch: inter_rels.append("해(害)")
-                    if BRANCH_RELATIONS['원진'].get(d_branch) == p_branch: sinsal_rels.append("원진(元嗔)")
-                    if BRANCH_RELATIONS['귀문'].get(d_branch) == p_branch: sinsal_rels.append("귀문(鬼門)")
-                    
-                    year_branch = pillars['year']['branch']
-                    from saju_utils import get_sinsal_list
-                    twelve_sinsal = get_sinsal_list(year_branch, d_branch)
-                    if twelve_sinsal and twelve_sinsal not in sinsal_rels: sinsal_rels.append(twelve_sinsal)
-                    
-                    return {
-                        "ganzhi": p['pillar'],
-                        "ten_god": GAN_TEN_GODS.get(day_gan, {}).get(p_stem, '-'),
-                        "growth": TWELVE_GROWTH.get(d_stem, {}).get(p_branch, '-'),
-                        "sinsal": ", ".join(sinsal_rels) if sinsal_rels else "-",
-                        "interaction": ", ".join(inter_rels) if inter_rels else "평온"
-                    }
-
-                p_keys = ['hour', 'day', 'month', 'year']
-                p_data = {k: get_pillar_relation(k) for k in p_keys}
-                
-                row_labels = ["천간(Stem)", "지지(Branch)", "원국 해당 십성", "대운 적용 운성", "적용 신살·귀인", "상호 관계 분석"]
-                column_headers = ["시주(時)", "일주(日)", "월주(月)", "연주(년)"]
-                data_grid = [
-                    [p_data[k]['ganzhi'][0] if len(p_data[k]['ganzhi']) >= 2 else '-' for k in p_keys],
-                    [p_data[k]['ganzhi'][1] if len(p_data[k]['ganzhi']) >= 2 else '-' for k in p_keys],
-                    [p_data[k]['ten_god'] for k in p_keys],
-                    [p_data[k]['growth'] for k in p_keys],
-                    [p_data[k]['sinsal'] for k in p_keys],
-                    [p_data[k]['interaction'] for k in p_keys]
-                ]
-                
-                render_analysis_table(
-                    f"{sel_age}세 대운({sel_daeun['ganzhi']}) 상세 분석",
-                    "선택하신 대운이 원국의 각 기둥(연,월,일,시)과 맺는 명리적 상호작용을 항목별로 풀이합니다.",
-                    row_labels, column_headers, data_grid
-                )
-                
-                st.markdown("---")
-
-        # 세운(Seyun) 시각화 - 10년치 전체 그리드
-        from saju_utils import get_seyun_list
-        try:
-            birth_year = int(data.get('birth_date', '1990-01-01').split('-')[0])
-            # 선택된 대운 연령 기준 또는 현재 대운 기준
-            selected_daeun_age = st.session_state.get('selected_daeun_age')
-            if selected_daeun_age is None:
-                # 현재 나이에 해당하는 대운 찾기
-                korean_age = now_year - birth_year + 1
-                selected_daeun_age = data['fortune']['num']
-                for d in data['fortune']['list']:
-                    if d['age'] <= korean_age < d['age'] + 10:
-                        selected_daeun_age = d['age']
-                        break
-                st.session_state['selected_daeun_age'] = selected_daeun_age
-
-            seyun_start_year = birth_year + selected_daeun_age - 1
-            seyun_list = get_seyun_list(pillars.get('day', {}).get('stem', '甲'), 
-                                      pillars.get('year', {}).get('branch', '子'), 
-                                      seyun_start_year, count=10, pillars=pillars,
-                                      day_branch=pillars.get('day', {}).get('branch', '丑'))
-        except:
-            seyun_list = []
-
-        if seyun_list:
-            st.subheader(f"📅 세운(年運): {seyun_start_year}년 ~ {seyun_start_year+9}년")
-            for i in range(0, len(seyun_list), 5):
-                s_cols = st.columns(5)
-                chunk = seyun_list[i:i+5]
-                for idx, s_item in enumerate(chunk):
-                    s_year = s_item['year']
-                    is_sel_year = st.session_state.get('selected_seyun_year') == s_year
-                    is_now = s_year == now_year
-                    with s_cols[idx]:
-                        render_saju_card(
-                            f"{s_year}년 {'(현재)' if is_now else ''}",
-                            s_item['ganzhi'],
-                            s_item['stem_ten_god'],
-                            s_item['branch_ten_god'],
-                            s_item['twelve_growth'],
-                            f"✨ {s_item['sinsal']}",
-                            f"🔗 {s_item['relations']}",
-                            is_sel_year
-                        )
-                        if st.button(f"{s_year}년 선택", key=f"btn_year_{s_year}", use_container_width=True):
-                            st.session_state['selected_seyun_year'] = s_year
-                            st.rerun()
-
-            # --- 세운 상세 상호작용 분석 섹션 (NEW) ---
-            if 'selected_seyun_year' in st.session_state:
-                sel_year = st.session_state['selected_seyun_year']
-                sel_seyun = next((s for s in seyun_list if s['year'] == sel_year), None)
-                sel_daeun_age = st.session_state.get('selected_daeun_age')
-                sel_daeun = next((d for d in data['fortune']['list'] if d['age'] == sel_daeun_age), None)
-                
-                if sel_seyun:
-                    # 세운 상호작용 데이터 산출
-                    def get_seyun_relation(target_pillar_val, target_name):
-                        if not target_pillar_val or len(target_pillar_val) < 2: return {}
-                        s_ganzhi = sel_seyun['ganzhi']
-                        s_stem, s_branch = s_ganzhi[0], s_ganzhi[1]
-                        t_stem, t_branch = target_pillar_val[0], target_pillar_val[1]
-                        
-                        from saju_utils import GAN_TEN_GODS, TWELVE_GROWTH, STEM_RELATIONS, BRANCH_RELATIONS
-                        day_gan = pillars['day']['stem']
-                        
-                        inter_rels = []
-                        sinsal_rels = []
-                        if STEM_RELATIONS['충'].get(s_stem) == t_stem: inter_rels.append("천간충(沖)")
-                        if STEM_RELATIONS['합'].get(s_stem) == t_stem: inter_rels.append("천간합(合)")
-                        if BRANCH_RELATIONS['충'].get(s_branch) == t_branch: inter_rels.append("충(沖)")
-                        if BRANCH_RELATIONS['합'].get(s_branch) == t_branch: inter_rels.append("합(合)")
-                        
-                        h_val = BRANCH_RELATIONS['형'].get(s_branch)
-                        if h_val:
-                            if isinstance(h_val, list):
-                                if t_branch in h_val: inter_rels.append("형(刑)")
-                            elif h_val == t_branch: inter_rels.append("형(刑)")
-                        
-                        if BRANCH_RELATIONS['파'].get(s_branch) == t_branch: inter_rels.append("파(破)")
-                        if BRANCH_RELATIONS['해'].get(s_branch) == t_branch: inter_rels.append("해(害)")
-                        if BRANCH_RELATIONS['원진'].get(s_branch) == t_branch: sinsal_rels.append("원진(元嗔)")
-                        if BRANCH_RELATIONS['귀문'].get(s_branch) == t_branch: sinsal_rels.append("귀문(鬼門)")
-                        
-                        year_branch = pillars['year']['branch']
-                        from saju_utils import get_sinsal_list
-                        twelve_sinsal = get_sinsal_list(year_branch, s_branch)
-                        if twelve_sinsal and twelve_sinsal not in sinsal_rels: sinsal_rels.append(twelve_sinsal)
-                        
-                        return {
-                            "name": target_name,
-                            "ganzhi": target_pillar_val,
-                            "ten_god": GAN_TEN_GODS.get(day_gan, {}).get(t_stem, '-'),
-                            "growth": TWELVE_GROWTH.get(s_stem, {}).get(t_branch, '-'),
-                            "sinsal": ", ".join(sinsal_rels) if sinsal_rels else "-",
-                            "interaction": ", ".join(inter_rels) if inter_rels else "평온"
-                        }
-
-                    targets = [
-                        ('hour', pillars['hour']['pillar'], "시주"),
-                        ('day', pillars['day']['pillar'], "일주"),
-                        ('month', pillars['month']['pillar'], "월주"),
-                        ('year', pillars['year']['pillar'], "연주"),
-                        ('daeun', sel_daeun['ganzhi'] if sel_daeun else None, "대운")
-                    ]
-                    sy_data = [get_seyun_relation(t[1], t[2]) for t in targets if t[1]]
-
-                    # 이미지 2 스타일 세운 상세 분석 테이블 호출
-                    syc_headers = [d['name'] for d in sy_data]
-                    sy_grid = [
-                        [d['ganzhi'][0] if len(d['ganzhi']) >= 2 else '-' for d in sy_data],
-                        [d['ganzhi'][1] if len(d['ganzhi']) >= 2 else '-' for d in sy_data],
-                        [d['ten_god'] for d in sy_data],
-                        [d['growth'] for d in sy_data],
-                        [d['sinsal'] for d in sy_data],
-                        [d['interaction'] for d in sy_data]
-                    ]
-                    
-                    render_analysis_table(
-                        f"{sel_year}년 세운({sel_seyun['ganzhi']}) 상세 분석",
-                        f"선택하신 세운이 원국(4주) 및 현재 대운({sel_daeun['ganzhi'] if sel_daeun else '-'})과 맺는 복합 상호작용을 풀이합니다.",
-                        ["천간(Stem)", "지지(Branch)", "대상 기둥 십성", "세운 적용 운성", "적용 신살·귀인", "상호 관계 분석"],
-                        syc_headers, sy_grid
-                    )
-                    
-                    st.markdown("---")
-
-            # 월운(Wolun) 시각화 - 선택된 연도 기준
-            from saju_utils import get_wolun_data
-            sel_year = st.session_state.get('selected_seyun_year', now_year)
-            st.subheader(f"📅 {sel_year}년 월별 운세 흐름")
-            
-            # 선택된 연도 세운 정보 찾기
-            cur_seyun = next((s for s in seyun_list if s['year'] == sel_year), seyun_list[0] if seyun_list else {})
-            
-            for i in range(1, 13, 5):
-                w_cols = st.columns(5)
-                chunk = list(range(i, min(i+5, 13)))
-                for idx, m in enumerate(chunk):
-                    wolun = get_wolun_data(pillars.get('day', {}).get('stem', '甲'), 
-                                         pillars.get('year', {}).get('branch', '子'), 
-                                         cur_seyun.get('ganzhi', '甲子'), m, 
-                                         pillars=pillars, 
-                                         day_branch=pillars.get('day', {}).get('branch', '丑'))
-                    
-                    selected_month = st.session_state.get('selected_wolun_month')
-                    is_sel_month = selected_month == m
-                    
-                    with w_cols[idx]:
-                        render_saju_card(
-                            f"{m}월",
-                            wolun.get('ganzhi', '-'),
-                            wolun.get('stem_ten_god', '-'),
-                            wolun.get('branch_ten_god', '-'),
-                            wolun.get('twelve_growth', '-'),
-                            f"✨ {wolun.get('sinsal', '-')}",
-                            "-",
-                            is_sel_month
-                        )
-                        if st.button(f"{m}월 선택", key=f"btn_month_{m}", use_container_width=True):
-                            st.session_state['selected_wolun_month'] = m
-                            st.rerun()
-
-        # --- 월운 상세 상호작용 분석 섹션 (NEW) ---
-        sel_month = st.session_state.get('selected_wolun_month')
-        if sel_month:
-            sel_year = st.session_state.get('selected_seyun_year', now_year)
-            cur_seyun = next((s for s in seyun_list if s['year'] == sel_year), seyun_list[0])
-            from saju_utils import get_wolun_data
-            wol_data = get_wolun_data(pillars['day']['stem'], pillars['year']['branch'], cur_seyun['ganzhi'], sel_month, pillars, pillars['day']['branch'])
-            
-            # 월운 상호작용 데이터 산출
-            mw_targets = [
-                ('year', "연주"), ('month', "월주"), ('day', "일주"), ('hour', "시주"),
-                ('daeun', "대운"), ('seyun', "세운")
-            ]
-            mw_data = []
-            w_gz = wol_data['ganzhi']
-            w_stem, w_branch = w_gz[0], w_gz[1]
-            
-            from saju_utils import GAN_TEN_GODS, TWELVE_GROWTH, STEM_RELATIONS, BRANCH_RELATIONS
-            for k, label in mw_targets:
-                if k == 'daeun': gz = sel_daeun['ganzhi'] if sel_daeun else "-"
-                elif k == 'seyun': gz = cur_seyun['ganzhi'] if cur_seyun else "-"
-                else: 
-                    gz_info = pillars.get(k, {})
-                    gz = gz_info.get('pillar', '-') if isinstance(gz_info, dict) else "-"
-                
-                if gz != "-" and len(gz) >= 2:
-                    t_stem, t_branch = gz[0], gz[1]
-                else:
-                    t_stem, t_branch = "-", "-"
-                
-                rels = []
-                if t_stem != "-" and STEM_RELATIONS['충'].get(w_stem) == t_stem: rels.append("천간충")
-                if t_stem != "-" and STEM_RELATIONS['합'].get(w_stem) == t_stem: rels.append("천간합")
-                if t_branch != "-" and BRANCH_RELATIONS['충'].get(w_branch) == t_branch: rels.append("충")
-                if t_branch != "-" and BRANCH_RELATIONS['합'].get(w_branch) == t_branch: rels.append("합")
-                
-                mw_data.append({
-                    "label": label,
-                    "ganzhi": gz,
-                    "ten_god": GAN_TEN_GODS.get(pillars['day']['stem'], {}).get(t_stem, '-'),
-                    "growth": TWELVE_GROWTH.get(w_stem, {}).get(t_branch, '-'),
-                    "interaction": ", ".join(rels) if rels else "평온"
-                })
-
-            # 이미지 2 스타일 월운 상세 분석 테이블 호출
-            mw_headers = [d['label'] for d in mw_data if d['label'] != '항목']
-            mw_grid = [
-                [d['ganzhi'][0] if len(d['ganzhi']) >= 2 else '-' for d in mw_data],
-                [d['ganzhi'][1] if len(d['ganzhi']) >= 2 else '-' for d in mw_data],
-                [d['ten_god'] for d in mw_data],
-                [d['growth'] for d in mw_data],
-                [d['interaction'] for d in mw_data]
-            ]
-            
-            render_analysis_table(
-                f"{sel_month}월({wol_data['ganzhi']}) 상세 분석",
-                f"선택하신 {sel_month}월의 기운이 원국(4주) 및 대운/세운과 맺는 관계를 분석합니다.",
-                ["천간(Stem)", "지지(Branch)", "해당 기둥 십성", "월운 적용 운성", "상호 관계 분석"],
-                ["연주", "월주", "일주", "시주", "대운", "세운"],
-                mw_grid
-            )
+        # --- 대운 > 세운 > 월운 (선택 변경 시 해당 패널만 다시 그림) ---
+        daeun_panel(data, now_year)
 
         st.divider()
         
@@ -809,11 +576,14 @@ def main():
         if b5.button("🗓️ 선택한 월운 분석", use_container_width=True): analysis_type = "wolun"
         
         if analysis_type:
-            if not api_key:
+            if not api_key and not USE_FAKE_MODEL:
                 st.error("API 키가 설정되지 않았습니다.")
                 return
                 
             model = initialize_saju_engine(api_key)
+            # 패널에서 선택한 운 (세션 상태 기준, 세운 리스트는 캐시에서 조회)
+            sel_daeun = get_selected_daeun(data) or data['fortune']['list'][0]
+            seyun_list = get_seyun_window(data)[1]
             with st.status("대가의 식견으로 분석 중입니다...", expanded=True) as status:
                 try:
                     name_str = st.session_state.get('target_name', '사용자')
@@ -832,8 +602,10 @@ def main():
 - 오행 분포: 木 {elems.get('木',0)}, 火 {elems.get('火',0)}, 土 {elems.get('土',0)}, 金 {elems.get('金',0)}, 水 {elems.get('水',0)}
 """
                     
-                    # 2. 분석 타입별 맞춤 프롬프트 구성
+                    # 2. 분석 타입별 맞춤 프롬프트 구성 (selection: 리포트 캐시 지문에 들어갈 선택 정보)
                     prompt = ""
+                    selection = {}
+                    lucks = []  # 참고 자료 검색어에 포함할 선택 운
                     common_instr = "본 분석은 데스티니 코드 정밀한 로직으로 산출된 데이터를 바탕으로 합니다. 제공된 사주 정보는 검증된 값이므로 다시 계산하지 말고, 이 데이터를 절대적 기준으로 해석하십시오. 답변 시작 시 '데스티니 코드 앱의 데이터를 바탕으로 해석함을 가볍게 언급하며, 전문가의 품격에 맞는 존댓말로 답변해 주십시오."
                     
                     if analysis_type == "total":
@@ -857,8 +629,8 @@ def main():
 6. 전체적인 사주 구성의 균형을 맞추기 위해 이 사주가 지향해야 할 삶의 태도와 핵심적인 조언을 들려주십시오.
 """
                     elif analysis_type == "daeun":
-                        sel_age = st.session_state.get('selected_daeun_age')
-                        sel_daeun = next((d for d in data['fortune']['list'] if d['age'] == sel_age), data['fortune']['list'][0])
+                        selection = {'daeun': [sel_daeun['age'], sel_daeun['ganzhi']]}
+                        lucks = [sel_daeun]
                         prompt = f"""
 {basic_info}
 [대운 정보]
@@ -876,10 +648,10 @@ def main():
 5. 본 대운이 다음 대운으로 넘어가는 과정에서 이 사주가 가져야 할 마음가짐과 현실적인 행동 지침을 들려주십시오.
 """
                     elif analysis_type == "seyun":
-                        sel_age = st.session_state.get('selected_daeun_age')
-                        sel_daeun = next((d for d in data['fortune']['list'] if d['age'] == sel_age), data['fortune']['list'][0])
                         sel_year = st.session_state.get('selected_seyun_year', now_year)
                         sel_seyun = next((s for s in seyun_list if s['year'] == sel_year), seyun_list[0])
+                        selection = {'daeun': [sel_daeun['age'], sel_daeun['ganzhi']], 'seyun': [sel_year, sel_seyun['ganzhi']]}
+                        lucks = [sel_daeun, sel_seyun]
                         prompt = f"""
 {basic_info}
 [현재 대운 정보]
@@ -904,9 +676,12 @@ def main():
                     elif analysis_type == "wolun":
                         sel_year = st.session_state.get('selected_seyun_year', now_year)
                         cur_seyun = next((s for s in seyun_list if s['year'] == sel_year), seyun_list[0])
-                        from saju_utils import get_wolun_data
+                        from saju_utils import get_wolun_table
                         target_month = st.session_state.get('selected_wolun_month', datetime.datetime.now().month)
-                        wolun_data = get_wolun_data(pillars['day']['stem'], pillars['year']['branch'], cur_seyun['ganzhi'], target_month, pillars, pillars['day']['branch'])
+                        wolun_data = get_wolun_table(pillars['day']['stem'], pillars['year']['branch'], cur_seyun['ganzhi'], pillars, pillars['day']['branch'])[target_month - 1]
+                        selection = {'daeun': [sel_daeun['age'], sel_daeun['ganzhi']], 'seyun': [sel_year, cur_seyun['ganzhi']],
+                                     'wolun': [target_month, wolun_data['ganzhi']]}
+                        lucks = [sel_daeun, cur_seyun, wolun_data]
                         
                         prompt = f"""
 {basic_info}
@@ -935,19 +710,54 @@ def main():
 
                     full_prompt = f"{common_instr}\n\n{prompt}"
                     
-                    if st.session_state.get('is_cached', False):
-                        response = model.generate_content(full_prompt)
-                    else:
-                        response = model.generate_content([full_prompt] + st.session_state.get('uploaded_file_objects', []))
+                    # 동일 입력의 리포트는 캐시에서 즉시 반환
+                    fingerprint = make_fingerprint(
+                        analysis_type, st.session_state.get('saju_model_name', 'gemini-flash-latest'),
+                        PROMPT_TEMPLATE_VERSION,
+                        chart={'gender': gender_str, 'birth_date': data['birth_date'], 'birth_time': data['birth_time'],
+                               'pillars': [pillars[k]['pillar'] for k in ['year', 'month', 'day', 'hour']]},
+                        selection=selection,
+                        query=add_query if analysis_type == "total" else None,
+                    )
+                    report_cache = get_report_cache()
+                    # 정확히 같은 입력이 없으면 같은 명식·선택 운에 질문이 비었거나 거의 같은 리포트 재사용
+                    report_text, cache_kind = report_cache.lookup(fingerprint)
+                    
+                    st.divider()
+                    st.markdown(f"### 📑 {name_str}님을 위한 전문가 분석 리포트")
+                    report_area = st.empty()
+                    if report_text is None:
+                        if st.session_state.get('is_cached', False):
+                            contents = full_prompt
+                        else:
+                            # 컨텍스트 캐시가 없으면 전체 파일 대신 명식과 관련된 자료 문단만 첨부 (색인이 없으면 파일 첨부)
+                            kb_index = get_knowledge_index()
+                            if kb_index is not None:
+                                passages = kb_index.search(build_chart_query(data, *lucks), k=KNOWLEDGE_TOP_K)
+                                contents = f"{full_prompt}\n\n[참고 자료]\n{format_passages(passages)}"
+                            else:
+                                contents = [full_prompt] + st.session_state.get('uploaded_file_objects', [])
+                        
+                        # 스트리밍 생성: 첫 조각이 도착하는 즉시 화면에 이어서 표시
+                        started = time.perf_counter()
+                        with span('llm.generate', analysis_type=analysis_type):
+                            response = model.generate_content(contents, stream=True)
+                            status.update(label="분석 결과를 작성하고 있습니다...", state="running", expanded=True)
+                            report_text = report_area.write_stream(iter_response_text(response))
+                        LLM_LATENCY.observe(time.perf_counter() - started, analysis_type=analysis_type, mode='stream')
+                        record_llm_usage(analysis_type, response)
+                        if not isinstance(report_text, str):
+                            report_text = "".join(map(str, report_text))
+                        report_cache.put(fingerprint, report_text)
                     
-                    if response and response.text:
+                    if report_text:
                         st.balloons()
-                        status.update(label="분석이 완료되었습니다.", state="complete", expanded=False)
-                        st.divider()
-                        st.markdown(f"### 📑 {name_str}님을 위한 전문가 분석 리포트")
-                        st.markdown(f"<div class='result-container' id='report-text'>{response.text}</div>", unsafe_allow_html=True)
+                        status.update(label={'exact': "저장된 분석 결과를 불러왔습니다.",
+                                             'near': "같은 명식의 유사한 분석 결과를 불러왔습니다."}.get(cache_kind, "분석이 완료되었습니다."),
+                                      state="complete", expanded=True)
+                        report_area.markdown(f"<div class='result-container' id='report-text'>{report_text}</div>", unsafe_allow_html=True)
                         
-                        report_content = response.text.replace("'", "\\'").replace("\n", "\\n")
+                        report_content = report_text.replace("'", "\\'").replace("\n", "\\n")
                         copy_js = f"""
                         <script>
                         function copyReport() {{
@@ -969,6 +779,7 @@ def main():
                     else:
                         st.error("결과를 도출하지 못했습니다.")
                 except Exception as e:
+                    count_error('analysis')
                     st.error(f"오류 발생: {str(e)}")
 
 
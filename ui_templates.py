@@ -0,0 +1,83 @@
+"""
+화면 HTML 조각 템플릿 (streamlit_app 전용)
+- 전역 CSS 는 정적 자산(static/saju.css)으로 두고 프로세스당 1회 읽어 주석·공백을 제거한 뒤 재사용
+- 카드·표 셀 HTML 은 string.Template 로 미리 컴파일하고, 같은 셀 값의 결과 문자열은 캐시
+- 인라인 style 대신 saju.css 의 클래스를 사용하여 재실행마다 전송되는 HTML 크기를 줄임
+"""
+import os
+import re
+from functools import lru_cache
+from string import Template
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+APP_CSS_PATH = os.path.join(STATIC_DIR, 'saju.css')
+# 본문 글꼴 (Noto Serif KR) 스타일시트
+REMOTE_FONT_CSS = "https://fonts.googleapis.com/css2?family=Noto+Serif+KR:wght@400;700&display=swap"
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+
+def minify_css(css):
+    """주석·불필요한 공백 제거 (문자열 안의 공백은 유지)"""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(lambda m: m.group(1) or m.group(2), css)
+    return css.replace(";}", "}").strip()
+
+# 경로 -> 압축한 <style> 블록 (읽기에 성공한 경우만 보관, 실패하면 다음 호출에서 다시 읽음)
+_app_css_cache = {}
+
+def _read_css(path):
+    with open(path, encoding='utf-8') as f:
+        return minify_css(f.read())
+
+def load_app_css(path=APP_CSS_PATH):
+    """전역 <style> 블록 (글꼴 스타일시트 @import 포함, 파일을 읽지 못하면 빈 문자열)"""
+    css = _app_css_cache.get(path)
+    if css is not None: return css
+    try:
+        # @import 는 스타일시트 맨 앞에 있어야 함
+        css = f"@import url('{REMOTE_FONT_CSS}');" + _read_css(path)
+    except OSError as e:
+        print(f"스타일 파일 로드 실패: {e}")
+        return ""
+    css = _app_css_cache[path] = f"<style>{css}</style>"
+    return css
+
+SAJU_CARD = Template(
+    "<div class='$card_class'>"
+    "<div class='card-header'>$header</div>"
+    "<div class='card-ganzhi'>$ganzhi</div>"
+    "<div class='card-body'><div class='card-row'>"
+    "<div class='card-left'><div class='card-label'>십성</div><div class='card-ten-god'>$stem_tg | $branch_tg</div></div>"
+    "<div class='card-right'><div class='card-label'>운성</div><div class='card-growth'>$growth</div></div>"
+    "</div></div>"
+    "<div class='card-sinsal'>✨ $sinsal</div>"
+    "<div class='card-relations'>🔗 $relations</div>"
+    "</div>")
+TABLE_HEAD = Template("<div class='table-head'>$text</div>")
+TABLE_LABEL = Template("<div class='table-label'>$text</div>")
+SUMMARY_BOX = Template("<div class='analysis-summary-box'>$text</div>")
+
+@lru_cache(maxsize=4096)
+def saju_card_html(header, ganzhi, stem_tg, branch_tg, growth, sinsal, relations, is_selected=False):
+    """대운·세운·월운 카드"""
+    return SAJU_CARD.substitute(
+        card_class="saju-card selected" if is_selected else "saju-card", header=header, ganzhi=ganzhi,
+        stem_tg=stem_tg, branch_tg=branch_tg, growth=growth, sinsal=sinsal, relations=relations)
+
+@lru_cache(maxsize=256)
+def table_head_html(text):
+    """상세 분석 표 머리글 셀"""
+    return TABLE_HEAD.substitute(text=text)
+
+@lru_cache(maxsize=256)
+def table_label_html(text):
+    """상세 분석 표 항목 셀"""
+    return TABLE_LABEL.substitute(text=text)
+
+@lru_cache(maxsize=1024)
+def summary_box_html(text):
+    """상세 분석 표 안내 문구"""
+    return SUMMARY_BOX.substitute(text=text)